@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+"""
+Compares per-request latency of the pooled Subsonic transport against
+a bare requests.get() (new TCP/TLS connection per call).
+
+Usage:
+    python benchmarks/bench_subsonic_transport.py --server https://music.example.com
+        --user alice --password secret [--rounds 50] [--query a]
+
+Issues the same ping/search3 calls both ways against a live server
+(Navidrome, Airsonic, ...) and prints the transport's per-endpoint
+counters next to the bare timings.
+"""
+import os, sys, time, argparse, importlib.util
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+os.environ.setdefault('KIVY_NO_ARGS', '1')
+os.environ.setdefault('KIVY_NO_CONSOLELOG', '1')
+
+import requests
+
+PLUGIN_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src', 'musipelago', 'plugins', 'subsonic_backend.py')
+
+def load_plugin():
+    spec = importlib.util.spec_from_file_location('subsonic_backend', PLUGIN_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--server', required=True)
+    parser.add_argument('--user', required=True)
+    parser.add_argument('--password', required=True)
+    parser.add_argument('--rounds', type=int, default=50)
+    parser.add_argument('--query', default='a')
+    args = parser.parse_args()
+
+    plugin = load_plugin()
+    backend = plugin.SubsonicBackendLogic('subsonic', lambda info: None, lambda err: None)
+    backend.server_url = args.server.rstrip('/')
+    backend.username = args.user
+    backend.password = args.password
+    calls = [('ping', {}), ('search3', {'query': args.query, 'albumCount': 20, 'artistCount': 20})]
+
+    bare = {endpoint: [] for endpoint, _ in calls}
+    for _ in range(args.rounds):
+        for endpoint, extra in calls:
+            params = backend._build_params()
+            params.update(extra)
+            start = time.perf_counter()
+            requests.get(f"{backend.server_url}/rest/{endpoint}", params=params, timeout=30).content
+            bare[endpoint].append(time.perf_counter() - start)
+
+    for _ in range(args.rounds):
+        for endpoint, extra in calls:
+            backend._api(endpoint, extra)
+
+    print(f"{'endpoint':>10}{'bare avg ms':>13}{'pooled avg ms':>15}{'pooled max ms':>15}{'errors':>8}")
+    for endpoint, s in sorted(backend.transport.stats().items()):
+        bare_avg = sum(bare[endpoint]) / len(bare[endpoint]) * 1000
+        print(f"{endpoint:>10}{bare_avg:>13.1f}{s['avg_ms']:>15.1f}{s['max_ms']:>15.1f}{s['errors']:>8}")
+    backend.transport.close()
+
+
+if __name__ == '__main__':
+    main()
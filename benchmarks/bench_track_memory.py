@@ -0,0 +1,130 @@
+# -*- coding: utf-8 -*-
+"""
+Measures how much memory the client spends per track of a loaded world.
+
+Usage:
+    python benchmarks/bench_track_memory.py [--tracks 10000 100000] [--per-album 12]
+
+Builds a synthetic game file the way the generator writes it, loads it
+the way the client does (album cache, track_progress, apworld_map) and
+reports the memory still held afterwards, via tracemalloc. The 'legacy'
+row rebuilds the pre-slots layout (plain dataclasses, a dict per track
+progress entry) for comparison.
+"""
+import os, sys, json, gc, argparse, tracemalloc
+from dataclasses import dataclass, field
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+os.environ.setdefault('KIVY_NO_ARGS', '1')
+os.environ.setdefault('KIVY_NO_CONSOLELOG', '1')
+
+from musipelago.backends import GenericAlbum, GenericTrack, TrackProgress
+
+
+# --- The layout before slots, for comparison ---
+
+@dataclass
+class LegacyTrack:
+    uri: str
+    title: str
+    artist: str
+    album_title: str
+    duration_ms: int
+    service: str
+
+@dataclass
+class LegacyAlbum:
+    uri: str
+    title: str
+    artist: str
+    image_url: str
+    total_tracks: int
+    album_type: str
+    service: str
+    tracks: list = field(default_factory=list)
+    display_image_url: str = ""
+    metadata: dict = field(default_factory=dict)
+
+def legacy_progress(album_uri):
+    return {'is_finished': False, 'last_seen_progress_ms': 0, 'hint_text': None, 'parent_uri': album_uri}
+
+
+def make_game_file(total_tracks: int, per_album: int) -> str:
+    """A game file JSON string shaped like the generator's output."""
+    display_data = []
+    apworld = []
+    for a in range(max(1, total_tracks // per_album)):
+        artist = f"Artist {a // 5:05d}"
+        title = f"Album {a:06d}"
+        uri = f"{artist}/{title}"
+        tracks = [{
+            'uri': f"{uri}/{t + 1:02d} Track {t + 1}.flac",
+            'title': f"Track {t + 1} of {title}",
+            'artist': artist,
+            'album_title': title,
+            'duration_ms': 180000 + t,
+            'service': 'local'
+        } for t in range(per_album)]
+        display_data.append({
+            'uri': uri, 'title': title, 'artist': artist, 'image_url': "",
+            'total_tracks': per_album, 'album_type': "Album", 'service': 'local',
+            'tracks': tracks, 'display_image_url': "", 'metadata': {'art': {}}
+        })
+        apworld.append({
+            'name': f"{title} ({artist})", 'uri': uri,
+            'tracks': [{'title': f"{t['title']} ({artist})", 'uri': t['uri']} for t in tracks]
+        })
+    return json.dumps({'backend': {'name': 'local_files_backend', 'data': {}},
+                       'apworld': apworld, 'display_data': display_data})
+
+
+def load_world(text: str, legacy: bool) -> dict:
+    """Mirrors parse_game_file() plus the plugin's _parse_thread_target()."""
+    track_cls, album_cls = (LegacyTrack, LegacyAlbum) if legacy else (GenericTrack, GenericAlbum)
+    game_data = json.loads(text)
+    apworld_map, track_progress, album_cache = {}, {}, {}
+    for album_item in game_data['apworld']:
+        album_uri = album_item['uri']
+        apworld_map[album_uri] = album_item['name']
+        for track_item in album_item['tracks']:
+            track_uri = track_item['uri']
+            track_progress[track_uri] = legacy_progress(album_uri) if legacy else TrackProgress(parent_uri=album_uri)
+            apworld_map[track_uri] = track_item['title']
+    for album_dict in game_data['display_data']:
+        album_dict['tracks'] = [track_cls(**t) for t in album_dict['tracks']]
+        album = album_cls(**album_dict)
+        album_cache[album.uri] = album
+    return {'game_data': game_data, 'apworld_map': apworld_map,
+            'track_progress': track_progress, 'album_cache': album_cache}
+
+
+def measure(text: str, legacy: bool) -> int:
+    gc.collect()
+    tracemalloc.start()
+    world = load_world(text, legacy)
+    gc.collect()
+    held, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del world
+    return held
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--tracks', type=int, nargs='+', default=[10000, 100000])
+    parser.add_argument('--per-album', type=int, default=12)
+    args = parser.parse_args()
+
+    print(f"{'tracks':>8}{'layout':>9}{'held MB':>10}{'bytes/track':>13}")
+    for total in args.tracks:
+        text = make_game_file(total, args.per_album)
+        tracks = (total // args.per_album) * args.per_album
+        results = {}
+        for layout, legacy in (('legacy', True), ('slots', False)):
+            results[layout] = measure(text, legacy)
+            print(f"{tracks:>8}{layout:>9}{results[layout] / 1048576:>10.1f}{results[layout] / tracks:>13.0f}")
+        print(f"{'':>8}{'saved':>9}{(1 - results['slots'] / results['legacy']) * 100:>9.0f}%\n")
+
+
+if __name__ == '__main__':
+    main()
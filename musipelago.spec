@@ -8,6 +8,7 @@ src_dir = os.path.join(spec_dir, 'src', 'musipelago')
 block_cipher = None
 plugin_dependencies = [
     'mutagen',
+    'PIL',
     'requests',
     'plyer',
     'plyer.platforms.win.filechooser', # Explicitly include Windows filechooser
@@ -18,7 +19,13 @@ plugin_dependencies = [
 shared_modules = [
     'musipelago.utils_client',
     'musipelago.client_ui_components',
-    'musipelago.utils'
+    'musipelago.utils',
+    'musipelago.library_index',
+    'musipelago.library_watcher',
+    'musipelago.tag_reader',
+    'musipelago.scan_worker',
+    'musipelago.thumbnails',
+    'musipelago.image_cache'
 ]
 
 shared_datas = [
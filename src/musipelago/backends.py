@@ -1,4 +1,5 @@
 # -*- coding: utf-8 -*-
+import sys
 from abc import ABC, abstractmethod
 from dataclasses import dataclass, field
 from kivy.uix.boxlayout import BoxLayout
@@ -7,7 +8,10 @@ from kivy.properties import BooleanProperty
 from kivy.event import EventDispatcher
 
 # --- Generic Data Models ---
-@dataclass
+# Slotted: a 100k-track world holds 100k GenericTracks, and a per-object
+# __dict__ would be most of their size. The strings every track of an
+# album repeats are interned so they are stored once, not once per track.
+@dataclass(slots=True)
 class GenericTrack:
     uri: str
     title: str
@@ -15,8 +19,13 @@ class GenericTrack:
     album_title: str
     duration_ms: int
     service: str
+
+    def __post_init__(self):
+        self.artist = _intern(self.artist)
+        self.album_title = _intern(self.album_title)
+        self.service = _intern(self.service)
     
-@dataclass
+@dataclass(slots=True)
 class GenericAlbum:
     uri: str
     title: str
@@ -27,8 +36,15 @@ class GenericAlbum:
     service: str
     tracks: list[GenericTrack] = field(default_factory=list)
     display_image_url: str = ""
+    metadata: dict = field(default_factory=dict)
 
-@dataclass
+    def __post_init__(self):
+        self.title = _intern(self.title)
+        self.artist = _intern(self.artist)
+        self.album_type = _intern(self.album_type)
+        self.service = _intern(self.service)
+
+@dataclass(slots=True)
 class GenericArtist:
     uri: str
     name: str
@@ -37,7 +53,7 @@ class GenericArtist:
     metadata: dict = field(default_factory=dict)
     display_image_url: str = ""
 
-@dataclass
+@dataclass(slots=True)
 class GenericPlaylist:
     uri: str
     name: str
@@ -47,6 +63,43 @@ class GenericPlaylist:
     service: str
     display_image_url: str = ""
 
+def _intern(value):
+    return sys.intern(value) if type(value) is str else value
+
+
+class TrackProgress:
+    """
+    The client's per-track game state (app.track_progress values).
+    Slotted for the same reason as GenericTrack, but keeps the dict-style
+    access (progress['is_finished'], progress.get('hint_text')) callers use.
+    """
+    __slots__ = ('is_finished', 'last_seen_progress_ms', 'hint_text', 'parent_uri', 'location_id')
+
+    def __init__(self, parent_uri: str = None):
+        self.is_finished = False
+        self.last_seen_progress_ms = 0
+        self.hint_text = None
+        self.parent_uri = parent_uri
+        self.location_id = None
+
+    def __getitem__(self, key):
+        try:
+            return getattr(self, key)
+        except (AttributeError, TypeError):
+            raise KeyError(key) from None
+
+    def __setitem__(self, key, value):
+        try:
+            setattr(self, key, value)
+        except (AttributeError, TypeError):
+            raise KeyError(key) from None
+
+    def __contains__(self, key):
+        return key in self.__slots__
+
+    def get(self, key, default=None):
+        return getattr(self, key, default) if key in self.__slots__ else default
+
 
 # --- Abstract Backend Interface ---
 
@@ -131,6 +184,15 @@ class AbstractMusicBackend(ABC):
         """
         pass
 
+    def prepare_display_data(self, albums: list[GenericAlbum]):
+        """
+        (Optional) Called on the generator's worker thread right before
+        the albums are written to 'display_data'. Backends can resolve
+        anything expensive here (e.g. cover art) and store it in
+        album.metadata, so the client doesn't have to.
+        """
+        pass
+
 class AbstractPluginHost(ABC):
     """
     Defines the UI LOGIC interface for plugins.
@@ -177,6 +239,23 @@ class AbstractPluginHost(ABC):
         if self.root_layout:
             list_container = self.root_layout.ids.list_container
             list_container.add_apworld_item(generic_album)
+
+    def update_apworld_item(self, generic_album: GenericAlbum):
+        """
+        Helper method for plugins to replace an album already in the
+        right pane (matched by URI), e.g. after its files changed.
+        """
+        if self.root_layout:
+            list_container = self.root_layout.ids.list_container
+            list_container.update_apworld_item(generic_album)
+
+    def remove_from_apworld(self, item_uri: str):
+        """
+        Helper method for plugins to drop an album from the right pane.
+        """
+        if self.root_layout:
+            list_container = self.root_layout.ids.list_container
+            list_container.remove_apworld_item(item_uri)
     
     def on_item_menu_click(self, item_list_id: str, generic_item: any) -> bool:
         """
@@ -186,6 +265,14 @@ class AbstractPluginHost(ABC):
         Return False to let the default menu logic (search, apworld) proceed.
         """
         return False # Default: do nothing, let the default menu open
+
+    def teardown(self):
+        """
+        (Optional) Called when the host is replaced (e.g. after logging
+        in again) or the app closes. Stop background threads, watchers
+        and timers here.
+        """
+        pass
     
 class AbstractClientHost(EventDispatcher, ABC):
     """
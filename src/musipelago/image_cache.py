@@ -0,0 +1,362 @@
+# -*- coding: utf-8 -*-
+import os, time, shutil, sqlite3, hashlib, threading
+
+from kivy.app import App
+from kivy.clock import Clock
+from kivy.logger import Logger
+
+from musipelago.library_index import shared_data_dir
+
+# Bump this whenever the table layout changes; old caches are rebuilt.
+SCHEMA_VERSION = 1
+
+# Default byte budget, overridable through the app's JsonStore:
+#   store.put('image_cache', max_mb=512)
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+# Eviction frees a bit more than needed so we don't evict on every put
+EVICT_HEADROOM = 0.9
+# Access times are batched in memory and written out after this many
+# lookups, at least every TOUCH_FLUSH_INTERVAL seconds, and with every put
+TOUCH_FLUSH_COUNT = 200
+TOUCH_FLUSH_INTERVAL = 30.0
+
+# Rules mapping an image URL to a stable cache key, see register_url_key_rule()
+_url_key_rules = []
+
+def register_url_key_rule(rule):
+    """
+    Registers rule(url) -> key or None. Plugins whose image URLs carry
+    per-request parameters (auth salts, tokens, expiry) use this so the
+    same image maps to the same cache key every time it is requested.
+    """
+    if rule not in _url_key_rules:
+        _url_key_rules.append(rule)
+
+def url_cache_key(url: str) -> str:
+    """Returns the cache key for an image URL: the first rule's key, or the URL itself."""
+    for rule in _url_key_rules:
+        try:
+            key = rule(url)
+        except Exception as e:
+            Logger.warning(f"ImageCache: Key rule failed for {url}: {e}")
+            continue
+        if key:
+            return key
+    return url
+
+def sniff_image_ext(data: bytes) -> str:
+    if data.startswith(b'\x89PNG'): return "png"
+    if data.startswith(b'GIF8'): return "gif"
+    if data[:4] == b'RIFF' and data[8:12] == b'WEBP': return "webp"
+    return "jpg"
+
+
+class ImageCache:
+    """
+    Content-addressed image store shared by the generator and the client.
+    Images are stored once as <sha1>.<ext>, however many keys point at
+    them. Keys are whatever the caller uses to find an image again: a
+    URL, a file path, or a derived name like 'thumb:<sha1>:list'.
+    A SQLite index maps keys to content hashes and tracks last access,
+    and the least recently used images are evicted past max_bytes.
+    """
+    _shared = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self, cache_dir: str, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        if not os.path.exists(cache_dir):
+            os.makedirs(cache_dir)
+        self._lock = threading.Lock()
+        self._touched = {} # content hash -> last access, not yet written
+        self._last_flush = time.monotonic()
+        self._conn = sqlite3.connect(os.path.join(cache_dir, 'index.sqlite3'), check_same_thread=False)
+        self._setup_schema()
+        self._total_bytes = self._stored_bytes_locked()
+
+    @classmethod
+    def shared(cls):
+        """
+        Returns the process-wide cache, creating it on first use.
+        The first call also starts a background cleanup of orphaned files.
+        """
+        with cls._shared_lock:
+            if cls._shared is None:
+                cache_dir = os.path.join(shared_data_dir(), 'image_cache')
+                cls._shared = cls(cache_dir, cls._configured_max_bytes())
+                threading.Thread(target=cls._shared.cleanup, daemon=True).start()
+                # The first caller may be a worker thread; the timer belongs to the main thread
+                Clock.schedule_once(cls._start_flush_timer)
+            return cls._shared
+
+    @classmethod
+    def _start_flush_timer(cls, dt):
+        """(MAIN THREAD)"""
+        Clock.schedule_interval(lambda dt: cls._shared.flush_touches(), TOUCH_FLUSH_INTERVAL)
+
+    @staticmethod
+    def _configured_max_bytes() -> int:
+        app = App.get_running_app()
+        store = getattr(app, 'store', None)
+        try:
+            if store is not None and store.exists('image_cache'):
+                return int(store.get('image_cache').get('max_mb')) * 1024 * 1024
+        except (TypeError, ValueError):
+            Logger.warning("ImageCache: Invalid 'max_mb' setting, using the default.")
+        return DEFAULT_MAX_BYTES
+
+    def _setup_schema(self):
+        with self._lock:
+            cur = self._conn.cursor()
+            # WAL lets the generator and client share the cache
+            cur.execute("PRAGMA journal_mode=WAL")
+            cur.execute("PRAGMA synchronous=NORMAL")
+            version = cur.execute("PRAGMA user_version").fetchone()[0]
+            if version != SCHEMA_VERSION:
+                Logger.info(f"ImageCache: Building schema v{SCHEMA_VERSION} (found v{version}).")
+                cur.execute("DROP TABLE IF EXISTS blobs")
+                cur.execute("DROP TABLE IF EXISTS keys")
+                cur.execute("DROP TABLE IF EXISTS meta")
+            cur.execute("""
+                CREATE TABLE IF NOT EXISTS blobs (
+                    hash TEXT PRIMARY KEY,
+                    ext TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    last_access REAL NOT NULL
+                ) WITHOUT ROWID
+            """)
+            cur.execute("CREATE INDEX IF NOT EXISTS blobs_lru ON blobs (last_access)")
+            cur.execute("""
+                CREATE TABLE IF NOT EXISTS keys (
+                    key TEXT PRIMARY KEY,
+                    hash TEXT NOT NULL
+                ) WITHOUT ROWID
+            """)
+            cur.execute("CREATE INDEX IF NOT EXISTS keys_hash ON keys (hash)")
+            # Running total of blobs.size, kept by triggers so puts and
+            # evictions from either app update it in the same transaction.
+            # Seeded once from the table for caches that predate it.
+            cur.execute("CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+            cur.execute(
+                "INSERT OR IGNORE INTO meta (name, value) "
+                "SELECT 'total_bytes', COALESCE(SUM(size), 0) FROM blobs"
+            )
+            cur.execute("""
+                CREATE TRIGGER IF NOT EXISTS blobs_total_insert AFTER INSERT ON blobs BEGIN
+                    UPDATE meta SET value = value + NEW.size WHERE name = 'total_bytes';
+                END
+            """)
+            cur.execute("""
+                CREATE TRIGGER IF NOT EXISTS blobs_total_delete AFTER DELETE ON blobs BEGIN
+                    UPDATE meta SET value = value - OLD.size WHERE name = 'total_bytes';
+                END
+            """)
+            cur.execute("""
+                CREATE TRIGGER IF NOT EXISTS blobs_total_update AFTER UPDATE OF size ON blobs BEGIN
+                    UPDATE meta SET value = value - OLD.size + NEW.size WHERE name = 'total_bytes';
+                END
+            """)
+            cur.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+            self._conn.commit()
+
+    def _stored_bytes_locked(self) -> int:
+        """
+        Size of every cached image, from the index's running total. The
+        generator and the client share the cache, so a total kept in
+        memory would miss the other app's puts and evictions.
+        """
+        return self._conn.execute("SELECT value FROM meta WHERE name = 'total_bytes'").fetchone()[0]
+
+    def _blob_path(self, content_hash: str, ext: str) -> str:
+        return os.path.join(self.cache_dir, f"{content_hash}.{ext}")
+
+    # --- Lookups ---
+
+    def lookup(self, key: str):
+        """Returns the cached image path for key, or None."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT blobs.hash, blobs.ext FROM keys JOIN blobs ON blobs.hash = keys.hash WHERE keys.key = ?",
+                (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            self._touch_locked(row[0])
+        path = self._blob_path(*row)
+        return path if os.path.exists(path) else None
+
+    def lookup_hash(self, content_hash: str):
+        """Returns the cached image path for a content hash, or None."""
+        with self._lock:
+            row = self._conn.execute("SELECT ext FROM blobs WHERE hash = ?", (content_hash,)).fetchone()
+            if row is None:
+                return None
+            self._touch_locked(content_hash)
+        path = self._blob_path(content_hash, row[0])
+        return path if os.path.exists(path) else None
+
+    def _touch_locked(self, content_hash: str):
+        self._touched[content_hash] = time.time()
+        if (len(self._touched) >= TOUCH_FLUSH_COUNT
+                or time.monotonic() - self._last_flush >= TOUCH_FLUSH_INTERVAL):
+            self._flush_touches_locked()
+
+    def _flush_touches_locked(self, commit: bool = True):
+        self._last_flush = time.monotonic()
+        if not self._touched:
+            return
+        self._conn.executemany(
+            "UPDATE blobs SET last_access = ? WHERE hash = ?",
+            [(t, h) for h, t in self._touched.items()]
+        )
+        if commit:
+            self._conn.commit()
+        self._touched.clear()
+
+    def flush_touches(self):
+        """Writes buffered access times, so LRU eviction (in either app) sees them."""
+        with self._lock:
+            self._flush_touches_locked()
+
+    # --- Updates ---
+
+    def put(self, data: bytes, keys=(), ext: str = None) -> str:
+        """
+        Stores image bytes (once per content) and points every key in
+        keys at them. Returns the cached image path.
+        """
+        content_hash = hashlib.sha1(data).hexdigest()
+        ext = ext or sniff_image_ext(data)
+        path = self._blob_path(content_hash, ext)
+        known_path = self._known_blob_path(content_hash)
+        tmp_path = None
+        if known_path is None:
+            # Written outside the lock so other workers aren't held up by
+            # disk I/O; temp file + rename, another thread or app may write
+            # the same image
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+        with self._lock:
+            if tmp_path is not None:
+                os.replace(tmp_path, path)
+                self._conn.execute(
+                    "INSERT INTO blobs (hash, ext, size, last_access) VALUES (?, ?, ?, ?) "
+                    "ON CONFLICT (hash) DO UPDATE SET ext = excluded.ext, size = excluded.size, "
+                    "last_access = excluded.last_access",
+                    (content_hash, ext, len(data), time.time())
+                )
+            else:
+                path = known_path
+            if keys:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO keys (key, hash) VALUES (?, ?)",
+                    [(key, content_hash) for key in keys]
+                )
+            # Written along with the put, one commit for both
+            self._flush_touches_locked(commit=False)
+            self._conn.commit()
+            self._total_bytes = self._stored_bytes_locked()
+            if self._total_bytes > self.max_bytes:
+                self._evict_locked()
+        return path
+
+    def _known_blob_path(self, content_hash: str):
+        """Path of an image that is already cached and on disk, or None."""
+        with self._lock:
+            known = self._conn.execute("SELECT ext FROM blobs WHERE hash = ?", (content_hash,)).fetchone()
+        if known is None:
+            return None
+        path = self._blob_path(content_hash, known[0])
+        return path if os.path.exists(path) else None
+
+    def link(self, key: str, content_hash: str) -> bool:
+        """Points key at an image that is already cached. False if it isn't."""
+        with self._lock:
+            if self._conn.execute("SELECT 1 FROM blobs WHERE hash = ?", (content_hash,)).fetchone() is None:
+                return False
+            self._conn.execute("INSERT OR REPLACE INTO keys (key, hash) VALUES (?, ?)", (key, content_hash))
+            self._conn.commit()
+        return True
+
+    def _evict_locked(self):
+        """Deletes least recently used images until we're under budget."""
+        self._flush_touches_locked()
+        self._total_bytes = self._stored_bytes_locked()
+        target = self.max_bytes * EVICT_HEADROOM
+        evicted = 0
+        rows = self._conn.execute("SELECT hash, ext, size FROM blobs ORDER BY last_access").fetchall()
+        for content_hash, ext, size in rows:
+            if self._total_bytes <= target:
+                break
+            try:
+                os.remove(self._blob_path(content_hash, ext))
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                Logger.warning(f"ImageCache: Could not evict {content_hash}: {e}")
+                continue
+            self._conn.execute("DELETE FROM blobs WHERE hash = ?", (content_hash,))
+            self._conn.execute("DELETE FROM keys WHERE hash = ?", (content_hash,))
+            self._total_bytes -= size
+            evicted += 1
+        self._conn.commit()
+        Logger.info(f"ImageCache: Evicted {evicted} images, {self._total_bytes / 1048576:.1f} MB in use.")
+
+    # --- Maintenance ---
+
+    def cleanup(self):
+        """
+        (THREAD) Startup housekeeping: deletes files the index doesn't
+        know (crashed writes, legacy caches), forgets index rows whose
+        file is gone and enforces the byte budget.
+        """
+        try:
+            # Files newer than this may be mid-put() in this or another app
+            cutoff = time.time() - 60
+            with self._lock:
+                known = {f"{h}.{e}": h for h, e in self._conn.execute("SELECT hash, ext FROM blobs")}
+            on_disk = set()
+            removed_files = 0
+            for entry in os.scandir(self.cache_dir):
+                if not entry.is_file() or entry.name.startswith('index.sqlite3'):
+                    continue
+                if entry.name in known:
+                    on_disk.add(entry.name)
+                    continue
+                try:
+                    if entry.stat().st_mtime > cutoff:
+                        continue
+                    os.remove(entry.path)
+                    removed_files += 1
+                except OSError:
+                    pass
+
+            missing = [h for name, h in known.items() if name not in on_disk]
+            with self._lock:
+                for content_hash in missing:
+                    self._conn.execute("DELETE FROM blobs WHERE hash = ?", (content_hash,))
+                self._conn.execute("DELETE FROM keys WHERE hash NOT IN (SELECT hash FROM blobs)")
+                self._conn.commit()
+                self._total_bytes = self._stored_bytes_locked()
+                if self._total_bytes > self.max_bytes:
+                    self._evict_locked()
+
+            # Before the shared cache every app kept its own, keyed by URL/path
+            app = App.get_running_app()
+            if app:
+                legacy_dir = os.path.join(app.user_data_dir, 'image_cache')
+                if os.path.isdir(legacy_dir) and os.path.normcase(legacy_dir) != os.path.normcase(self.cache_dir):
+                    shutil.rmtree(legacy_dir, ignore_errors=True)
+                    Logger.info(f"ImageCache: Removed legacy cache at {legacy_dir}")
+
+            if removed_files or missing:
+                Logger.info(f"ImageCache: Cleanup removed {removed_files} orphaned files and {len(missing)} stale entries.")
+        except Exception as e:
+            Logger.error(f"ImageCache: Cleanup failed: {e}", exc_info=True)
+
+    def close(self):
+        with self._lock:
+            self._flush_touches_locked()
+            self._conn.close()
@@ -0,0 +1,421 @@
+# -*- coding: utf-8 -*-
+import os, re, time, sqlite3, threading
+
+from kivy.app import App
+from kivy.logger import Logger
+
+# Bump this whenever the table layout changes; old indexes are rebuilt.
+SCHEMA_VERSION = 2
+
+# SQLite caps the number of '?' placeholders per statement.
+_QUERY_CHUNK = 500
+
+# Full-text columns, in tracks_fts order, and their bm25 weights
+# (an album name match counts most).
+_FTS_COLUMNS = ('title', 'artist', 'album', 'albumartist')
+_FTS_RANK = "bm25(1.0, 2.0, 5.0, 3.0)"
+
+def _search_terms(text: str) -> list[str]:
+    """Splits user input into the words we match (as prefixes)."""
+    return re.findall(r"\w+", text or "")
+
+def _casefold(value):
+    """SQL casefold(): the same folding as str.casefold() in the album model."""
+    return value.casefold() if isinstance(value, str) else value
+
+# Album artists that say nothing about who an album belongs to. Albums
+# tagged with one are told apart by folder, like untagged ones.
+GENERIC_ALBUM_ARTISTS = frozenset({
+    'various artists', 'various', 'va', 'v.a.', 'v/a', 'unknown', 'unknown artist',
+})
+
+def album_group_key(rel_path: str, album, albumartist) -> tuple:
+    """
+    Which album a track at rel_path ('a/b/track.mp3') belongs to. Shared
+    by the scanner's album model and search_albums(), so both group alike.
+    Tracks sharing an album tag are grouped by album artist (so discs in
+    sibling folders merge), but only within one top-level folder: the same
+    album name in unrelated trees stays separate. Generic or missing album
+    artists and untagged tracks group by folder.
+    """
+    folder = rel_path.rpartition('/')[0]
+    if not album:
+        return (None, folder)
+    owner = (albumartist or '').casefold()
+    if not owner or owner in GENERIC_ALBUM_ARTISTS:
+        return (album.casefold(), folder)
+    return (album.casefold(), owner, folder.partition('/')[0])
+
+def _album_group(rel_path, album, albumartist) -> str:
+    """SQL album_group(): album_group_key() as one comparable string."""
+    return '\x1f'.join(str(part) for part in album_group_key(rel_path, album, albumartist))
+
+def _fts_query(terms: list[str], columns: tuple = None) -> str:
+    """FTS5 query requiring every term as a word prefix, optionally in columns only."""
+    query = " ".join(f'"{term}"*' for term in terms)
+    if columns:
+        return f"{{{' '.join(columns)}}} : ({query})"
+    return query
+
+def shared_data_dir() -> str:
+    """
+    Returns a data directory shared by the generator and the client.
+    Kivy gives every App its own user_data_dir, so we use a sibling folder.
+    """
+    app = App.get_running_app()
+    if app:
+        base_dir = os.path.join(os.path.dirname(app.user_data_dir), 'musipelago')
+    else:
+        base_dir = os.path.join(os.path.expanduser("~"), '.musipelago')
+    if not os.path.exists(base_dir):
+        os.makedirs(base_dir)
+    return base_dir
+
+
+class LibraryIndex:
+    """
+    On-disk tag index for a local music library (SQLite).
+    Entries are keyed by the track's path relative to the library root
+    and carry the file's mtime and size, so a rescan only needs to stat()
+    a file to know whether its cached tags are still valid.
+
+    Entry tuples are:
+        (mtime_ns, size, title, artist, album, albumartist, duration_ms, has_art)
+
+    Tags are also kept in an FTS5 table (tracks_fts) for search. It is
+    an external-content index over tracks, maintained by triggers.
+    SQLite builds without FTS5 fall back to (slow) LIKE queries.
+    """
+
+    def __init__(self, db_path: str, root_directory: str):
+        self.db_path = db_path
+        self.root = os.path.normcase(os.path.abspath(root_directory))
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        # SQLite's lower() only folds ASCII; group names the way the album
+        # model does, or "Ärzte" and "ärzte" end up as two search results
+        self._conn.create_function('casefold', 1, _casefold, deterministic=True)
+        self._conn.create_function('album_group', 3, _album_group, deterministic=True)
+        self.has_fts = False
+        self._setup_schema()
+
+    @classmethod
+    def for_root(cls, root_directory: str):
+        """Opens the shared index for the given library root."""
+        db_path = os.path.join(shared_data_dir(), 'library_index.sqlite3')
+        return cls(db_path, root_directory)
+
+    def _setup_schema(self):
+        with self._lock:
+            cur = self._conn.cursor()
+            # WAL lets the generator and client read while the other writes
+            cur.execute("PRAGMA journal_mode=WAL")
+            cur.execute("PRAGMA synchronous=NORMAL")
+            version = cur.execute("PRAGMA user_version").fetchone()[0]
+            if version != SCHEMA_VERSION:
+                Logger.info(f"LibraryIndex: Building schema v{SCHEMA_VERSION} (found v{version}).")
+                cur.execute("DROP TABLE IF EXISTS tracks_fts")
+                cur.execute("DROP TABLE IF EXISTS tracks")
+            # Has a rowid (unlike v1) so the FTS index can point at rows
+            cur.execute("""
+                CREATE TABLE IF NOT EXISTS tracks (
+                    root TEXT NOT NULL,
+                    rel_path TEXT NOT NULL,
+                    mtime_ns INTEGER NOT NULL,
+                    size INTEGER NOT NULL,
+                    title TEXT,
+                    artist TEXT,
+                    album TEXT,
+                    albumartist TEXT,
+                    duration_ms INTEGER NOT NULL DEFAULT 0,
+                    has_art INTEGER NOT NULL DEFAULT 0,
+                    UNIQUE (root, rel_path)
+                )
+            """)
+            self.has_fts = self._setup_fts(cur)
+            # Added without a version bump, so existing indexes are kept
+            cur.execute("""
+                CREATE TABLE IF NOT EXISTS scan_checkpoints (
+                    root TEXT NOT NULL,
+                    scan_dir TEXT NOT NULL,
+                    last_dir TEXT NOT NULL,
+                    updated REAL NOT NULL,
+                    PRIMARY KEY (root, scan_dir)
+                ) WITHOUT ROWID
+            """)
+            cur.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+            self._conn.commit()
+
+    def _setup_fts(self, cur) -> bool:
+        existed = cur.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'tracks_fts'"
+        ).fetchone() is not None
+        try:
+            cur.execute("""
+                CREATE VIRTUAL TABLE IF NOT EXISTS tracks_fts USING fts5(
+                    title, artist, album, albumartist,
+                    content='tracks', content_rowid='rowid',
+                    tokenize='unicode61 remove_diacritics 2',
+                    prefix='2 3'
+                )
+            """)
+        except sqlite3.OperationalError as e:
+            Logger.warning(f"LibraryIndex: FTS5 is not available ({e}), search will be slow.")
+            return False
+        # Persistent default for the 'rank' column. bm25() itself can't be
+        # called in the grouped queries below, 'rank' can.
+        cur.execute("INSERT INTO tracks_fts (tracks_fts, rank) VALUES ('rank', ?)", (_FTS_RANK,))
+        cur.execute("""
+            CREATE TRIGGER IF NOT EXISTS tracks_fts_insert AFTER INSERT ON tracks BEGIN
+                INSERT INTO tracks_fts (rowid, title, artist, album, albumartist)
+                VALUES (new.rowid, new.title, new.artist, new.album, new.albumartist);
+            END
+        """)
+        cur.execute("""
+            CREATE TRIGGER IF NOT EXISTS tracks_fts_delete AFTER DELETE ON tracks BEGIN
+                INSERT INTO tracks_fts (tracks_fts, rowid, title, artist, album, albumartist)
+                VALUES ('delete', old.rowid, old.title, old.artist, old.album, old.albumartist);
+            END
+        """)
+        cur.execute("""
+            CREATE TRIGGER IF NOT EXISTS tracks_fts_update AFTER UPDATE ON tracks BEGIN
+                INSERT INTO tracks_fts (tracks_fts, rowid, title, artist, album, albumartist)
+                VALUES ('delete', old.rowid, old.title, old.artist, old.album, old.albumartist);
+                INSERT INTO tracks_fts (rowid, title, artist, album, albumartist)
+                VALUES (new.rowid, new.title, new.artist, new.album, new.albumartist);
+            END
+        """)
+        if not existed:
+            # Tracks indexed by a build without FTS5 still need searching
+            cur.execute("INSERT INTO tracks_fts (tracks_fts) VALUES ('rebuild')")
+        return True
+
+    # --- Lookups ---
+
+    @staticmethod
+    def is_fresh(entry, stat_result) -> bool:
+        """True if the cached entry still matches the file on disk."""
+        return (entry is not None
+                and entry[0] == stat_result.st_mtime_ns
+                and entry[1] == stat_result.st_size)
+
+    def get_entry(self, rel_path: str):
+        """Returns the entry tuple for one track, or None."""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT mtime_ns, size, title, artist, album, albumartist, duration_ms, has_art "
+                "FROM tracks WHERE root = ? AND rel_path = ?",
+                (self.root, rel_path)
+            ).fetchone()
+
+    def get_entries(self, rel_paths) -> dict:
+        """Returns {rel_path: entry tuple} for every known path in rel_paths."""
+        rel_paths = list(rel_paths)
+        found = {}
+        with self._lock:
+            for i in range(0, len(rel_paths), _QUERY_CHUNK):
+                chunk = rel_paths[i:i + _QUERY_CHUNK]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    "SELECT rel_path, mtime_ns, size, title, artist, album, albumartist, duration_ms, has_art "
+                    f"FROM tracks WHERE root = ? AND rel_path IN ({placeholders})",
+                    (self.root, *chunk)
+                )
+                for row in rows:
+                    found[row[0]] = row[1:]
+        return found
+
+    def all_entries(self) -> dict:
+        """Returns {rel_path: entry tuple} for every track under this root."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT rel_path, mtime_ns, size, title, artist, album, albumartist, duration_ms, has_art "
+                "FROM tracks WHERE root = ?",
+                (self.root,)
+            ).fetchall()
+        return {row[0]: row[1:] for row in rows}
+
+    # --- Search ---
+
+    def _match_clause(self, terms: list[str], columns: tuple) -> tuple:
+        """
+        Returns (sql, params) matching rows of tracks AS t where every
+        term is a prefix of a word in one of columns.
+        """
+        if self.has_fts:
+            return ("t.rowid IN (SELECT rowid FROM tracks_fts WHERE tracks_fts MATCH ?)",
+                    [_fts_query(terms, columns)])
+        clauses = []
+        params = []
+        for term in terms:
+            clauses.append("(" + " OR ".join(f"t.{col} LIKE ?" for col in columns) + ")")
+            params.extend([f"%{term}%"] * len(columns))
+        return " AND ".join(clauses), params
+
+    def search_albums(self, text: str, limit: int, offset: int = 0) -> list[str]:
+        """
+        Finds albums whose title, artists or track titles match text.
+        Returns one track rel_path per album, best match first. Albums
+        are grouped exactly like the scanner does (album_group_key()).
+        """
+        terms = _search_terms(text)
+        if not terms:
+            return []
+        if self.has_fts:
+            # CROSS JOIN pins the FTS table as the outer loop; left to
+            # itself the planner may walk all of tracks instead.
+            inner = (
+                "SELECT t.rel_path, t.album, t.albumartist, tracks_fts.rank AS score "
+                "FROM tracks_fts CROSS JOIN tracks AS t ON t.rowid = tracks_fts.rowid "
+                "WHERE tracks_fts MATCH ? AND t.root = ?"
+            )
+            params = [_fts_query(terms), self.root]
+        else:
+            where, params = self._match_clause(terms, _FTS_COLUMNS)
+            inner = (
+                "SELECT t.rel_path, t.album, t.albumartist, 0 AS score "
+                f"FROM tracks AS t WHERE {where} AND t.root = ?"
+            )
+            params.append(self.root)
+        # SQLite returns the bare rel_path from the row holding min(score)
+        sql = (
+            f"SELECT rel_path, min(score) AS best FROM ({inner}) "
+            "GROUP BY album_group(rel_path, album, albumartist) "
+            "ORDER BY best, rel_path LIMIT ? OFFSET ?"
+        )
+        with self._lock:
+            rows = self._conn.execute(sql, (*params, limit, offset)).fetchall()
+        return [row[0] for row in rows]
+
+    def search_artists(self, text: str, limit: int, offset: int = 0) -> list[tuple]:
+        """
+        Finds track and album artists matching text.
+        Returns [(name, album_count)], best match first.
+        """
+        terms = _search_terms(text)
+        if not terms:
+            return []
+        parts = []
+        params = []
+        for column in ('artist', 'albumartist'):
+            if self.has_fts:
+                # Join instead of _match_clause() so the rank is available
+                parts.append(
+                    f"SELECT t.{column} AS name, t.album AS album, tracks_fts.rank AS score "
+                    "FROM tracks_fts CROSS JOIN tracks AS t ON t.rowid = tracks_fts.rowid "
+                    "WHERE tracks_fts MATCH ? AND t.root = ?"
+                )
+                params.extend([_fts_query(terms, (column,)), self.root])
+            else:
+                where, match_params = self._match_clause(terms, (column,))
+                parts.append(
+                    f"SELECT t.{column} AS name, t.album AS album, 0 AS score "
+                    f"FROM tracks AS t WHERE {where} AND t.root = ?"
+                )
+                params.extend([*match_params, self.root])
+        sql = (
+            "SELECT name, count(DISTINCT casefold(album)), min(score) AS best "
+            f"FROM ({' UNION ALL '.join(parts)}) "
+            "WHERE coalesce(name, '') != '' "
+            "GROUP BY casefold(name) ORDER BY best, casefold(name) LIMIT ? OFFSET ?"
+        )
+        with self._lock:
+            rows = self._conn.execute(sql, (*params, limit, offset)).fetchall()
+        return [(row[0], row[1]) for row in rows]
+
+    def artist_tracks(self, name: str) -> list[str]:
+        """Returns rel_paths of tracks whose artist or album artist is name."""
+        terms = _search_terms(name)
+        if not terms:
+            return []
+        where, params = self._match_clause(terms, ('artist', 'albumartist'))
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT t.rel_path, t.artist, t.albumartist FROM tracks AS t WHERE {where} AND t.root = ?",
+                (*params, self.root)
+            ).fetchall()
+        # The match is by word prefix; keep only exact (case-insensitive) names
+        wanted = name.casefold()
+        return [rel_path for rel_path, artist, albumartist in rows
+                if (artist or "").casefold() == wanted or (albumartist or "").casefold() == wanted]
+
+    # --- Updates ---
+
+    def put_many(self, rows):
+        """
+        Inserts or replaces entries. Each row is
+        (rel_path, mtime_ns, size, title, artist, album, albumartist, duration_ms, has_art).
+        """
+        rows = [(self.root, *row) for row in rows]
+        if not rows: return
+        with self._lock:
+            # An upsert rather than INSERT OR REPLACE: REPLACE deletes
+            # without firing the delete trigger, leaving stale FTS rows.
+            self._conn.executemany(
+                "INSERT INTO tracks "
+                "(root, rel_path, mtime_ns, size, title, artist, album, albumartist, duration_ms, has_art) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (root, rel_path) DO UPDATE SET "
+                "mtime_ns = excluded.mtime_ns, size = excluded.size, title = excluded.title, "
+                "artist = excluded.artist, album = excluded.album, albumartist = excluded.albumartist, "
+                "duration_ms = excluded.duration_ms, has_art = excluded.has_art",
+                rows
+            )
+            self._conn.commit()
+
+    def remove_many(self, rel_paths):
+        rows = [(self.root, p) for p in rel_paths]
+        if not rows: return
+        with self._lock:
+            self._conn.executemany("DELETE FROM tracks WHERE root = ? AND rel_path = ?", rows)
+            self._conn.commit()
+
+    def prune(self, keep_rel_paths: set) -> int:
+        """
+        Removes entries for files that no longer exist.
+        Only call this after a scan of the *whole* root.
+        """
+        with self._lock:
+            known = [row[0] for row in self._conn.execute(
+                "SELECT rel_path FROM tracks WHERE root = ?", (self.root,)
+            )]
+        stale = [p for p in known if p not in keep_rel_paths]
+        self.remove_many(stale)
+        if stale:
+            Logger.info(f"LibraryIndex: Pruned {len(stale)} missing files.")
+        return len(stale)
+
+    # --- Scan checkpoints ---
+    # A scan walks directories in a fixed order and records the last one
+    # whose files are all in the index. An interrupted scan can then
+    # trust those directories' entries instead of checking every file.
+
+    def get_checkpoint(self, scan_dir: str, max_age: float):
+        """Returns the last finished directory of an unfinished scan, or None."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT last_dir, updated FROM scan_checkpoints WHERE root = ? AND scan_dir = ?",
+                (self.root, scan_dir)
+            ).fetchone()
+        if row is None or time.time() - row[1] > max_age:
+            return None
+        return row[0]
+
+    def set_checkpoint(self, scan_dir: str, last_dir: str):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO scan_checkpoints (root, scan_dir, last_dir, updated) VALUES (?, ?, ?, ?)",
+                (self.root, scan_dir, last_dir, time.time())
+            )
+            self._conn.commit()
+
+    def clear_checkpoint(self, scan_dir: str):
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM scan_checkpoints WHERE root = ? AND scan_dir = ?", (self.root, scan_dir)
+            )
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
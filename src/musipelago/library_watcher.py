@@ -0,0 +1,283 @@
+# -*- coding: utf-8 -*-
+import os, re, sys, time, struct, select, threading, ctypes, ctypes.util
+
+from kivy.logger import Logger
+
+WATCH_DEBOUNCE = 1.0 # Seconds of quiet before a burst of changes is reported
+
+# Polling mode lists every folder but only stat()s folders; a folder whose
+# mtime changed gets its files compared. Files rewritten in place leave the
+# folder mtime alone, those are caught by a full pass every few passes.
+POLL_INTERVAL = 60.0 # Minimum seconds between passes
+POLL_LOAD_FACTOR = 20 # Wait at least this many times the last pass took (<= 5% busy)
+POLL_FULL_EVERY = 30 # Every Nth pass also stat()s every file
+
+# Changes on these never reach inotify on this machine, they are polled
+_NETWORK_FSTYPES = ('nfs', 'nfs4', 'cifs', 'smb3', 'smbfs', '9p', 'afs', 'ceph',
+                    'glusterfs', 'fuse.sshfs', 'fuse.rclone', 'fuse.gvfsd-fuse', 'davfs')
+
+# --- inotify constants (linux/inotify.h) ---
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_FROM = 0x00000040
+_IN_MOVED_TO = 0x00000080
+_IN_CREATE = 0x00000100
+_IN_DELETE = 0x00000200
+_IN_DELETE_SELF = 0x00000400
+_IN_Q_OVERFLOW = 0x00004000
+_IN_IGNORED = 0x00008000
+_IN_ONLYDIR = 0x01000000
+_IN_ISDIR = 0x40000000
+_IN_CLOEXEC = 0o2000000
+_IN_NONBLOCK = 0o4000
+
+_WATCH_MASK = (_IN_CLOSE_WRITE | _IN_MOVED_FROM | _IN_MOVED_TO
+               | _IN_CREATE | _IN_DELETE | _IN_DELETE_SELF | _IN_ONLYDIR)
+_EVENT_HEADER = struct.Struct('iIII') # wd, mask, cookie, name length
+
+def _load_libc():
+    if not sys.platform.startswith('linux'):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        libc.inotify_init1.argtypes = [ctypes.c_int]
+        libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        libc.inotify_rm_watch.argtypes = [ctypes.c_int, ctypes.c_int]
+        return libc
+    except (OSError, AttributeError):
+        return None
+
+def _mount_fstype(path: str):
+    """The filesystem type path is mounted on, from /proc/mounts (Linux only)."""
+    path = os.path.realpath(path)
+    best, fstype = '', None
+    try:
+        with open('/proc/mounts', encoding='utf-8', errors='replace') as f:
+            for line in f:
+                fields = line.split()
+                if len(fields) < 3:
+                    continue
+                # Spaces and such are octal escapes ('\\040')
+                mount_point = re.sub(r'\\([0-7]{3})', lambda m: chr(int(m.group(1), 8)), fields[1])
+                prefix = mount_point.rstrip('/') + '/'
+                if (path == mount_point or path.startswith(prefix)) and len(mount_point) >= len(best):
+                    best, fstype = mount_point, fields[2]
+    except OSError:
+        return None
+    return fstype
+
+
+class LibraryWatcher:
+    """
+    Watches a music library root for added, removed and rewritten files.
+    Uses inotify where the platform has it and otherwise falls back to
+    polling folder mtimes (see POLL_INTERVAL). Network mounts are always
+    polled: inotify only sees changes made by this machine.
+
+    on_changes(paths) is called on the watcher thread with a set of
+    absolute paths (files or directories) that were created, rewritten,
+    moved or deleted. Bursts are coalesced for WATCH_DEBOUNCE seconds.
+    Consumers re-stat the paths; a path that no longer exists was removed.
+    """
+
+    def __init__(self, root_dir: str, on_changes, extensions: tuple):
+        self.root_dir = os.path.abspath(root_dir)
+        self.on_changes = on_changes
+        self.extensions = extensions
+        self.mode = None # 'inotify' or 'polling' once started
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread:
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        self._thread = None
+
+    def _run(self):
+        try:
+            libc = _load_libc()
+            fstype = _mount_fstype(self.root_dir) if libc else None
+            if fstype in _NETWORK_FSTYPES:
+                Logger.info(f"LibraryWatcher: '{self.root_dir}' is on {fstype}, polling instead of inotify.")
+                libc = None
+            if libc is None or not self._run_inotify(libc):
+                self._run_polling()
+        except Exception as e:
+            Logger.error(f"LibraryWatcher: Stopped watching '{self.root_dir}': {e}", exc_info=True)
+
+    def _is_relevant(self, name: str, is_dir: bool) -> bool:
+        if name.startswith('.'):
+            return False
+        return is_dir or name.lower().endswith(self.extensions)
+
+    def _report(self, paths: set):
+        try:
+            self.on_changes(paths)
+        except Exception as e:
+            Logger.error(f"LibraryWatcher: Change handler failed: {e}", exc_info=True)
+
+    # --- inotify ---
+
+    def _run_inotify(self, libc) -> bool:
+        """
+        Returns False if inotify could not be set up (e.g. the watch
+        limit is too low for this library), so the caller can poll instead.
+        """
+        fd = libc.inotify_init1(_IN_NONBLOCK | _IN_CLOEXEC)
+        if fd < 0:
+            Logger.warning(f"LibraryWatcher: inotify_init1 failed ({os.strerror(ctypes.get_errno())}), polling instead.")
+            return False
+
+        watches = {} # wd -> directory path
+        def add_tree(top):
+            """Watches top and every directory below it. False if out of watches."""
+            pending = [top]
+            while pending:
+                current = pending.pop()
+                wd = libc.inotify_add_watch(fd, os.fsencode(current), _WATCH_MASK)
+                if wd < 0:
+                    err = ctypes.get_errno()
+                    if err == 28: # ENOSPC: max_user_watches reached
+                        return False
+                    continue # Vanished or unreadable, skip it
+                watches[wd] = current
+                try:
+                    with os.scandir(current) as it:
+                        for entry in it:
+                            if not entry.name.startswith('.') and entry.is_dir(follow_symlinks=False):
+                                pending.append(entry.path)
+                except OSError:
+                    continue
+            return True
+
+        try:
+            if not add_tree(self.root_dir):
+                Logger.warning("LibraryWatcher: Not enough inotify watches for this library "
+                               "(raise fs.inotify.max_user_watches), polling instead.")
+                return False
+            self.mode = 'inotify'
+            Logger.info(f"LibraryWatcher: Watching {len(watches)} folders with inotify.")
+
+            pending_paths = set()
+            while not self._stop_event.is_set():
+                # Short timeouts so stop() is noticed and bursts get flushed
+                timeout = WATCH_DEBOUNCE if pending_paths else 0.5
+                ready, _, _ = select.select([fd], [], [], timeout)
+                if not ready:
+                    if pending_paths:
+                        self._report(pending_paths)
+                        pending_paths = set()
+                    continue
+
+                try:
+                    data = os.read(fd, 64 * 1024)
+                except BlockingIOError:
+                    continue
+                offset = 0
+                while offset + _EVENT_HEADER.size <= len(data):
+                    wd, mask, _, name_len = _EVENT_HEADER.unpack_from(data, offset)
+                    offset += _EVENT_HEADER.size
+                    name = os.fsdecode(data[offset:offset + name_len].rstrip(b'\0'))
+                    offset += name_len
+
+                    if mask & _IN_Q_OVERFLOW:
+                        # Events were lost, let the consumer re-check everything
+                        Logger.warning("LibraryWatcher: inotify queue overflowed, reporting full root.")
+                        pending_paths.add(self.root_dir)
+                        continue
+                    if mask & _IN_IGNORED:
+                        watches.pop(wd, None)
+                        continue
+                    parent = watches.get(wd)
+                    if parent is None:
+                        continue
+                    if mask & _IN_DELETE_SELF:
+                        pending_paths.add(parent)
+                        continue
+
+                    is_dir = bool(mask & _IN_ISDIR)
+                    if not name or not self._is_relevant(name, is_dir):
+                        continue
+                    path = os.path.join(parent, name)
+                    if is_dir and mask & _IN_MOVED_FROM:
+                        # Its watches would keep reporting the old path
+                        prefix = path + os.sep
+                        for old_wd, old_path in list(watches.items()):
+                            if old_path == path or old_path.startswith(prefix):
+                                libc.inotify_rm_watch(fd, old_wd)
+                    elif is_dir and mask & (_IN_CREATE | _IN_MOVED_TO):
+                        if not add_tree(path):
+                            Logger.warning("LibraryWatcher: Ran out of inotify watches, new folders will be missed.")
+                    pending_paths.add(path)
+            return True
+        finally:
+            os.close(fd)
+
+    # --- Polling fallback ---
+
+    def _snapshot(self, known: dict, full: bool) -> dict:
+        """
+        Returns {folder: (mtime_ns, {path: (mtime_ns, size)})} for every
+        folder. Files are only stat()ed in folders whose mtime differs from
+        known (or in all of them when full); the rest keep their old entries.
+        """
+        found = {}
+        pending = [self.root_dir]
+        while pending:
+            current = pending.pop()
+            try:
+                mtime = os.stat(current).st_mtime_ns
+                old = known.get(current)
+                recheck = full or old is None or old[0] != mtime
+                files = {}
+                with os.scandir(current) as it:
+                    for entry in it:
+                        try:
+                            is_dir = entry.is_dir(follow_symlinks=False)
+                            if not self._is_relevant(entry.name, is_dir):
+                                continue
+                            if is_dir:
+                                pending.append(entry.path)
+                            elif recheck:
+                                st = entry.stat()
+                                files[entry.path] = (st.st_mtime_ns, st.st_size)
+                            else:
+                                files[entry.path] = old[1].get(entry.path)
+                        except OSError:
+                            continue
+                found[current] = (mtime, files)
+            except OSError:
+                continue
+        return found
+
+    def _run_polling(self):
+        self.mode = 'polling'
+        started = time.monotonic()
+        known = self._snapshot({}, full=True)
+        took = time.monotonic() - started
+        Logger.info(f"LibraryWatcher: Polling '{self.root_dir}' ({len(known)} folders, "
+                    f"{took:.1f}s per pass).")
+        passes = 0
+        while not self._stop_event.wait(max(POLL_INTERVAL, took * POLL_LOAD_FACTOR)):
+            passes += 1
+            started = time.monotonic()
+            current = self._snapshot(known, full=passes % POLL_FULL_EVERY == 0)
+            took = time.monotonic() - started
+            changed = set()
+            for folder, (mtime, files) in current.items():
+                old = known.get(folder)
+                if old is None:
+                    changed.add(folder) # New folder, the consumer walks it
+                else:
+                    old_files = old[1]
+                    changed.update(path for path, sig in files.items() if old_files.get(path) != sig)
+                    changed.update(old_files.keys() - files.keys())
+            changed.update(known.keys() - current.keys())
+            known = current
+            if changed:
+                self._report(changed)
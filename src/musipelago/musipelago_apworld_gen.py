@@ -1,7 +1,14 @@
 # -*- coding: utf-8 -*-
-import os, sys, json, zipfile, ctypes
-import requests, threading, hashlib, shutil
+import os, sys, json, zipfile, ctypes, multiprocessing
+import requests, threading, shutil, time
 import dataclasses
+from collections import OrderedDict
+
+if __name__ == '__main__':
+    # Frozen builds start Local Files scan workers by re-running this
+    # executable. Hand them off before Kivy is imported below, or every
+    # worker would open a window. No-op when not frozen.
+    multiprocessing.freeze_support()
 
 from musipelago.utils import resource_path
 from kivy.logger import Logger
@@ -72,24 +79,18 @@ from musipelago.backends import (
     AbstractMusicBackend, AbstractPluginHost
 )
 from musipelago.plugin_loader import PluginManager
+from musipelago.image_cache import ImageCache, url_cache_key
 # Not necessary per se, but fixes PyInstaller build
 # import musipelago.client_ui_components
 
 
 class AsyncImageWithHeaders(Image):
     web_source = StringProperty(None)
-    _cache_dir = ''
-    _cache_path = ''
+    _web_url = ''
     _headers = {} # Will be set by the app after login
 
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
-        if not AsyncImageWithHeaders._cache_dir:
-            app_dir = App.get_running_app().user_data_dir
-            AsyncImageWithHeaders._cache_dir = os.path.join(app_dir, 'image_cache')
-            if not os.path.exists(AsyncImageWithHeaders._cache_dir):
-                os.makedirs(AsyncImageWithHeaders._cache_dir)
-        
         # Set default headers
         if not AsyncImageWithHeaders._headers:
              AsyncImageWithHeaders._headers['User-Agent'] = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
@@ -101,34 +102,32 @@ class AsyncImageWithHeaders(Image):
             return
         
         if url.startswith('http://') or url.startswith('https://'):
-            filename = hashlib.md5(url.encode('utf-8')).hexdigest() + '.jpg'
-            self._cache_path = os.path.join(AsyncImageWithHeaders._cache_dir, filename)
-
-            if os.path.exists(self._cache_path):
-                self.source = self._cache_path
+            self._web_url = url
+            cached_path = ImageCache.shared().lookup(url_cache_key(url))
+            if cached_path:
+                self.source = cached_path
             else:
                 self.source = KIVY_ICON
-                thread = threading.Thread(target=self._download_image, args=(url, self._cache_path))
+                thread = threading.Thread(target=self._download_image, args=(url,), daemon=True)
                 thread.start()
         else:
             self.source = url
 
-    def _download_image(self, url, cache_path):
+    def _download_image(self, url):
         try:
-            response = requests.get(url, headers=self._headers, stream=True)
+            response = requests.get(url, headers=self._headers, timeout=15)
             if response.status_code == 200:
-                with open(cache_path, 'wb') as f:
-                    response.raw.decode_content = True
-                    shutil.copyfileobj(response.raw, f)
-                Clock.schedule_once(lambda dt: self._set_source(cache_path))
+                cached_path = ImageCache.shared().put(response.content, keys=[url_cache_key(url)])
+                Clock.schedule_once(lambda dt: self._set_source(url, cached_path))
             else:
                 Logger.error(f"ImageDownloader: Failed {url}, status {response.status_code}")
         except Exception as e:
             Logger.error(f"ImageDownloader: Exception for {url}: {e}")
     
-    def _set_source(self, cache_path):
-        if self._cache_path == cache_path:
-            self.source = cache_path
+    def _set_source(self, url, cached_path):
+        # The widget may have been recycled for another album meanwhile
+        if self._web_url == url:
+            self.source = cached_path
     
     @classmethod
     def set_http_headers(cls, headers: dict):
@@ -356,6 +355,8 @@ class GeneratePopup(Popup):
             display_data_list = None # Default to None
             if app.backend.client_requires_display_data():
                 Logger.info("Generate: Backend requires display_data. Serializing...")
+                Clock.schedule_once(lambda dt: setattr(app.root, 'status_text', "Preparing album data for the client..."))
+                app.backend.prepare_display_data(self.apworld_data)
                 display_data_list = []
                 for album in self.apworld_data:
                     album_dict = dataclasses.asdict(album)
@@ -524,12 +525,12 @@ class CustomListItem(BoxLayout):
             # This backend call returns a list of *fully populated* GenericAlbum objects
             all_populated_albums = app.backend.get_all_artist_albums(artist)
             
-            Clock.schedule_once(lambda dt: setattr(app.root, 'status_text', f"Found {len(all_populated_albums)} albums. Adding to list..."))
-            
-            for album in all_populated_albums:
-                Clock.schedule_once(lambda dt, a=album: self._add_data_to_apworld_list(a))
-            
-            Clock.schedule_once(lambda dt: setattr(app.root, 'status_text', f"Finished adding albums for '{artist.name}'."))
+            def add_all(dt):
+                added = app.root.ids.list_container.add_apworld_items(all_populated_albums)
+                app.root.status_text = f"Added {added} of {len(all_populated_albums)} albums for '{artist.name}'."
+
+            # One batched update, the APWorld list is rebuilt once
+            Clock.schedule_once(add_all)
         except Exception as e:
             Logger.error(f"APWorld: Failed to get all albums for {artist.uri}: {e}")
             Clock.schedule_once(lambda dt: setattr(app.root, 'status_text', f"Failed to get albums for '{artist.name}'"))
@@ -590,6 +591,37 @@ class ListContainer(BoxLayout):
         self.apworld_data.append(album_data)
         App.get_running_app().root.status_text = f"Added '{album_data.title}' to APWorld."
 
+    def add_apworld_items(self, albums: list[GenericAlbum]) -> int:
+        """
+        Appends every album not already in the list, in order, with a
+        single rebuild of the visual list. Returns how many were added.
+        """
+        known = {item.uri for item in self.apworld_data}
+        new_items = []
+        for album in albums:
+            if album.uri in known:
+                continue
+            known.add(album.uri)
+            new_items.append(album)
+        if new_items:
+            # extend() triggers on_apworld_data once
+            self.apworld_data.extend(new_items)
+        Logger.info(f"APWorld: Added {len(new_items)} of {len(albums)} items.")
+        return len(new_items)
+
+    def update_apworld_item(self, album_data: GenericAlbum) -> bool:
+        """
+        Replaces the item with the same URI, keeping its position.
+        Returns False if the album is not in the list.
+        """
+        for i, item in enumerate(self.apworld_data):
+            if item.uri == album_data.uri:
+                # Item assignment triggers on_apworld_data
+                self.apworld_data[i] = album_data
+                Logger.info(f"APWorld: Updated '{album_data.title}'.")
+                return True
+        return False
+
     def remove_apworld_item(self, item_uri):
         item_to_remove = next((item for item in self.apworld_data if item.uri == item_uri), None)
         
@@ -619,6 +651,12 @@ class ListContainer(BoxLayout):
             })
         self.list_two_data = visual_list
 
+# --- Search as you type ---
+SEARCH_DEBOUNCE = 0.35 # Seconds of no typing before the search runs
+SEARCH_MIN_CHARS = 2 # Shorter queries only run from the Search button
+SEARCH_CACHE_SIZE = 64 # Result pages kept, least recently used dropped first
+SEARCH_CACHE_TTL = 300.0 # Seconds a cached page is reused
+
 class RootLayout(BoxLayout):
     status_text = StringProperty("App started. Ready.")
     current_search_query = ""
@@ -626,23 +664,59 @@ class RootLayout(BoxLayout):
     current_search_offset = 0
     search_limit = 20
 
+    def __init__(self, **kwargs):
+        # Set before super(), the kv rules bind on_text while it runs.
+        # The generation is bumped by every new search. Responses carry the
+        # one they were started with and are dropped if a newer search has
+        # begun, so a slow old query can't overwrite a newer one's results.
+        self._search_generation = 0
+        self._search_cache = OrderedDict() # (query, type, offset) -> (time, results)
+        self._typing_trigger = Clock.create_trigger(self._on_typing_settled, SEARCH_DEBOUNCE)
+        self._typed = ("", "")
+        super().__init__(**kwargs)
+
+    def on_search_text(self, search_text, search_type):
+        """Called on every keystroke and type change, runs the search once typing pauses."""
+        self._typed = (search_text, search_type)
+        # cancel() + call restarts the countdown, a bare call wouldn't
+        self._typing_trigger.cancel()
+        self._typing_trigger()
+
+    def _on_typing_settled(self, dt):
+        search_text, search_type = self._typed
+        query = search_text.strip()
+        if (query, search_type) == (self.current_search_query.strip(), self.current_search_type):
+            return
+        if not query and not self.current_search_query:
+            return # Nothing was searched, leave the plugin's page alone
+        if query and len(query) < SEARCH_MIN_CHARS:
+            return
+        self.on_search_click(search_text, search_type)
+
     def on_search_click(self, search_text, search_type):
         app = App.get_running_app()
+        self._typing_trigger.cancel()
 
         if app.backend and app.backend.is_authenticated:
+            # Whatever is still in flight is now stale
+            self._search_generation += 1
+
+            if not search_text.strip() and app.plugin_host_ui:
+                # An empty search returns to the plugin's start page
+                self.current_search_query = ""
+                app.plugin_host_ui.setup_ui()
+                self.status_text = "Search cleared."
+                return
+
             Logger.info(f"Search: Searching for '{search_text}' in '{search_type}'")
-            self.status_text = f"Searching for '{search_text}'..."
             
             # Reset state
             self.current_search_query = search_text
             self.current_search_type = search_type
             self.current_search_offset = 0
             
-            # Clear list
-            self.ids.list_container.list_one_data = []
-            
-            # Start search at offset 0
-            threading.Thread(target=self._search_thread, args=(search_text, search_type, 0)).start()
+            # The current list stays until the results replace it
+            self._start_search_page(0)
         else:
             # ... (error handling) ...
             pass
@@ -651,24 +725,56 @@ class RootLayout(BoxLayout):
         """Called when 'Load More' is clicked."""
         self.current_search_offset += self.search_limit
         self.status_text = f"Loading page {int(self.current_search_offset/self.search_limit) + 1}..."
-        
+        self._start_search_page(self.current_search_offset)
+
+    def _start_search_page(self, offset):
+        """Shows a page of the current search, from the cache or in a thread."""
+        query, search_type = self.current_search_query, self.current_search_type
+        key = (query.strip().lower(), search_type, offset)
+        cached = self._search_cache.get(key)
+        if cached is not None and time.monotonic() - cached[0] < SEARCH_CACHE_TTL:
+            self._search_cache.move_to_end(key)
+            self._update_search_list(cached[1], search_type, offset, self._search_generation)
+            return
+
+        if offset == 0:
+            self.status_text = f"Searching for '{query}'..."
         threading.Thread(
-            target=self._search_thread, 
-            args=(self.current_search_query, self.current_search_type, self.current_search_offset)
+            target=self._search_thread,
+            args=(query, search_type, offset, self._search_generation),
+            daemon=True
         ).start()
 
-    def _search_thread(self, search_text, search_type, offset):
+    def clear_search_cache(self):
+        """Forgets cached results, e.g. after logging into another backend."""
+        self._search_cache.clear()
+
+    def _search_thread(self, search_text, search_type, offset, generation):
         app = App.get_running_app()
         try:
             # Call backend with offset
             results = app.backend.search(search_text, search_type, limit=self.search_limit, offset=offset)
             
-            Clock.schedule_once(lambda dt: self._update_search_list(results, search_type, offset))
+            def apply(dt):
+                # Cached even when stale, going back to this query is then instant
+                key = (search_text.strip().lower(), search_type, offset)
+                self._search_cache[key] = (time.monotonic(), results)
+                self._search_cache.move_to_end(key)
+                while len(self._search_cache) > SEARCH_CACHE_SIZE:
+                    self._search_cache.popitem(last=False)
+                self._update_search_list(results, search_type, offset, generation)
+            Clock.schedule_once(apply)
         except Exception as e:
             Logger.error(f"Search failed: {e}")
-            Clock.schedule_once(lambda dt: setattr(self, 'status_text', "Search failed. See log."))
-
-    def _update_search_list(self, results, search_type, offset):
+            def report(dt):
+                if generation == self._search_generation:
+                    self.status_text = "Search failed. See log."
+            Clock.schedule_once(report)
+
+    def _update_search_list(self, results, search_type, offset, generation):
+        if generation != self._search_generation:
+            Logger.debug(f"Search: Dropped stale results for generation {generation}.")
+            return
         new_data = []
         
         # Convert results to UI dicts (Standard logic)
@@ -707,8 +813,8 @@ class RootLayout(BoxLayout):
 
         # --- MODIFIED PAGINATION LOGIC ---
         
-        # 2. Get current list
-        current_list = list(self.ids.list_container.list_one_data)
+        # 2. Get current list, a first page replaces it
+        current_list = list(self.ids.list_container.list_one_data) if offset > 0 else []
         
         # 3. Remove old "Load More" button if present
         if current_list and current_list[-1]['list_id'] == 'load_more_button':
@@ -802,6 +908,8 @@ class MusipelagoAPWGenApp(App):
 
     def on_start(self):
         self.login_popup = LoginPopup(app_instance=self)
+        # Opens the shared image cache now so its cleanup runs in the background
+        ImageCache.shared()
         
         backend_names = self.plugin_manager.get_available_backends(
             app_type_key="generator_backend"
@@ -855,10 +963,17 @@ class MusipelagoAPWGenApp(App):
             return
             
         # 2. Create an instance and initialize it
+        self.root.clear_search_cache()
+        if self.plugin_host_ui:
+            self.plugin_host_ui.teardown()
         self.plugin_host_ui = UIHostClass()
         self.plugin_host_ui.initialize(self.root, self.backend)
         # --- END NEW UI SETUP ---
             
+    def on_stop(self):
+        if self.plugin_host_ui:
+            self.plugin_host_ui.teardown()
+
     def on_login_failure(self, error_message):
         Window.restore()
         if self.login_popup:
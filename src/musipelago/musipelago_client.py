@@ -1,6 +1,6 @@
 # -*- coding: utf-8 -*-
 import os, sys, json, traceback, logging, uuid, ctypes
-import requests, threading, hashlib, shutil
+import requests, threading
 
 # --- KIVY IMPORTS ---
 from musipelago.utils import resource_path
@@ -83,8 +83,9 @@ from musipelago.utils_client import (
 )
 from musipelago.plugin_loader import PluginManager
 from musipelago.vlc_audio_player import GenericAudioPlayer
+from musipelago.image_cache import ImageCache, url_cache_key
 from musipelago.backends import (
-    GenericAlbum, GenericArtist, GenericPlaylist, GenericTrack
+    GenericAlbum, GenericArtist, GenericPlaylist, GenericTrack, TrackProgress
 )
 
 # --- Set global exception hook ---
@@ -96,37 +97,31 @@ logging.getLogger('websockets').setLevel(logging.INFO)
 
 # --- AsyncImageWithHeaders ---
 class AsyncImageWithHeaders(Image):
-    web_source = StringProperty(None); _cache_dir = ''; _cache_path = ''; _headers = {}
+    web_source = StringProperty(None); _web_url = ''; _headers = {}
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
-        if not AsyncImageWithHeaders._cache_dir:
-            app_dir = App.get_running_app().user_data_dir
-            AsyncImageWithHeaders._cache_dir = os.path.join(app_dir, 'image_cache')
-            if not os.path.exists(AsyncImageWithHeaders._cache_dir): os.makedirs(AsyncImageWithHeaders._cache_dir)
         if not AsyncImageWithHeaders._headers:
              AsyncImageWithHeaders._headers['User-Agent'] = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
     def on_web_source(self, instance, url):
         if not url: self.source = KIVY_ICON; return
         if url.startswith('http://') or url.startswith('https://'):
-            filename = hashlib.md5(url.encode('utf-8')).hexdigest() + '.jpg'
-            self._cache_path = os.path.join(AsyncImageWithHeaders._cache_dir, filename)
-            if os.path.exists(self._cache_path): self.source = self._cache_path
+            self._web_url = url
+            cached_path = ImageCache.shared().lookup(url_cache_key(url))
+            if cached_path: self.source = cached_path
             else:
                 self.source = KIVY_ICON
-                threading.Thread(target=self._download_image, args=(url, self._cache_path)).start()
+                threading.Thread(target=self._download_image, args=(url,), daemon=True).start()
         else: self.source = url
-    def _download_image(self, url, cache_path):
+    def _download_image(self, url):
         try:
-            response = requests.get(url, headers=self._headers, stream=True)
+            response = requests.get(url, headers=self._headers, timeout=15)
             if response.status_code == 200:
-                with open(cache_path, 'wb') as f:
-                    response.raw.decode_content = True
-                    shutil.copyfileobj(response.raw, f)
-                Clock.schedule_once(lambda dt: self._set_source(cache_path))
+                cached_path = ImageCache.shared().put(response.content, keys=[url_cache_key(url)])
+                Clock.schedule_once(lambda dt: self._set_source(url, cached_path))
             else: Logger.error(f"ImageDownloader: Failed {url}, status {response.status_code}")
         except Exception as e: Logger.error(f"ImageDownloader: Exception for {url}: {e}")
-    def _set_source(self, cache_path):
-        if self._cache_path == cache_path: self.source = cache_path
+    def _set_source(self, url, cached_path):
+        if self._web_url == url: self.source = cached_path
     @classmethod
     def set_http_headers(cls, headers: dict): cls._headers = headers
 
@@ -1164,6 +1159,9 @@ class MusipelagoClientApp(App):
             self.cheat_mode = True
             Logger.info("--- CHEAT MODE ACTIVATED ---")
             
+        # Opens the shared image cache now so its cleanup runs in the background
+        ImageCache.shared()
+
         # --- NEW FLOW: Open AP Login first ---
         self.archipelago_login_popup = ArchipelagoLoginPopup(app_instance=self)
         self.archipelago_login_popup.open()
@@ -1391,10 +1389,7 @@ class MusipelagoClientApp(App):
                     track_ap_name = track_item.get('title'); track_uri = track_item.get('uri')
                     if not track_ap_name or not track_uri: continue
                     if track_uri not in self.track_progress:
-                        self.track_progress[track_uri] = {
-                            'is_finished': False, 'last_seen_progress_ms': 0,
-                            'hint_text': None, 'parent_uri': album_uri
-                        }
+                        self.track_progress[track_uri] = TrackProgress(parent_uri=album_uri)
                     self.apworld_map[track_uri] = track_ap_name
             
             Logger.info(f"Game: JSON parsed. {len(self.track_progress)} tracks to be tracked.")
@@ -1,5 +1,8 @@
 # -*- coding: utf-8 -*-
-import os, threading, hashlib, base64
+import os, threading, base64, time, multiprocessing, queue, itertools
+import urllib.parse, urllib.request
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
 
 from kivy.logger import Logger
 from kivy.clock import Clock
@@ -37,6 +40,11 @@ except ImportError:
     MutagenFile = None
 
 # --- Imports from the main application's interface ---
+from musipelago.library_index import LibraryIndex, album_group_key
+from musipelago.library_watcher import LibraryWatcher
+from musipelago.image_cache import ImageCache
+from musipelago.thumbnails import cached_thumbnails, make_thumbnails, thumbnails_for_file, content_hash
+from musipelago.scan_worker import read_track_tags, read_tags_batch, worker_main, EMPTY_TAGS
 from musipelago.backends import (
     AbstractMusicBackend, AbstractPluginHost, AbstractClientHost,
     GenericAlbum, GenericArtist, GenericPlaylist, GenericTrack
@@ -44,6 +52,615 @@ from musipelago.backends import (
 from musipelago.utils import KIVY_ICON, filter_to_ascii
 from musipelago.client_ui_components import GenericPlaybackInfo, ItemMenu
 
+# --- Scanning helpers ---
+
+VALID_AUDIO_EXTS = ('.mp3', '.flac', '.m4a', '.ogg', '.wma')
+PLAYLIST_EXTS = ('.m3u', '.m3u8')
+# Playlist entries resolved against the library index per batch
+PLAYLIST_LOOKUP_CHUNK = 500
+
+# Tag reading is dominated by file I/O (especially on network shares),
+# so a handful of threads keeps the disk busy without flooding it.
+SCAN_MAX_WORKERS = min(16, (os.cpu_count() or 1) + 4)
+SCAN_STATUS_INTERVAL = 0.25 # Seconds between status bar updates
+
+# Tag parsing itself is pure Python, so on a fast disk big rescans are
+# CPU-bound. Those are spread across worker processes instead; files are
+# sent in chunks and come back as one list of tuples per chunk.
+SCAN_PROCESS_WORKERS = os.cpu_count() or 1
+SCAN_PROCESS_CHUNK = 64
+# Starting the workers costs about a second, only worth it for big scans
+SCAN_PROCESS_MIN_FILES = 2000
+
+# Root scans are checkpointed after every batch of about this many files.
+# A checkpoint older than SCAN_CHECKPOINT_MAX_AGE is ignored, since its
+# directories may have changed since.
+SCAN_CHECKPOINT_FILES = 5000
+SCAN_CHECKPOINT_MAX_AGE = 24 * 3600
+
+def _read_track_tags(filepath: str):
+    """
+    (THREAD) Reads the tags we care about from a single audio file.
+    Returns (filepath, title, artist, album, albumartist, duration_ms, has_art).
+    Missing tags are None; a broken file just yields an untagged entry.
+    """
+    try:
+        return (filepath, *read_track_tags(filepath))
+    except Exception as e:
+        # Don't crash on one bad file, just log and continue (will fallback to filename)
+        Logger.warning(f"LocalFiles: Could not read metadata for {os.path.basename(filepath)}: {e}")
+        return (filepath, *EMPTY_TAGS)
+
+def _to_rel_uri(path: str, root_dir: str) -> str:
+    return os.path.relpath(path, root_dir).replace("\\", "/")
+
+def _index_rel_uri(path: str, root_dir: str):
+    """
+    The library index key for path, or None for files outside root_dir.
+    Those are never indexed: a root scan would never match them again.
+    """
+    try:
+        rel_path = _to_rel_uri(path, root_dir)
+    except ValueError: # On another drive (Windows)
+        return None
+    return None if rel_path == '..' or rel_path.startswith('../') else rel_path
+
+def _is_album_uri_for(album_uri: str, base_uri: str) -> bool:
+    """True if album_uri is base_uri, or base_uri with a '#n' suffix from LocalAlbumModel."""
+    if album_uri == base_uri:
+        return True
+    suffix = album_uri[len(base_uri) + 1:]
+    return album_uri.startswith(base_uri + '#') and suffix.isdigit()
+
+def _album_dir(root_dir: str, album_uri: str) -> str:
+    """
+    Absolute folder of an album URI. Only a trailing '#n' is a suffix;
+    folder names may contain '#' themselves (e.g. 'C# Minor').
+    """
+    path = os.path.normpath(os.path.join(root_dir, album_uri))
+    if os.path.isdir(path):
+        return path
+    base, sep, suffix = album_uri.rpartition('#')
+    if sep and suffix.isdigit():
+        return os.path.normpath(os.path.join(root_dir, base))
+    return path
+
+def _read_tracks_indexed(index, root_dir: str, filepaths: list, on_progress=None, use_processes=None,
+                         cancel_event=None, trust_index=False) -> list:
+    """
+    (THREAD) Returns _read_track_tags() tuples for every file in filepaths,
+    in the same order. Files whose mtime/size match the library index are
+    only stat()ed; everything else is re-read and written back to the index.
+    on_progress(done, total, cached) is called from this thread.
+    Files that vanished during the scan are dropped from the result.
+
+    use_processes forces the thread or process pool; None picks processes
+    when many files are missing from the index and there is more than one core.
+    trust_index takes indexed files as they are, without a stat() (for
+    directories a checkpointed scan already finished). Once cancel_event
+    is set the remaining files are skipped and the result is incomplete.
+    Files outside root_dir are always read and never written to the index.
+    """
+    rel_paths = [_index_rel_uri(fp, root_dir) for fp in filepaths]
+    known = index.get_entries(r for r in rel_paths if r) if index else {}
+
+    if use_processes is None:
+        use_processes = (SCAN_PROCESS_WORKERS > 1
+                         and len(filepaths) - len(known) >= SCAN_PROCESS_MIN_FILES)
+    if use_processes:
+        return _read_tracks_in_processes(index, filepaths, rel_paths, known, on_progress,
+                                         cancel_event, trust_index)
+
+    def resolve(job):
+        """Returns (info, index row to write or None, came from the index)."""
+        filepath, rel_path = job
+        if cancel_event is not None and cancel_event.is_set():
+            return None, None, False
+        entry = known.get(rel_path)
+        if trust_index and entry is not None:
+            return (filepath, *entry[2:]), None, True
+        try:
+            st = os.stat(filepath)
+        except OSError:
+            return None, None, False
+        if index and index.is_fresh(entry, st):
+            return (filepath, *entry[2:]), None, True
+        info = _read_track_tags(filepath)
+        if not index or rel_path is None:
+            return info, None, False
+        return info, (rel_path, st.st_mtime_ns, st.st_size, *info[1:]), False
+
+    results = []
+    pending_rows = []
+    total = len(filepaths)
+    cached = 0
+    with ThreadPoolExecutor(max_workers=SCAN_MAX_WORKERS) as pool:
+        for info, row, from_index in pool.map(resolve, zip(filepaths, rel_paths)):
+            if info is None:
+                continue
+            results.append(info)
+            if from_index:
+                cached += 1
+            elif row is not None:
+                pending_rows.append(row)
+                if len(pending_rows) >= 500:
+                    index.put_many(pending_rows); pending_rows = []
+            if on_progress:
+                on_progress(len(results), total, cached)
+
+    if index and pending_rows:
+        index.put_many(pending_rows)
+    return results
+
+def _read_tracks_in_processes(index, filepaths: list, rel_paths: list, known: dict, on_progress=None,
+                              cancel_event=None, trust_index=False) -> list:
+    """
+    (THREAD) Process-pool variant of _read_tracks_indexed().
+    stat() and index checks stay on threads (they are I/O); only the
+    stale files are parsed by scan_worker.read_tags_batch() in chunks.
+    Falls back to threads if the workers cannot be started.
+    """
+    def is_cancelled():
+        return cancel_event is not None and cancel_event.is_set()
+
+    def stat_or_none(job):
+        filepath, rel_path = job
+        if is_cancelled() or (trust_index and rel_path in known):
+            return None
+        try:
+            return os.stat(filepath)
+        except OSError:
+            return None
+
+    total = len(filepaths)
+    results = [None] * total
+    stale = [] # (position, stat_result)
+    cached = 0
+    with ThreadPoolExecutor(max_workers=SCAN_MAX_WORKERS) as pool:
+        for i, st in enumerate(pool.map(stat_or_none, zip(filepaths, rel_paths))):
+            entry = known.get(rel_paths[i])
+            if trust_index and entry is not None:
+                results[i] = (filepaths[i], *entry[2:])
+                cached += 1
+                continue
+            if st is None:
+                continue
+            if index and index.is_fresh(entry, st):
+                results[i] = (filepaths[i], *entry[2:])
+                cached += 1
+            else:
+                stale.append((i, st))
+
+    done = cached
+    if on_progress:
+        on_progress(done, total, cached)
+
+    pending_rows = []
+    def store(chunk, rows):
+        for (i, st), tags in zip(chunk, rows):
+            results[i] = (filepaths[i], *tags)
+            if rel_paths[i] is not None:
+                pending_rows.append((rel_paths[i], st.st_mtime_ns, st.st_size, *tags))
+
+    chunks = [stale[n:n + SCAN_PROCESS_CHUNK] for n in range(0, len(stale), SCAN_PROCESS_CHUNK)]
+    leftover = []
+    if chunks and not is_cancelled():
+        workers = min(SCAN_PROCESS_WORKERS, len(chunks))
+        Logger.info(f"LocalFiles: Reading {len(stale)} files on {workers} worker processes.")
+        # 'spawn' everywhere: forking a process that runs Kivy and
+        # SQLite threads is not safe, and Windows has nothing else.
+        ctx = multiprocessing.get_context('spawn')
+        try:
+            with ProcessPoolExecutor(max_workers=workers, mp_context=ctx) as pool:
+                # Workers are started from submit(), keep them off the Kivy __main__
+                with worker_main():
+                    futures = {
+                        pool.submit(read_tags_batch, [filepaths[i] for i, _ in chunk]): chunk
+                        for chunk in chunks
+                    }
+                for future in as_completed(futures):
+                    if is_cancelled():
+                        pool.shutdown(wait=False, cancel_futures=True)
+                        break
+                    chunk = futures.pop(future)
+                    rows, errors = future.result()
+                    for filepath, message in errors:
+                        Logger.warning(f"LocalFiles: Could not read metadata for {os.path.basename(filepath)}: {message}")
+                    store(chunk, rows)
+                    if index and len(pending_rows) >= 500:
+                        index.put_many(pending_rows); pending_rows.clear()
+                    done += len(chunk)
+                    if on_progress:
+                        on_progress(done, total, cached)
+        except (BrokenProcessPool, OSError) as e:
+            Logger.warning(f"LocalFiles: Worker processes failed ({e}), continuing on threads.")
+            # Chunks that never came back still have empty result slots
+            leftover = [chunk for chunk in chunks if results[chunk[0][0]] is None]
+
+    if leftover and not is_cancelled():
+        with ThreadPoolExecutor(max_workers=SCAN_MAX_WORKERS) as pool:
+            for chunk in leftover:
+                if is_cancelled():
+                    break
+                infos = list(pool.map(_read_track_tags, [filepaths[i] for i, _ in chunk]))
+                store(chunk, [info[1:] for info in infos])
+                done += len(chunk)
+                if on_progress:
+                    on_progress(done, total, cached)
+
+    if index and pending_rows:
+        index.put_many(pending_rows)
+    return [info for info in results if info is not None]
+
+def _walk_audio_files(root_dir: str, extensions: tuple = VALID_AUDIO_EXTS):
+    """
+    (THREAD) Yields every file with one of extensions below root_dir.
+    Uses an explicit stack with os.scandir so we never build the full
+    directory tree in memory and avoid a stat() call per entry.
+    """
+    pending = [root_dir]
+    while pending:
+        current = pending.pop()
+        try:
+            with os.scandir(current) as it:
+                entries = sorted(it, key=lambda e: e.name)
+        except OSError as e:
+            Logger.warning(f"LocalFiles: Cannot read directory {current}: {e}")
+            continue
+
+        subdirs = []
+        for entry in entries:
+            if entry.name.startswith('.'):
+                continue
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    subdirs.append(entry.path)
+                elif entry.name.lower().endswith(extensions):
+                    yield entry.path
+            except OSError:
+                continue
+        # Reversed so directories are visited in alphabetical order
+        pending.extend(reversed(subdirs))
+
+def _directory_batches(filepaths: list, batch_size: int):
+    """
+    Splits _walk_audio_files() output into batches of at least
+    batch_size files that never end in the middle of a directory.
+    (The walk yields each directory's files together.)
+    """
+    batch = []
+    for filepath in filepaths:
+        if len(batch) >= batch_size and os.path.dirname(filepath) != os.path.dirname(batch[-1]):
+            yield batch
+            batch = []
+        batch.append(filepath)
+    if batch:
+        yield batch
+
+def _checkpoint_position(filepaths: list, root_dir: str, checkpoint: str) -> int:
+    """
+    Number of leading files in filepaths that an interrupted scan
+    finished, i.e. up to and including the checkpoint directory's files.
+    0 without a checkpoint, or if that directory is gone.
+    """
+    if not checkpoint:
+        return 0
+    checkpoint_dir = os.path.normpath(os.path.join(root_dir, checkpoint))
+    for i in range(len(filepaths) - 1, -1, -1):
+        if os.path.normpath(os.path.dirname(filepaths[i])) == checkpoint_dir:
+            return i + 1
+    return 0
+
+# --- Playlist helpers ---
+
+def _iter_m3u_entries(playlist_path: str):
+    """
+    (THREAD) Streams an M3U/M3U8 playlist line by line.
+    Yields (location, extinf_title, extinf_duration_ms) per entry; the
+    #EXTINF fields are None when the entry has none. Location is the
+    raw path or URL as written in the file.
+    """
+    # M3U8 is UTF-8 by definition. Plain M3U has no declared encoding;
+    # surrogateescape round-trips any other bytes to the same path.
+    with open(playlist_path, 'r', encoding='utf-8-sig', errors='surrogateescape') as f:
+        extinf = (None, None)
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            if line.startswith('#'):
+                if line.upper().startswith('#EXTINF:'):
+                    duration, _, title = line[8:].partition(',')
+                    try:
+                        seconds = float(duration.split()[0]) if duration.strip() else -1
+                    except ValueError:
+                        seconds = -1
+                    extinf = (title.strip() or None, int(seconds * 1000) if seconds > 0 else None)
+                continue
+            yield (line, *extinf)
+            extinf = (None, None)
+
+def _resolve_playlist_entry(location: str, playlist_dir: str, root_dir: str):
+    """
+    Maps a playlist location to a track rel_path under root_dir.
+    Returns None for streams, other file types and files outside the root.
+    """
+    if location.lower().startswith('file:'):
+        location = urllib.request.url2pathname(urllib.parse.urlparse(location).path)
+    elif '://' in location:
+        return None # Web stream
+    if os.sep == '/':
+        location = location.replace('\\', '/') # Written on Windows
+    if not location.lower().endswith(VALID_AUDIO_EXTS):
+        return None
+    filepath = os.path.normpath(os.path.join(playlist_dir, location))
+    try:
+        rel_path = os.path.relpath(filepath, root_dir)
+    except ValueError:
+        return None # On another drive (Windows)
+    if rel_path == os.pardir or rel_path.startswith(os.pardir + os.sep):
+        return None
+    return rel_path.replace("\\", "/")
+
+def _split_extinf_title(title: str):
+    """'Artist - Title' as most players write it. Returns (artist, title)."""
+    if title and ' - ' in title:
+        artist, _, track_title = title.partition(' - ')
+        return artist.strip() or None, track_title.strip() or None
+    return None, title
+
+# Cover files looked for in an album folder, in order of preference
+COVER_FILENAMES = ('cover.jpg', 'cover.png', 'folder.jpg', 'album.jpg')
+# Tracks opened per album when looking for embedded art
+ART_PROBE_TRACKS = 3
+
+def _read_embedded_art(filepath: str):
+    """
+    (THREAD) Inspects the file format and extracts the embedded cover.
+    Returns (image_bytes, ext), or (None, None) if there is none.
+    """
+    try:
+        f = MutagenFile(filepath)
+        if not f: return None, None
+
+        art_data = None
+        ext = "jpg" # Default assumption
+
+        # 1. MP3 (ID3)
+        if isinstance(f, MP3) or hasattr(f, 'tags') and isinstance(f.tags, ID3):
+            if f.tags:
+                # Look for APIC frames
+                for key in f.tags.keys():
+                    if key.startswith("APIC"):
+                        pic = f.tags[key]
+                        art_data = pic.data
+                        if 'png' in pic.mime: ext = "png"
+                        break
+
+        # 2. FLAC
+        elif isinstance(f, FLAC):
+            if f.pictures:
+                for p in f.pictures:
+                    if p.type == 3: # 3 = Front Cover
+                        art_data = p.data
+                        if p.mime == "image/png": ext = "png"
+                        break
+
+        # 3. M4A (MP4)
+        elif isinstance(f, MP4):
+            # 'covr' is a list of data atoms
+            if f.tags and 'covr' in f.tags:
+                art_data = f.tags['covr'][0]
+                # M4A doesn't give mime type easily, need to sniff bytes
+                # PNG starts with 89 50 4E 47
+                if art_data.startswith(b'\x89PNG'):
+                    ext = "png"
+
+        # 4. OGG (Vorbis)
+        elif isinstance(f, OggVorbis):
+            # Vorbis stores art as a base64 encoded string in 'metadata_block_picture'
+            if 'metadata_block_picture' in f.tags:
+                try:
+                    b64_data = f.tags['metadata_block_picture'][0]
+                    binary_data = base64.b64decode(b64_data)
+                    # This binary block is actually a FLAC Picture structure
+                    pic = Picture(binary_data)
+                    art_data = pic.data
+                    if pic.mime == "image/png": ext = "png"
+                except Exception as e:
+                    Logger.warning(f"LocalFiles: OGG art decode failed: {e}")
+
+        if art_data:
+            return bytes(art_data), ext
+
+    except Exception as e:
+        Logger.warning(f"LocalFiles: Failed to extract art from {filepath}: {e}")
+
+    return None, None
+
+def _consensus(values: list) -> str:
+    values = [v for v in values if v]
+    return max(set(values), key=values.count) if values else ""
+
+# --- Album model ---
+
+def _album_key(info, root_dir: str) -> tuple:
+    """
+    The album a track info belongs to, see library_index.album_group_key().
+    Untagged tracks become one album per folder.
+    """
+    filepath, _, _, album_tag, albumartist_tag, _, _ = info
+    rel_path = _index_rel_uri(filepath, root_dir) or filepath.replace("\\", "/")
+    return album_group_key(rel_path, album_tag, albumartist_tag)
+
+class LocalAlbumModel:
+    """
+    Groups _read_track_tags() tuples into GenericAlbums and keeps them
+    current as single files are added, removed or retagged, so a change
+    on disk only rebuilds the albums it touches.
+    An album keeps its URI for as long as it stays in the same folder.
+    """
+
+    def __init__(self, root_dir: str):
+        self.root_dir = root_dir
+        self._lock = threading.Lock()
+        self._infos = {}    # filepath -> track info
+        self._groups = {}   # album key -> {filepath: track info}
+        self._uris = {}     # album key -> album URI
+        self._used_uris = set()
+        self._albums = {}   # album key -> GenericAlbum
+
+    def apply(self, updated_infos, removed_paths=()) -> dict:
+        """
+        Adds or replaces the given track infos and drops removed_paths.
+        Returns {album_uri: GenericAlbum} for every album that changed,
+        with None for albums that no longer have any tracks.
+        """
+        with self._lock:
+            touched = {} # Ordered set, keeps URI allocation deterministic
+            for filepath in removed_paths:
+                old = self._infos.pop(filepath, None)
+                if old:
+                    key = _album_key(old, self.root_dir)
+                    self._groups[key].pop(filepath, None)
+                    touched[key] = None
+            for info in updated_infos:
+                filepath = info[0]
+                old = self._infos.get(filepath)
+                if old == info:
+                    continue
+                if old:
+                    old_key = _album_key(old, self.root_dir)
+                    self._groups[old_key].pop(filepath, None)
+                    touched[old_key] = None
+                self._infos[filepath] = info
+                key = _album_key(info, self.root_dir)
+                self._groups.setdefault(key, {})[filepath] = info
+                touched[key] = None
+
+            changed = {}
+            for key in touched:
+                group = self._groups.get(key)
+                if not group:
+                    self._groups.pop(key, None)
+                    self._albums.pop(key, None)
+                    uri = self._uris.pop(key, None)
+                    if uri:
+                        self._used_uris.discard(uri)
+                        changed[uri] = None
+                    continue
+                old_uri = self._uris.get(key)
+                album = self._build_album(key, sorted(group.values(), key=lambda i: i[0]))
+                self._albums[key] = album
+                if old_uri and old_uri != album.uri:
+                    changed[old_uri] = None # Moved to another folder
+                changed[album.uri] = album
+            return changed
+
+    def albums(self) -> list[GenericAlbum]:
+        with self._lock:
+            albums = list(self._albums.values())
+        albums.sort(key=lambda a: (a.artist.casefold(), a.title.casefold()))
+        return albums
+
+    def album_for_path(self, filepath: str):
+        """The GenericAlbum holding the track at filepath, or None."""
+        with self._lock:
+            info = self._infos.get(filepath)
+            return self._albums.get(_album_key(info, self.root_dir)) if info else None
+
+    def paths_under(self, path: str) -> list[str]:
+        """Known track paths equal to or inside path (for removed folders)."""
+        prefix = path.rstrip(os.sep) + os.sep
+        with self._lock:
+            return [p for p in self._infos if p == path or p.startswith(prefix)]
+
+    def _build_album(self, key, infos: list) -> GenericAlbum:
+        folders = sorted({os.path.dirname(i[0]) for i in infos})
+        album_dir = folders[0] if len(folders) == 1 else os.path.commonpath(folders)
+
+        album_title = _consensus([i[3] for i in infos]) or os.path.basename(album_dir) or "Unknown Album"
+        album_artist = (_consensus([i[4] for i in infos])
+                        or _consensus([i[2] for i in infos])
+                        or "Unknown Artist")
+
+        # Album URI is the relative folder path. Folders holding several
+        # albums get a '#n' suffix, which the client strips to find art.
+        base_uri = _to_rel_uri(album_dir, self.root_dir)
+        album_uri = self._uris.get(key)
+        if album_uri is not None and not _is_album_uri_for(album_uri, base_uri):
+            # The album's folder changed; its old URI would point the
+            # client at the wrong folder for cover art.
+            self._used_uris.discard(album_uri)
+            album_uri = None
+        if album_uri is None:
+            album_uri = base_uri
+            suffix = 2
+            while album_uri in self._used_uris:
+                album_uri = f"{base_uri}#{suffix}"
+                suffix += 1
+            self._uris[key] = album_uri
+            self._used_uris.add(album_uri)
+
+        tracks = []
+        for filepath, title_tag, artist_tag, _, _, duration_ms, _ in infos:
+            tracks.append(GenericTrack(
+                uri=_to_rel_uri(filepath, self.root_dir),
+                title=title_tag or os.path.splitext(os.path.basename(filepath))[0],
+                artist=artist_tag or album_artist,
+                album_title=album_title,
+                duration_ms=duration_ms,
+                service='local'
+            ))
+
+        return GenericAlbum(
+            uri=album_uri,
+            title=album_title,
+            artist=album_artist,
+            image_url="",
+            total_tracks=len(tracks),
+            album_type="Album",
+            service='local',
+            tracks=tracks
+        )
+
+# Threads resolving album art in the client. Rows on screen go first,
+# everything else is worked through in list order afterwards.
+ART_WORKERS = 4
+ART_FLUSH_INTERVAL = 0.1 # Seconds between batched art updates to the UI
+
+# Read-ahead of the next queued track, so a library on a network share
+# doesn't put the share's open/first-read latency between two tracks.
+READAHEAD_DELAY = 2.0 # Seconds to leave the current track's start alone
+READAHEAD_MAX_BYTES = 32 * 1024 * 1024 # The player streams the rest anyway
+READAHEAD_CHUNK = 1024 * 1024
+
+def _read_ahead(filepath: str, cancel_event: threading.Event):
+    """
+    (THREAD) Pulls the start of filepath into the OS page cache.
+    posix_fadvise(WILLNEED) is only a hint that network filesystems may
+    ignore, so the data is also read sequentially and thrown away.
+    """
+    if cancel_event.wait(READAHEAD_DELAY):
+        return
+    start = time.monotonic()
+    total = 0
+    try:
+        with open(filepath, 'rb', buffering=0) as f:
+            if hasattr(os, 'posix_fadvise'):
+                os.posix_fadvise(f.fileno(), 0, READAHEAD_MAX_BYTES, os.POSIX_FADV_WILLNEED)
+            buffer = memoryview(bytearray(READAHEAD_CHUNK))
+            while total < READAHEAD_MAX_BYTES and not cancel_event.is_set():
+                read = f.readinto(buffer)
+                if not read:
+                    break
+                total += read
+    except OSError as e:
+        Logger.warning(f"LocalFiles: Read-ahead of {os.path.basename(filepath)} failed: {e}")
+        return
+    Logger.debug(f"LocalFiles: Read ahead {total / 1048576:.1f} MB of {os.path.basename(filepath)} "
+                 f"in {time.monotonic() - start:.2f}s")
+
 # --- Plugin-specific helper UI ---
 
 class DirectoryPickerPopup(Popup):
@@ -214,6 +831,28 @@ class LocalFilesBackendLogic(AbstractMusicBackend):
     def __init__(self, service_name_key: str, on_login_success, on_login_failure):
         super().__init__(service_name_key, on_login_success, on_login_failure)
         self.root_directory = None
+        self._library_index = None
+        # Albums from the last root scan; search results come from here
+        self.album_model = None
+        self._album_model_lock = threading.Lock()
+        # Playlist files under the root, found on the first playlist search
+        # and kept current by the library watcher
+        self.playlist_paths = None
+        self._playlist_counts = {} # path -> (mtime_ns, size, entry count)
+        self._playlist_lock = threading.Lock()
+
+    def get_library_index(self):
+        """
+        Returns the persistent tag index for the current root directory
+        (shared between the generator and the client), or None if it
+        could not be opened.
+        """
+        if self._library_index is None and self.root_directory:
+            try:
+                self._library_index = LibraryIndex.for_root(self.root_directory)
+            except Exception as e:
+                Logger.error(f"LocalFilesBackend: Could not open library index: {e}")
+        return self._library_index
 
     def get_login_ui(self) -> object:
         """
@@ -254,16 +893,223 @@ class LocalFilesBackendLogic(AbstractMusicBackend):
         # Call success on the main thread
         Clock.schedule_once(lambda dt: self.on_login_success(user_data))
 
-    # --- Abstract Method Stubs ---
+    # --- Search ---
 
-    def search(self, query: str, search_type: str, limit: int = 20):
-        Logger.info(f"LocalFilesBackend: Searching... (not implemented)")
-        return []
+    def get_album_model(self):
+        """
+        (THREAD) Returns the album model, building it from the library
+        index if no root scan has run yet this session. That index is as
+        current as the last scan; "Scan Root Directory" refreshes it.
+        """
+        with self._album_model_lock:
+            if self.album_model is None:
+                index = self.get_library_index()
+                if index is None:
+                    return None
+                model = LocalAlbumModel(self.root_directory)
+                model.apply(
+                    (self._to_filepath(rel_path), *entry[2:])
+                    for rel_path, entry in sorted(index.all_entries().items())
+                )
+                self.album_model = model
+            return self.album_model
+
+    def _to_filepath(self, rel_path: str) -> str:
+        # Same form as the paths _walk_audio_files() yields
+        return os.path.join(self.root_directory, *rel_path.split('/'))
+
+    def _albums_for_tracks(self, rel_paths: list[str]) -> list[GenericAlbum]:
+        """Maps track rel_paths to their albums, dropping duplicates, in order."""
+        model = self.get_album_model()
+        if model is None:
+            return []
+        albums = {}
+        for rel_path in rel_paths:
+            album = model.album_for_path(self._to_filepath(rel_path))
+            if album is not None:
+                albums.setdefault(album.uri, album)
+        return list(albums.values())
+
+    def search(self, query: str, search_type: str, limit: int = 20, offset: int = 0):
+        """
+        (THREAD) Full-text search over the library index. Needs the
+        library to have been scanned once (in this or an earlier session).
+        """
+        index = self.get_library_index()
+        if index is None:
+            return []
+        start = time.perf_counter()
+        if search_type == 'album':
+            results = self._albums_for_tracks(index.search_albums(query, limit, offset))
+        elif search_type == 'artist':
+            results = [
+                GenericArtist(
+                    uri=name,
+                    name=name,
+                    image_url="",
+                    service='local',
+                    metadata={'album_count': album_count, 'genres': []}
+                )
+                for name, album_count in index.search_artists(query, limit, offset)
+            ]
+        elif search_type == 'playlist':
+            results = [self._playlist_for_path(path)
+                       for path in self._search_playlists(query)[offset:offset + limit]]
+        else:
+            results = []
+        Logger.info(f"LocalFilesBackend: Search '{query}' ({search_type}) found {len(results)} "
+                    f"in {(time.perf_counter() - start) * 1000:.1f}ms")
+        return results
+
+    def _search_playlists(self, query: str) -> list[str]:
+        """(THREAD) Paths of playlist files whose path contains every word of query."""
+        with self._playlist_lock:
+            playlist_paths = self.playlist_paths
+        if playlist_paths is None:
+            playlist_paths = list(_walk_audio_files(self.root_directory, PLAYLIST_EXTS))
+            with self._playlist_lock:
+                self.playlist_paths = playlist_paths
+        terms = query.casefold().split()
+        return [path for path in playlist_paths
+                if all(term in _to_rel_uri(path, self.root_directory).casefold() for term in terms)]
+
+    def forget_playlist_paths(self):
+        with self._playlist_lock:
+            self.playlist_paths = None
+
+    def update_playlist_paths(self, changed_paths):
+        """
+        (THREAD) Applies library watcher changes (files or folders, added
+        or removed) to playlist_paths, so playlist search sees new and
+        deleted playlists without a rescan.
+        """
+        with self._playlist_lock:
+            if self.playlist_paths is None:
+                return # Walked on the next playlist search anyway
+            playlist_paths = set(self.playlist_paths)
+        for path in changed_paths:
+            prefix = path.rstrip(os.sep) + os.sep
+            playlist_paths -= {p for p in playlist_paths if p == path or p.startswith(prefix)}
+            if os.path.isdir(path):
+                playlist_paths.update(_walk_audio_files(path, PLAYLIST_EXTS))
+            elif path.lower().endswith(PLAYLIST_EXTS) and os.path.isfile(path):
+                playlist_paths.add(path)
+        with self._playlist_lock:
+            if self.playlist_paths is not None:
+                self.playlist_paths = sorted(playlist_paths)
+            for path in self._playlist_counts.keys() - playlist_paths:
+                del self._playlist_counts[path]
+
+    def _playlist_entry_count(self, path: str) -> int:
+        """
+        (THREAD) Number of entries in a playlist file. Counting means
+        reading the whole file, so counts are kept per (mtime, size).
+        """
+        st = os.stat(path)
+        with self._playlist_lock:
+            cached = self._playlist_counts.get(path)
+        if cached and cached[:2] == (st.st_mtime_ns, st.st_size):
+            return cached[2]
+        entry_count = sum(1 for _ in _iter_m3u_entries(path))
+        with self._playlist_lock:
+            self._playlist_counts[path] = (st.st_mtime_ns, st.st_size, entry_count)
+        return entry_count
+
+    def _playlist_for_path(self, path: str) -> GenericPlaylist:
+        rel_path = _to_rel_uri(path, self.root_directory)
+        try:
+            entry_count = self._playlist_entry_count(path)
+        except OSError as e:
+            Logger.warning(f"LocalFilesBackend: Could not read playlist {rel_path}: {e}")
+            entry_count = 0
+        return GenericPlaylist(
+            uri=rel_path,
+            name=os.path.splitext(os.path.basename(path))[0],
+            owner=os.path.dirname(rel_path) or "Library root",
+            image_url="",
+            total_tracks=entry_count,
+            service='local'
+        )
 
     def get_album_with_tracks(self, album: GenericAlbum): return album
-    def get_playlist_with_tracks(self, playlist: GenericPlaylist): return None
-    def get_all_artist_albums(self, artist: GenericArtist): return []
-    def get_artist_albums_for_display(self, artist: GenericArtist): return []
+
+    def get_playlist_with_tracks(self, playlist: GenericPlaylist):
+        """
+        (THREAD) Reads an M3U/M3U8 playlist into an album-like container.
+        Entries are streamed from the file and looked up in the library
+        index in batches; audio files are never opened. Entries the index
+        doesn't know fall back to their #EXTINF info and file name.
+        """
+        root_dir = self.root_directory
+        playlist_path = os.path.join(root_dir, *playlist.uri.split('/'))
+        playlist_dir = os.path.dirname(playlist_path)
+        index = self.get_library_index()
+
+        tracks = []
+        seen = set()
+        skipped = 0
+        def resolve(batch):
+            nonlocal skipped
+            entries = index.get_entries(rel for rel, _, _ in batch) if index else {}
+            for rel_path, extinf_title, extinf_duration in batch:
+                entry = entries.get(rel_path)
+                if entry is not None:
+                    _, _, title, artist, album_title, albumartist, duration_ms, _ = entry
+                else:
+                    # Not scanned yet (or gone): a stat is still cheaper than reading tags
+                    if not os.path.isfile(os.path.join(root_dir, *rel_path.split('/'))):
+                        skipped += 1
+                        continue
+                    artist, title = _split_extinf_title(extinf_title)
+                    album_title, albumartist, duration_ms = None, None, extinf_duration or 0
+                tracks.append(GenericTrack(
+                    uri=rel_path,
+                    title=title or os.path.splitext(os.path.basename(rel_path))[0],
+                    artist=artist or albumartist or "Unknown Artist",
+                    album_title=album_title or playlist.name,
+                    duration_ms=duration_ms,
+                    service='local'
+                ))
+
+        batch = []
+        for location, extinf_title, extinf_duration in _iter_m3u_entries(playlist_path):
+            rel_path = _resolve_playlist_entry(location, playlist_dir, root_dir)
+            if rel_path is None or rel_path in seen:
+                skipped += 1
+                continue
+            seen.add(rel_path)
+            batch.append((rel_path, extinf_title, extinf_duration))
+            if len(batch) >= PLAYLIST_LOOKUP_CHUNK:
+                resolve(batch)
+                batch = []
+        resolve(batch)
+
+        if skipped:
+            Logger.info(f"LocalFilesBackend: Playlist '{playlist.name}' skipped {skipped} entries "
+                        "(streams, duplicates, missing files or outside the root).")
+        artists = {t.artist for t in tracks}
+        return GenericAlbum(
+            uri=playlist.uri,
+            title=playlist.name,
+            artist=artists.pop() if len(artists) == 1 else "Various Artists",
+            image_url="",
+            total_tracks=len(tracks),
+            album_type="Playlist",
+            service='local',
+            tracks=tracks
+        )
+
+    def get_all_artist_albums(self, artist: GenericArtist):
+        """Every album the artist appears on, tracks included."""
+        index = self.get_library_index()
+        if index is None:
+            return []
+        albums = self._albums_for_tracks(index.artist_tracks(artist.name))
+        albums.sort(key=lambda a: a.title.casefold())
+        return albums
+
+    def get_artist_albums_for_display(self, artist: GenericArtist):
+        return self.get_all_artist_albums(artist)
 
     def get_client_data(self) -> dict:
         """
@@ -296,18 +1142,86 @@ class LocalFilesBackendLogic(AbstractMusicBackend):
         """
         return True
 
+    def prepare_display_data(self, albums: list[GenericAlbum]):
+        """
+        (THREAD) Resolves every album's cover once, at generation time,
+        into album.metadata['art']:
+            {'file': rel_path, 'hash': sha1}                external cover file
+            {'embedded': rel_path, 'hash': sha1, 'ext': e}  art inside a track
+            {}                                              no art
+        """
+        with ThreadPoolExecutor(max_workers=SCAN_MAX_WORKERS) as pool:
+            for album, art in zip(albums, pool.map(self._resolve_album_art, albums)):
+                album.metadata['art'] = art
+        Logger.info(f"LocalFilesBackend: Resolved art for {sum(1 for a in albums if a.metadata['art'])}/{len(albums)} albums.")
+
+    def _resolve_album_art(self, album: GenericAlbum) -> dict:
+        """
+        (THREAD) Same priority as the client used to apply:
+        external cover files first, then art embedded in the tracks.
+        """
+        root_dir = self.root_directory
+        album_path = _album_dir(root_dir, album.uri)
+        try:
+            names = {name.lower(): name for name in os.listdir(album_path)}
+        except OSError:
+            names = {}
+        for cover_name in COVER_FILENAMES:
+            if cover_name in names:
+                cover_path = os.path.join(album_path, names[cover_name])
+                try:
+                    with open(cover_path, 'rb') as f:
+                        cover_hash = content_hash(f.read())
+                except OSError:
+                    continue
+                return {'file': _to_rel_uri(cover_path, root_dir), 'hash': cover_hash}
+
+        if not mutagen:
+            return {}
+        index = self.get_library_index()
+        entries = index.get_entries(t.uri for t in album.tracks) if index else {}
+        attempts = 0
+        for track in album.tracks:
+            filepath = os.path.normpath(os.path.join(root_dir, track.uri))
+            entry = entries.get(track.uri)
+            # Skip files the index says have no art (if it is up to date)
+            if entry is not None and not entry[7]:
+                try:
+                    if index.is_fresh(entry, os.stat(filepath)):
+                        continue
+                except OSError:
+                    pass
+            art_data, ext = _read_embedded_art(filepath)
+            if art_data:
+                return {'embedded': track.uri, 'hash': content_hash(art_data), 'ext': ext}
+            attempts += 1
+            if attempts >= ART_PROBE_TRACKS:
+                break
+        return {}
+
 class LocalFilesHostUI(AbstractPluginHost):
     
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
         self._temp_track_info = []
         self._temp_chosen_dir = ""
+        self._root_scan_running = False
+        self._scan_cancel = threading.Event()
+        self._dir_scan_cancel = threading.Event()
+        self.scanned_albums = []
+        self.library_watcher = None
+        # Held while the watcher is created or dropped, so a teardown()
+        # racing the start of a root scan can't miss a watcher being started
+        self._watcher_lock = threading.Lock()
+        # Changes seen while a root scan runs, applied once it is done
+        self._queued_changes = set()
+        self._changes_lock = threading.Lock()
 
     def setup_ui(self):
         # ... (implementation unchanged)
         Logger.info("LocalFilesHostUI: Setting up custom 'Local Files' UI.")
-        self.root_layout.ids.search_container.disabled = True
-        self.root_layout.ids.search_container.opacity = 0
+        self.root_layout.ids.search_container.disabled = False
+        self.root_layout.ids.search_container.opacity = 1
         custom_ui_data = [
             {
                 'text_line_1': 'Create New Album',
@@ -318,22 +1232,23 @@ class LocalFilesHostUI(AbstractPluginHost):
                 'list_id': 'local_files_action',
                 'generic_item': 'create_album_action'
             },
-            {
-                'text_line_1': 'Scan Root Directory',
-                'text_line_2': f"Scan '{self.backend.root_directory}' (Not Implemented)",
-                'text_line_3': '',
-                'text_line_4': '',
-                'image_source': KIVY_ICON,
-                'list_id': 'local_files_action',
-                'generic_item': 'scan_dir_action'
-            }
-            # ... (other actions like 'scan_dir_action' can be added here) ...
+            self._scan_action_row()
         ]
+        self._action_rows = custom_ui_data
         self.root_layout.ids.list_container.list_one_data = custom_ui_data
 
     def on_search_click(self, search_text, search_type):
         pass
 
+    def teardown(self):
+        """Stops running scans and the library watcher."""
+        self._dir_scan_cancel.set()
+        with self._watcher_lock:
+            self._scan_cancel.set()
+            watcher, self.library_watcher = self.library_watcher, None
+        if watcher:
+            watcher.stop()
+
     def on_item_menu_click(self, item_list_id: str, generic_item: any) -> bool:
         if item_list_id == 'local_files_action':
             action_id = str(generic_item)
@@ -343,8 +1258,7 @@ class LocalFilesHostUI(AbstractPluginHost):
                 return True # We handled the click
 
             elif action_id == 'scan_dir_action':
-                self.root_layout.status_text = "Scan Directory feature is not yet implemented."
-                Logger.info("UI: 'Scan Directory' (Not Implemented) clicked.")
+                self.start_root_scan()
                 return True # We handled the click
             
         return False
@@ -415,13 +1329,17 @@ class LocalFilesHostUI(AbstractPluginHost):
             
         self.root_layout.status_text = f"Scanning folder: {os.path.basename(chosen_path)}..."
         
-        # Run the scan in a background thread to keep UI responsive
-        threading.Thread(target=self._scan_dir_thread, args=(chosen_path,)).start()
+        # Run the scan in a background thread to keep UI responsive.
+        # A newly picked folder replaces a scan that is still running.
+        self._dir_scan_cancel.set()
+        self._dir_scan_cancel = threading.Event()
+        threading.Thread(target=self._scan_dir_thread, args=(chosen_path, self._dir_scan_cancel), daemon=True).start()
     # ---------------------------------------
 
-    def _scan_dir_thread(self, chosen_dir: str):
+    def _scan_dir_thread(self, chosen_dir: str, cancel_event: threading.Event):
         """
         (THREAD) Scans the directory for MP3s and reads their tags.
+        Gives up quietly once cancel_event is set.
         """
         if not mutagen:
             Logger.error("Cannot scan: 'mutagen' is not installed.")
@@ -431,45 +1349,23 @@ class LocalFilesHostUI(AbstractPluginHost):
         track_info_list = [] # Stores (filepath, title_tag, artist_tag, duration_ms)
         album_tags = []
         artist_tags = []
-        valid_exts = ('.mp3', '.flac', '.m4a', '.ogg', '.wma')
 
         try:
-            for filename in os.listdir(chosen_dir):
-                # --- 2. CHECK EXTENSION ---
-                if not filename.lower().endswith(valid_exts):
-                    continue
-                
-                filepath = os.path.join(chosen_dir, filename)
-                
-                title_tag = None
-                artist_tag = None
-                duration_ms = 0
-                
-                try:
-                    # --- 3. USE GENERIC LOADER ---
-                    # mutagen.File detects format from header/extension.
-                    # easy=True normalizes keys to 'title', 'artist', 'album' regardless of format.
-                    audio = MutagenFile(filepath, easy=True)
-                    
-                    if audio:
-                        # Extract Tags (if present)
-                        # Mutagen returns lists for tags, e.g. ['Title']
-                        if 'title' in audio:
-                            title_tag = audio['title'][0]
-                        if 'artist' in audio:
-                            artist_tag = audio['artist'][0]
-                            artist_tags.append(artist_tag)
-                        if 'album' in audio:
-                            album_tags.append(audio['album'][0])
-                        
-                        # Extract Duration
-                        # audio.info.length is standard across all mutagen types (in seconds)
-                        if audio.info and audio.info.length:
-                            duration_ms = int(audio.info.length * 1000)
-                            
-                except Exception as e:
-                    # Don't crash on one bad file, just log and continue (will fallback to filename)
-                    Logger.warning(f"LocalFiles: Could not read metadata for {filename}: {e}")
+            filepaths = [
+                os.path.join(chosen_dir, filename)
+                for filename in sorted(os.listdir(chosen_dir))
+                if filename.lower().endswith(VALID_AUDIO_EXTS)
+            ]
+            infos = _read_tracks_indexed(self.backend.get_library_index(), self.backend.root_directory, filepaths,
+                                         cancel_event=cancel_event)
+            if cancel_event.is_set():
+                return
+
+            for filepath, title_tag, artist_tag, album_tag, _, duration_ms, _ in infos:
+                if artist_tag:
+                    artist_tags.append(artist_tag)
+                if album_tag:
+                    album_tags.append(album_tag)
                 
                 track_info_list.append((filepath, title_tag, artist_tag, duration_ms))
 
@@ -478,8 +1374,8 @@ class LocalFilesHostUI(AbstractPluginHost):
                 return
 
             # Determine consensus for Album/Artist
-            consensus_album = max(set(album_tags), key=album_tags.count) if album_tags else ""
-            consensus_artist = max(set(artist_tags), key=artist_tags.count) if artist_tags else ""
+            consensus_album = _consensus(album_tags)
+            consensus_artist = _consensus(artist_tags)
             
             self._temp_track_info = track_info_list
             self._temp_chosen_dir = chosen_dir
@@ -495,6 +1391,274 @@ class LocalFilesHostUI(AbstractPluginHost):
             Logger.error(f"LocalFiles: Failed to scan directory: {e}")
             Clock.schedule_once(lambda dt: setattr(self.root_layout, 'status_text', f"Error: {e}"))
 
+    # --- ROOT DIRECTORY SCAN ---
+
+    def start_root_scan(self):
+        """
+        Scans the whole root directory and lists every album found
+        in the left pane, ready to be added to the APWorld.
+        Clicked again while a scan runs, it cancels that scan instead.
+        """
+        root_dir = self.backend.root_directory
+        if self._root_scan_running:
+            self._scan_cancel.set()
+            self.root_layout.status_text = "Cancelling scan..."
+            return
+        if not root_dir or not os.path.isdir(root_dir):
+            self.root_layout.status_text = "Error: Root directory is not available."
+            return
+        if not mutagen:
+            self.root_layout.status_text = "Error: 'mutagen' is not installed."
+            return
+
+        self.backend.forget_playlist_paths() # Found again on the next search
+        with self._watcher_lock:
+            # A watcher on this root keeps running: what it sees during the
+            # rescan is queued and applied to the new album model
+            watcher = self.library_watcher
+            if watcher and watcher.root_dir == os.path.abspath(root_dir):
+                watcher = None
+            else:
+                self.library_watcher = None
+        if watcher:
+            watcher.stop()
+
+        with self._changes_lock:
+            self._root_scan_running = True
+        self._scan_cancel = threading.Event()
+        self._refresh_scan_action()
+        self.root_layout.status_text = f"Scanning '{root_dir}'..."
+        threading.Thread(target=self._scan_root_thread, args=(root_dir, self._scan_cancel), daemon=True).start()
+
+    def _scan_action_row(self) -> dict:
+        if self._root_scan_running:
+            line_1 = 'Cancel Root Scan'
+            line_2 = "Stop the running scan, the next one resumes where it stopped"
+        else:
+            line_1 = 'Scan Root Directory'
+            line_2 = f"Scan '{self.backend.root_directory}' for albums"
+        return {
+            'text_line_1': line_1,
+            'text_line_2': line_2,
+            'text_line_3': '',
+            'text_line_4': '',
+            'image_source': KIVY_ICON,
+            'list_id': 'local_files_action',
+            'generic_item': 'scan_dir_action'
+        }
+
+    def _refresh_scan_action(self):
+        """(MAIN THREAD) Updates the scan row in place, wherever it is listed."""
+        new_row = self._scan_action_row()
+        for row in self._action_rows:
+            if row['generic_item'] == 'scan_dir_action':
+                row.update(new_row)
+        self.root_layout.ids.list_container.ids.search_rv.refresh_from_data()
+
+    def _set_status_threadsafe(self, text: str):
+        Clock.schedule_once(lambda dt: setattr(self.root_layout, 'status_text', text))
+
+    def _scan_root_thread(self, root_dir: str, cancel_event: threading.Event):
+        """
+        (THREAD) Walks the root directory, reads tags on a bounded
+        worker pool and groups the tracks into albums.
+        Files are read in batches of whole directories. After each batch
+        the last directory is checkpointed in the library index, so a
+        scan that was cancelled or died resumes after it.
+        """
+        try:
+            # Watch from the start, so files changing behind the walk are not missed
+            with self._watcher_lock:
+                if cancel_event.is_set():
+                    return # Torn down before the scan got going
+                if self.library_watcher is None:
+                    self.library_watcher = LibraryWatcher(root_dir, self._on_library_changes,
+                                                         VALID_AUDIO_EXTS + PLAYLIST_EXTS)
+                    self.library_watcher.start()
+
+            start_time = time.monotonic()
+            filepaths = []
+            last_update = start_time
+            for filepath in _walk_audio_files(root_dir):
+                if cancel_event.is_set():
+                    self._set_status_threadsafe("Scan cancelled.")
+                    return
+                filepaths.append(filepath)
+                now = time.monotonic()
+                if now - last_update >= SCAN_STATUS_INTERVAL:
+                    last_update = now
+                    self._set_status_threadsafe(f"Discovering files... {len(filepaths)} found")
+
+            total = len(filepaths)
+            if not total:
+                self._set_status_threadsafe(f"No supported audio files found in '{root_dir}'.")
+                return
+
+            index = self.backend.get_library_index()
+            checkpoint = index.get_checkpoint('', SCAN_CHECKPOINT_MAX_AGE) if index else None
+            resume_at = _checkpoint_position(filepaths, root_dir, checkpoint)
+            if resume_at:
+                Logger.info(f"LocalFiles: Resuming scan after '{checkpoint}' ({resume_at} files done).")
+
+            read_start = time.monotonic()
+            done_before = 0
+            cached_before = 0
+            def on_progress(done, _, cached):
+                nonlocal last_update
+                now = time.monotonic()
+                if now - last_update >= SCAN_STATUS_INTERVAL:
+                    last_update = now
+                    done += done_before
+                    rate = done / max(now - read_start, 1e-6)
+                    self._set_status_threadsafe(
+                        f"Reading tags... {done}/{total}, {cached + cached_before} unchanged ({rate:.0f} files/s)")
+
+            # Finished directories of an interrupted scan: straight from the index
+            track_infos = _read_tracks_indexed(index, root_dir, filepaths[:resume_at], on_progress,
+                                               trust_index=True)
+            done_before = cached_before = len(track_infos)
+            for batch in _directory_batches(filepaths[resume_at:], SCAN_CHECKPOINT_FILES):
+                infos = _read_tracks_indexed(index, root_dir, batch, on_progress, cancel_event=cancel_event)
+                if cancel_event.is_set():
+                    Logger.info(f"LocalFiles: Root scan cancelled after {done_before} files.")
+                    self._set_status_threadsafe(
+                        f"Scan cancelled after {done_before}/{total} files. Scanning again resumes from there.")
+                    return
+                track_infos.extend(infos)
+                done_before += len(batch)
+                if index:
+                    index.set_checkpoint('', _to_rel_uri(os.path.dirname(batch[-1]), root_dir))
+
+            if index:
+                index.prune({_to_rel_uri(info[0], root_dir) for info in track_infos})
+                index.clear_checkpoint('')
+
+            model = LocalAlbumModel(root_dir)
+            model.apply(track_infos)
+            albums = model.albums()
+            self.backend.album_model = model
+            elapsed = time.monotonic() - start_time
+            rate = total / max(elapsed, 1e-6)
+            Logger.info(f"LocalFiles: Root scan read {total} files into {len(albums)} albums in {elapsed:.1f}s")
+            summary = f"Scanned {total} files into {len(albums)} albums in {elapsed:.1f}s ({rate:.0f} files/s)."
+            Clock.schedule_once(lambda dt: self._show_scanned_albums(albums, summary))
+
+        except Exception as e:
+            Logger.error(f"LocalFiles: Root scan failed: {e}", exc_info=True)
+            self._set_status_threadsafe(f"Error: {e}")
+        finally:
+            with self._changes_lock:
+                self._root_scan_running = False
+                queued, self._queued_changes = self._queued_changes, set()
+            Clock.schedule_once(lambda dt: self._refresh_scan_action())
+            if queued and self.library_watcher is not None: # Not torn down
+                Logger.info(f"LocalFiles: Applying {len(queued)} changes seen during the scan.")
+                try:
+                    self._on_library_changes(queued)
+                except Exception as e:
+                    Logger.error(f"LocalFiles: Applying queued changes failed: {e}", exc_info=True)
+
+    # --- LIVE LIBRARY UPDATES ---
+
+    def _on_library_changes(self, paths: set):
+        """
+        (THREAD) Called by the LibraryWatcher with paths that changed on
+        disk. Re-reads only those files and updates the album model.
+        While a root scan runs the paths are queued; the scan applies them
+        to its new model when it finishes.
+        """
+        with self._changes_lock:
+            if self._root_scan_running:
+                self._queued_changes.update(paths)
+                return
+        self.backend.update_playlist_paths(paths)
+        model = self.backend.album_model
+        if model is None:
+            return
+        root_dir = model.root_dir
+
+        filepaths = set()
+        removed = set()
+        for path in paths:
+            if os.path.isdir(path):
+                filepaths.update(_walk_audio_files(path))
+                # Files the folder used to hold but no longer does
+                removed.update(model.paths_under(path))
+            elif os.path.isfile(path):
+                if path.lower().endswith(VALID_AUDIO_EXTS):
+                    filepaths.add(path)
+            else:
+                removed.update(model.paths_under(path))
+
+        index = self.backend.get_library_index()
+        track_infos = _read_tracks_indexed(index, root_dir, sorted(filepaths), use_processes=False)
+        removed -= {info[0] for info in track_infos}
+        if index and removed:
+            index.remove_many([_to_rel_uri(p, root_dir) for p in removed])
+
+        changed = model.apply(track_infos, removed)
+        if changed:
+            Logger.info(f"LocalFiles: {len(changed)} albums changed on disk.")
+            albums = model.albums()
+            Clock.schedule_once(lambda dt: self._on_albums_changed(albums, changed))
+
+    def _on_albums_changed(self, albums: list[GenericAlbum], changed: dict):
+        """
+        (MAIN THREAD) Refreshes the album list and updates any album in
+        the APWorld list whose files changed.
+        """
+        if self.backend.album_model is None:
+            return
+        apworld_items = {item.uri: item for item in self.root_layout.ids.list_container.apworld_data}
+        notes = []
+        for uri, album in changed.items():
+            old_item = apworld_items.get(uri)
+            if old_item is None:
+                continue
+            if album is None:
+                self.remove_from_apworld(uri)
+                notes.append(f"'{old_item.title}' was removed")
+            else:
+                self.update_apworld_item(album)
+                notes.append(f"'{album.title}' was updated")
+
+        summary = f"Library changed on disk: {len(changed)} albums updated."
+        if notes:
+            summary += " APWorld: " + ", ".join(notes) + "."
+        if self._showing_scan_list():
+            self._show_scanned_albums(albums, summary)
+        else:
+            # Search results or an artist's albums stay as they are
+            self.scanned_albums = albums
+            self.root_layout.clear_search_cache()
+            self.root_layout.status_text = summary
+
+    def _showing_scan_list(self) -> bool:
+        """True while the left pane shows our action rows (and scanned albums below them)."""
+        data = self.root_layout.ids.list_container.list_one_data
+        return bool(data) and data[0] is self._action_rows[0]
+
+    def _show_scanned_albums(self, albums: list[GenericAlbum], summary: str):
+        """
+        (MAIN THREAD) Lists the scanned albums below the action rows.
+        """
+        self.scanned_albums = albums
+        # Searches cached before the scan or change would miss albums
+        self.root_layout.clear_search_cache()
+        album_rows = []
+        for album in albums:
+            album_rows.append({
+                'text_line_1': album.title,
+                'text_line_2': album.artist,
+                'text_line_3': f"{album.album_type} • Tracks: {album.total_tracks}",
+                'text_line_4': album.uri,
+                'image_source': KIVY_ICON,
+                'list_id': 'search',
+                'generic_item': album
+            })
+        self.root_layout.ids.list_container.list_one_data = self._action_rows + album_rows
+        self.root_layout.status_text = summary
+
     def _open_create_album_popup(self, consensus_album: str, consensus_artist: str):
         """
         (MAIN THREAD) Opens the new CreateAlbumPopup.
@@ -575,6 +1739,7 @@ class LocalFilesClientHost(AbstractClientHost):
         self.current_playing_track_title = None
         self.playback_queue = []
         self.queue_index = -1
+        self._readahead_cancel = None # Event stopping the running read-ahead
         
         # UI References
         self.playback_ui = None
@@ -582,6 +1747,16 @@ class LocalFilesClientHost(AbstractClientHost):
         self.progress_bar = None
         self.poll_event = None
 
+        # Lazy album art: resolved by a small worker pool, visible rows first
+        self._art_jobs = {}    # album uri -> (art entry or None, album folder)
+        self._art_results = {} # album uri -> image path, waiting for the UI
+        self._art_lock = threading.Lock()
+        self._art_queue = queue.PriorityQueue()
+        self._art_seq = itertools.count()
+        self._art_workers = []
+        self._art_flush_trigger = Clock.create_trigger(self._flush_art_updates, ART_FLUSH_INTERVAL)
+        self._visible_art_trigger = Clock.create_trigger(self._queue_visible_art, 0.05)
+
     def setup_ui(self):
         Logger.info("LocalFilesClientHost: Setting up UI.")
         
@@ -616,14 +1791,14 @@ class LocalFilesClientHost(AbstractClientHost):
 
     def _parse_thread_target(self, display_data: list):
         """
-        (THREAD) Parses JSON and scans filesystem for artwork.
+        (THREAD) Parses JSON into the album cache. No artwork I/O happens
+        here: albums start with a placeholder and their art is resolved
+        afterwards by the art workers, rows on screen first.
         """
         root_dir = self.backend.root_directory
-        cache_dir = os.path.join(self.app.user_data_dir, 'image_cache')
-        if not os.path.exists(cache_dir):
-            os.makedirs(cache_dir)
 
         try:
+            art_jobs = {}
             for album_dict in display_data:
                 # 1. Reconstruct Tracks
                 track_objects = []
@@ -631,33 +1806,179 @@ class LocalFilesClientHost(AbstractClientHost):
                     track_objects.append(GenericTrack(**track_dict))
                 
                 # 2. Resolve Album URI to Absolute Path
+                # (root scans may add a '#n' suffix for folders holding several albums)
                 album_uri = album_dict.get('uri')
-                abs_album_path = os.path.normpath(os.path.join(root_dir, album_uri))
+                abs_album_path = _album_dir(root_dir, album_uri)
                 
-                # 3. --- NEW: SCAN FOR ARTWORK ---
-                # We look for art now, while parsing the data.
-                # This updates the 'image_url' which the UI will eventually use.
-                found_art_path = self._find_local_art(abs_album_path, cache_dir)
-                album_dict['display_image_url'] = found_art_path or KIVY_ICON
+                # 3. --- ARTWORK ---
+                # Left to the art workers, which turn the source the
+                # generator recorded into list/player thumbnails. Game
+                # files from older generators have no 'art' entry, so the
+                # workers search the folder instead. {} means no art.
+                art = album_dict.get('metadata', {}).get('art')
+                if art != {}:
+                    art_jobs[album_uri] = (art, abs_album_path)
+                album_dict['display_image_url'] = KIVY_ICON
                 # --------------------------------
                 
                 album_dict['tracks'] = track_objects
                 album_obj = GenericAlbum(**album_dict)
                 
-                # Update the object with the found art path (or default if empty)
-                album_obj.image_url = found_art_path or KIVY_ICON
+                # Placeholder until the workers have a thumbnail
+                album_obj.image_url = KIVY_ICON
 
                 # 4. Populate Cache
                 self.app.album_data_cache[album_obj.uri] = album_obj
                 self.app.ordered_album_uris.append(album_obj.uri)
 
+            self._start_art_resolution(art_jobs)
             Clock.schedule_once(self.app._populate_initial_lists)
+            Clock.schedule_once(self._watch_album_list)
             
         except Exception as e:
             Logger.error(f"LocalFilesClientHost: Threaded Parse Failed: {e}", exc_info=True)
             Clock.schedule_once(lambda dt: self.root_layout.set_status(f"Error: {e}"))
 
-    def _find_local_art(self, album_path: str, cache_dir: str) -> str:
+    # --- Lazy album art ---
+
+    def _start_art_resolution(self, art_jobs: dict):
+        """
+        (THREAD) Queues every pending album as background work, in list
+        order, and makes sure the worker pool is running.
+        """
+        with self._art_lock:
+            self._art_jobs = art_jobs
+            self._art_results = {}
+        for uri in self.app.ordered_album_uris:
+            if uri in art_jobs:
+                self._art_queue.put((1, next(self._art_seq), uri))
+        while len(self._art_workers) < min(ART_WORKERS, len(art_jobs)):
+            worker = threading.Thread(target=self._art_worker, daemon=True)
+            worker.start()
+            self._art_workers.append(worker)
+        Logger.info(f"LocalFilesClientHost: {len(art_jobs)} albums queued for art.")
+
+    def _request_art(self, album_uri: str):
+        """Moves an album to the front of the art queue (newest request first)."""
+        if album_uri in self._art_jobs:
+            self._art_queue.put((0, -next(self._art_seq), album_uri))
+
+    def _watch_album_list(self, dt=None):
+        """
+        (MAIN THREAD) Re-prioritises art whenever the album list scrolls,
+        resizes or gets new data.
+        """
+        album_rv = self.root_layout.ids.list_container.ids.album_rv
+        album_rv.unbind(scroll_y=self._visible_art_trigger, height=self._visible_art_trigger,
+                        data=self._visible_art_trigger)
+        album_rv.bind(scroll_y=self._visible_art_trigger, height=self._visible_art_trigger,
+                      data=self._visible_art_trigger)
+        self._visible_art_trigger()
+
+    def _queue_visible_art(self, dt=None):
+        """(MAIN THREAD) Puts the albums currently on screen at the front of the queue."""
+        if not self._art_jobs:
+            return
+        album_rv = self.root_layout.ids.list_container.ids.album_rv
+        layout_manager = album_rv.layout_manager
+        if not album_rv.data or layout_manager is None:
+            return
+        visible = layout_manager.compute_visible_views(album_rv.data, album_rv.get_viewport())
+        # Reversed so the top row ends up with the newest (highest) priority
+        for index in reversed(list(visible)):
+            if 0 <= index < len(album_rv.data):
+                self._request_art(album_rv.data[index].get('raw_uri'))
+
+    def _art_worker(self):
+        """(THREAD) Resolves queued albums until the app exits."""
+        while True:
+            _, _, album_uri = self._art_queue.get()
+            with self._art_lock:
+                job = self._art_jobs.pop(album_uri, None)
+            if job is None:
+                continue # Already resolved via an earlier queue entry
+            art, album_path = job
+            try:
+                thumbnails = self._resolve_album_thumbnails(art, album_path)
+            except Exception as e:
+                Logger.warning(f"LocalFilesClientHost: Art lookup failed for {album_uri}: {e}")
+                thumbnails = {}
+            if thumbnails:
+                with self._art_lock:
+                    self._art_results[album_uri] = thumbnails
+                self._art_flush_trigger()
+
+    def _flush_art_updates(self, dt=None):
+        """
+        (MAIN THREAD) Applies all art resolved since the last flush in one
+        pass, so the lists refresh at most every ART_FLUSH_INTERVAL.
+        """
+        with self._art_lock:
+            updates, self._art_results = self._art_results, {}
+        if not updates:
+            return
+
+        # Rows use the small thumbnail (display_image_url),
+        # the player the large one (image_url).
+        for album_uri, thumbnails in updates.items():
+            album = self.app.album_data_cache.get(album_uri)
+            if album:
+                album.display_image_url = thumbnails['list']
+                album.image_url = thumbnails['player']
+
+        list_container = self.root_layout.ids.list_container
+        album_rv = list_container.ids.album_rv
+        changed = False
+        for row in album_rv.data:
+            thumbnails = updates.get(row.get('raw_uri'))
+            if thumbnails:
+                row['image_source'] = row['raw_image_url'] = thumbnails['list']
+                changed = True
+        if changed:
+            album_rv.refresh_from_data()
+
+        # The open track list and the player may be showing a placeholder too
+        track_rv = list_container.ids.track_rv
+        changed = False
+        for row in track_rv.data:
+            parent_uri = self.app.track_progress.get(row.get('raw_uri'), {}).get('parent_uri')
+            if parent_uri in updates:
+                row['image_source'] = updates[parent_uri]['list']
+                changed = True
+        if changed:
+            track_rv.refresh_from_data()
+
+        if self.current_playing_track_uri and self.playback_info_widget:
+            parent_uri = self.app.track_progress.get(self.current_playing_track_uri, {}).get('parent_uri')
+            if parent_uri in updates:
+                self.playback_info_widget.art_source = updates[parent_uri]['player']
+
+    def _resolve_album_thumbnails(self, art, album_path: str) -> dict:
+        """
+        (THREAD) Returns {'list': path, 'player': path} for an album, or {}.
+        art is the entry written by LocalFilesBackendLogic.prepare_display_data().
+        Thumbnails are cached under the source image's content hash, so
+        once they exist the source is never read again.
+        """
+        root_dir = self.backend.root_directory
+        if art is None:
+            # Game file from an older generator: search the folder
+            image_path = self._find_local_art(album_path)
+            return thumbnails_for_file(image_path) if image_path else {}
+
+        image_hash = art.get('hash')
+        if image_hash:
+            cached = cached_thumbnails(image_hash)
+            if cached:
+                return cached
+        if 'file' in art:
+            return thumbnails_for_file(os.path.normpath(os.path.join(root_dir, art['file'])), image_hash)
+        if 'embedded' in art:
+            art_data, _ = _read_embedded_art(os.path.normpath(os.path.join(root_dir, art['embedded'])))
+            return make_thumbnails(art_data, image_hash) if art_data else {}
+        return {}
+
+    def _find_local_art(self, album_path: str) -> str:
         """
         Helper to find album art.
         Priority:
@@ -668,104 +1989,55 @@ class LocalFilesClientHost(AbstractClientHost):
             return ""
 
         # A. Check for External Files
-        common_names = ['cover.jpg', 'cover.png', 'folder.jpg', 'album.jpg']
         for filename in os.listdir(album_path):
-            if filename.lower() in common_names:
+            if filename.lower() in COVER_FILENAMES:
                 return os.path.join(album_path, filename)
 
         # B. Check for Embedded Art
         if not mutagen: return ""
 
         # Find any supported audio file
-        valid_exts = ('.mp3', '.flac', '.m4a', '.ogg', '.wma')
         first_audio = None
         for filename in os.listdir(album_path):
-            if filename.lower().endswith(valid_exts):
+            if filename.lower().endswith(VALID_AUDIO_EXTS):
                 first_audio = os.path.join(album_path, filename)
                 break
         
         if first_audio:
-            # Use a hash of the file path for the cache key
-            file_hash = hashlib.md5(first_audio.encode('utf-8')).hexdigest()
-            # We guess .jpg initially, but the extractor might change it
-            cached_art_path_base = os.path.join(cache_dir, file_hash)
-            
-            # Check if cached version exists (try common extensions)
-            if os.path.exists(cached_art_path_base + ".jpg"): return cached_art_path_base + ".jpg"
-            if os.path.exists(cached_art_path_base + ".png"): return cached_art_path_base + ".png"
+            # Extracted art is cached under the file it came from
+            cached_art_path = ImageCache.shared().lookup(f"embedded:{first_audio}")
+            if cached_art_path:
+                return cached_art_path
+
+            # The library index (filled by the generator's scans) knows
+            # whether the file has embedded art, so skip opening it if not.
+            index = self.backend.get_library_index()
+            if index:
+                try:
+                    entry = index.get_entry(_to_rel_uri(first_audio, self.backend.root_directory))
+                    if index.is_fresh(entry, os.stat(first_audio)) and not entry[7]:
+                        return ""
+                except OSError:
+                    pass
 
             # Attempt extraction
-            return self._extract_art_to_cache(first_audio, cached_art_path_base)
+            return self._extract_art_to_cache(first_audio)
 
         return ""
     
-    def _extract_art_to_cache(self, filepath, cache_path_base):
+    def _extract_art_to_cache(self, filepath):
         """
-        Inspects the file format and extracts binary image data.
+        Extracts the embedded cover of filepath into the image cache.
         Returns the full path to the saved image, or "" if failed.
         """
+        art_data, ext = _read_embedded_art(filepath)
+        if not art_data:
+            return ""
         try:
-            f = MutagenFile(filepath)
-            if not f: return ""
-            
-            art_data = None
-            ext = "jpg" # Default assumption
-
-            # 1. MP3 (ID3)
-            if isinstance(f, MP3) or hasattr(f, 'tags') and isinstance(f.tags, ID3):
-                if f.tags:
-                    # Look for APIC frames
-                    for key in f.tags.keys():
-                        if key.startswith("APIC"):
-                            pic = f.tags[key]
-                            art_data = pic.data
-                            if 'png' in pic.mime: ext = "png"
-                            break
-
-            # 2. FLAC
-            elif isinstance(f, FLAC):
-                if f.pictures:
-                    for p in f.pictures:
-                        if p.type == 3: # 3 = Front Cover
-                            art_data = p.data
-                            if p.mime == "image/png": ext = "png"
-                            break
-
-            # 3. M4A (MP4)
-            elif isinstance(f, MP4):
-                # 'covr' is a list of data atoms
-                if 'covr' in f.tags:
-                    art_data = f.tags['covr'][0]
-                    # M4A doesn't give mime type easily, need to sniff bytes
-                    # PNG starts with 89 50 4E 47
-                    if art_data.startswith(b'\x89PNG'):
-                        ext = "png"
-
-            # 4. OGG (Vorbis)
-            elif isinstance(f, OggVorbis):
-                # Vorbis stores art as a base64 encoded string in 'metadata_block_picture'
-                if 'metadata_block_picture' in f.tags:
-                    try:
-                        b64_data = f.tags['metadata_block_picture'][0]
-                        binary_data = base64.b64decode(b64_data)
-                        # This binary block is actually a FLAC Picture structure
-                        pic = Picture(binary_data)
-                        art_data = pic.data
-                        if pic.mime == "image/png": ext = "png"
-                    except Exception as e:
-                        Logger.warning(f"LocalFiles: OGG art decode failed: {e}")
-
-            # --- SAVE ---
-            if art_data:
-                final_path = f"{cache_path_base}.{ext}"
-                with open(final_path, 'wb') as img_f:
-                    img_f.write(art_data)
-                return final_path
-
-        except Exception as e:
-            Logger.warning(f"LocalFiles: Failed to extract art from {filepath}: {e}")
-            
-        return ""
+            return ImageCache.shared().put(art_data, keys=[f"embedded:{filepath}"], ext=ext)
+        except OSError as e:
+            Logger.warning(f"LocalFiles: Failed to cache art for {filepath}: {e}")
+            return ""
 
     def start_polling(self):
         """Starts polling the audio player for position updates."""
@@ -797,6 +2069,7 @@ class LocalFilesClientHost(AbstractClientHost):
     def on_stop_click(self):
         self.stop_polling(); self.is_playing = False; self.current_playing_track_uri = None
         self.playback_queue = []; self.queue_index = -1
+        self._cancel_readahead()
         if self.playback_info_widget:
             self.playback_info_widget.track_title = "Stopped"; self.playback_info_widget.progress_value = 0
 
@@ -843,7 +2116,7 @@ class LocalFilesClientHost(AbstractClientHost):
         # Check ownership
         prog = self.app.track_progress.get(uri)
         parent = prog.get('parent_uri') if prog else None
-        if (not parent or parent not in self.app.owned_albums) and not self.app.cheat_mode:
+        if not self._is_playable(track_obj):
             self.app.show_toast(f"Skipping unowned: {title}")
             Clock.schedule_once(lambda dt: self.on_playback_finished(), 0.1); return
             
@@ -873,6 +2146,33 @@ class LocalFilesClientHost(AbstractClientHost):
         self.current_playing_track_title = title
         self.is_playing = True
         Clock.schedule_once(lambda dt: self.start_polling(), 0.5)
+        self._start_readahead()
+
+    def _is_playable(self, track_obj: GenericTrack) -> bool:
+        prog = self.app.track_progress.get(track_obj.uri)
+        parent = prog.get('parent_uri') if prog else None
+        return self.app.cheat_mode or bool(parent and parent in self.app.owned_albums)
+
+    def _start_readahead(self):
+        """
+        Warms the next track on_playback_finished() will actually play
+        (unowned tracks are skipped there, so here too).
+        """
+        self._cancel_readahead()
+        for next_track in self.playback_queue[self.queue_index + 1:]:
+            if self._is_playable(next_track):
+                break
+        else:
+            return
+        cancel_event = threading.Event()
+        self._readahead_cancel = cancel_event
+        abs_path = os.path.normpath(os.path.join(self.backend.root_directory, next_track.uri))
+        threading.Thread(target=_read_ahead, args=(abs_path, cancel_event), daemon=True).start()
+
+    def _cancel_readahead(self):
+        if self._readahead_cancel:
+            self._readahead_cancel.set()
+            self._readahead_cancel = None
 
     def _play_track(self, track_uri: str, track_title: str):
         self.stop_polling()
@@ -944,6 +2244,7 @@ class LocalFilesClientHost(AbstractClientHost):
                 self.app.show_toast("You do not own this album yet.")
                 return
             self.root_layout.set_status(f"Loading tracks for: {list_item.raw_title}")
+            self._request_art(list_item.raw_uri)
             self.root_layout.populate_track_list(list_item.raw_uri)
         
         elif list_item.raw_item_type == 'track':
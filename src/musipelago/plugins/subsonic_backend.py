@@ -1,11 +1,18 @@
 # -*- coding: utf-8 -*-
 import os
+import json
+import time
+import sqlite3
 import threading
 import requests
 import hashlib
 import random
 import string
 import urllib.parse
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 # --- Kivy imports ---
 from kivy.app import App
@@ -20,6 +27,7 @@ from kivy.uix.textinput import TextInput
 from kivy.uix.button import Button
 from kivy.uix.spinner import Spinner
 from kivy.uix.image import Image
+from kivy.uix.popup import Popup
 
 # --- Imports from the main application's interface ---
 from musipelago.backends import (
@@ -28,6 +36,9 @@ from musipelago.backends import (
     AbstractClientHost
 )
 from musipelago.utils_client import KIVY_ICON
+from musipelago.image_cache import register_url_key_rule
+from musipelago.library_index import shared_data_dir
+from musipelago.thumbnails import THUMBNAIL_SIZES
 
 # --- Import Generic UI ---
 from musipelago.client_ui_components import GenericPlaybackInfo, ItemMenu
@@ -83,8 +94,719 @@ class SubsonicLoginUI(BoxLayout):
 
 
 # -------------------------------------------------------------------
-# 2. DATA LOGIC CLASS (Shared)
+# 2. HTTP TRANSPORT
 # -------------------------------------------------------------------
+# Distinct servers kept pooled, and connections kept open per server.
+# Album hydration and cover downloads run a few requests side by side.
+POOL_CONNECTIONS = 4
+POOL_MAXSIZE = 8
+
+# (connect, read) timeouts in seconds. Navidrome answers ping/search
+# quickly; getArtist/getAlbum on large libraries and cover art are slower.
+DEFAULT_TIMEOUT = (5, 20)
+ENDPOINT_TIMEOUTS = {
+    'ping': (5, 10),
+    'search3': (5, 15),
+    'getAlbum': (5, 20),
+    'getArtist': (5, 20),
+    'getCoverArt': (5, 30),
+    # Read timeout per chunk; a transcoder can take a while to start
+    'stream': (5, 30),
+}
+
+# Retries for connection resets and gateway errors, with exponential
+# backoff (0.5s, 1s, 2s). Only GET is used and every call is idempotent.
+RETRY_TOTAL = 3
+RETRY_BACKOFF = 0.5
+RETRY_STATUSES = (500, 502, 503, 504)
+
+# A latency summary is logged every this many requests
+STATS_LOG_EVERY = 200
+
+# getAlbum calls in flight when adding all of an artist's albums.
+# Kept below POOL_MAXSIZE so cover downloads still get a connection.
+HYDRATE_WORKERS = 6
+
+class SubsonicTransport:
+    """
+    Keep-alive HTTP transport shared by every Subsonic API call.
+    One requests.Session with a sized connection pool, so each call
+    reuses an open TCP/TLS connection instead of opening a new one.
+    Also keeps per-endpoint latency counters, see stats().
+    """
+
+    def __init__(self):
+        retry = Retry(
+            total=RETRY_TOTAL,
+            backoff_factor=RETRY_BACKOFF,
+            status_forcelist=RETRY_STATUSES,
+            allowed_methods=frozenset({'GET'}),
+            raise_on_status=False # Hand the last 5xx back instead of raising
+        )
+        adapter = HTTPAdapter(pool_connections=POOL_CONNECTIONS, pool_maxsize=POOL_MAXSIZE, max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        # Subsonic JSON compresses ~10x; requests decodes it transparently
+        self.session.headers['Accept-Encoding'] = 'gzip, deflate'
+        self._stats_lock = threading.Lock()
+        self._stats = {} # endpoint -> [requests, errors, total seconds, max seconds]
+        self._requests_since_log = 0
+
+    def get(self, server_url: str, endpoint: str, params: dict, **kwargs):
+        """
+        (THREAD) GETs {server_url}/rest/{endpoint} and returns the response.
+        Timing covers retries and the full body download.
+        """
+        kwargs.setdefault('timeout', ENDPOINT_TIMEOUTS.get(endpoint, DEFAULT_TIMEOUT))
+        start = time.perf_counter()
+        failed = True
+        try:
+            response = self.session.get(f"{server_url}/rest/{endpoint}", params=params, **kwargs)
+            failed = response.status_code >= 400
+            return response
+        finally:
+            self._record(endpoint, time.perf_counter() - start, failed)
+
+    def _record(self, endpoint: str, elapsed: float, failed: bool):
+        with self._stats_lock:
+            entry = self._stats.setdefault(endpoint, [0, 0, 0.0, 0.0])
+            entry[0] += 1
+            entry[1] += failed
+            entry[2] += elapsed
+            entry[3] = max(entry[3], elapsed)
+            self._requests_since_log += 1
+            if self._requests_since_log < STATS_LOG_EVERY:
+                return
+            self._requests_since_log = 0
+        self.log_stats()
+
+    def stats(self) -> dict:
+        """Returns {endpoint: {'requests', 'errors', 'avg_ms', 'max_ms'}}."""
+        with self._stats_lock:
+            return {
+                endpoint: {
+                    'requests': count,
+                    'errors': errors,
+                    'avg_ms': total / count * 1000,
+                    'max_ms': peak * 1000
+                }
+                for endpoint, (count, errors, total, peak) in self._stats.items()
+            }
+
+    def log_stats(self):
+        for endpoint, s in sorted(self.stats().items()):
+            Logger.info(f"Subsonic: {endpoint}: {s['requests']} requests, {s['errors']} errors, "
+                        f"avg {s['avg_ms']:.0f} ms, max {s['max_ms']:.0f} ms")
+
+    def close(self):
+        self.session.close()
+
+
+# --- Cover art cache keys ---
+
+def _cover_cache_key(url: str):
+    """
+    Image cache key for a signed getCoverArt URL. Every signed URL has
+    a fresh salt and token, so keying on the URL would never hit twice.
+    The key is the server, the cover art id and the requested size.
+    """
+    parts = urllib.parse.urlsplit(url)
+    base, _, endpoint = parts.path.rpartition('/rest/')
+    if endpoint not in ('getCoverArt', 'getCoverArt.view'):
+        return None
+    query = urllib.parse.parse_qs(parts.query)
+    cover_id = query.get('id', [''])[0]
+    if not cover_id:
+        return None
+    size = query.get('size', ['full'])[0]
+    return f"subsonic:{parts.netloc}{base}:cover:{cover_id}:{size}"
+
+register_url_key_rule(_cover_cache_key)
+
+
+# -------------------------------------------------------------------
+# 3. METADATA CACHE
+# -------------------------------------------------------------------
+# Bump this whenever the table layout changes; old caches are dropped.
+CACHE_SCHEMA_VERSION = 1
+
+# Read-only endpoints whose responses only change when the library does
+CACHED_ENDPOINTS = ('getArtist', 'getAlbum', 'search3', 'getPlaylist', 'getGenres')
+
+# The server's change signals are re-read at most this often. Between
+# checks, cached responses are served without touching the network.
+CHANGE_CHECK_INTERVAL = 60.0
+
+# Oldest responses are dropped past this many, per cache file
+CACHE_MAX_ENTRIES = 50000
+
+# Auth parameters differ on every call and are not part of the cache key
+_AUTH_PARAMS = ('u', 't', 's', 'v', 'c', 'f')
+
+class SubsonicMetadataCache:
+    """
+    On-disk cache of Subsonic API responses (SQLite), keyed by server,
+    endpoint and request parameters. Each server's entries belong to a
+    library version, a token built from the server's own change signals
+    (getIndexes lastModified, getScanStatus). When the version moves,
+    that server's entries are dropped.
+    """
+
+    def __init__(self, db_path: str):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._puts_since_prune = 0
+        self._setup_schema()
+
+    @classmethod
+    def open_default(cls):
+        return cls(os.path.join(shared_data_dir(), 'subsonic_cache.sqlite3'))
+
+    def _setup_schema(self):
+        with self._lock:
+            cur = self._conn.cursor()
+            cur.execute("PRAGMA journal_mode=WAL")
+            cur.execute("PRAGMA synchronous=NORMAL")
+            version = cur.execute("PRAGMA user_version").fetchone()[0]
+            if version != CACHE_SCHEMA_VERSION:
+                Logger.info(f"Subsonic: Building cache schema v{CACHE_SCHEMA_VERSION} (found v{version}).")
+                cur.execute("DROP TABLE IF EXISTS responses")
+                cur.execute("DROP TABLE IF EXISTS servers")
+            cur.execute("""
+                CREATE TABLE IF NOT EXISTS servers (
+                    server TEXT PRIMARY KEY,
+                    library_version TEXT NOT NULL
+                ) WITHOUT ROWID
+            """)
+            cur.execute("""
+                CREATE TABLE IF NOT EXISTS responses (
+                    server TEXT NOT NULL,
+                    endpoint TEXT NOT NULL,
+                    params TEXT NOT NULL,
+                    body TEXT NOT NULL,
+                    stored_at REAL NOT NULL,
+                    PRIMARY KEY (server, endpoint, params)
+                ) WITHOUT ROWID
+            """)
+            cur.execute("CREATE INDEX IF NOT EXISTS responses_age ON responses (stored_at)")
+            cur.execute(f"PRAGMA user_version = {CACHE_SCHEMA_VERSION}")
+            self._conn.commit()
+
+    @staticmethod
+    def params_key(params: dict) -> str:
+        return json.dumps({k: v for k, v in params.items() if k not in _AUTH_PARAMS}, sort_keys=True)
+
+    def library_version(self, server: str):
+        with self._lock:
+            row = self._conn.execute("SELECT library_version FROM servers WHERE server = ?", (server,)).fetchone()
+        return row[0] if row else None
+
+    def set_library_version(self, server: str, library_version: str):
+        """Records the server's library version, dropping its entries if it changed."""
+        with self._lock:
+            row = self._conn.execute("SELECT library_version FROM servers WHERE server = ?", (server,)).fetchone()
+            if row and row[0] == library_version:
+                return
+            dropped = self._conn.execute("DELETE FROM responses WHERE server = ?", (server,)).rowcount
+            self._conn.execute("INSERT OR REPLACE INTO servers (server, library_version) VALUES (?, ?)",
+                               (server, library_version))
+            self._conn.commit()
+        if row:
+            Logger.info(f"Subsonic: Library changed on the server, dropped {dropped} cached responses.")
+
+    def get(self, server: str, endpoint: str, params: dict):
+        """Returns the cached 'subsonic-response' object, or None."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT body FROM responses WHERE server = ? AND endpoint = ? AND params = ?",
+                (server, endpoint, self.params_key(params))
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def put(self, server: str, endpoint: str, params: dict, response: dict):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (server, endpoint, params, body, stored_at) VALUES (?, ?, ?, ?, ?)",
+                (server, endpoint, self.params_key(params), json.dumps(response), time.time())
+            )
+            self._puts_since_prune += 1
+            if self._puts_since_prune >= 500:
+                self._puts_since_prune = 0
+                self._conn.execute(
+                    "DELETE FROM responses WHERE stored_at < "
+                    "(SELECT stored_at FROM responses ORDER BY stored_at DESC LIMIT 1 OFFSET ?)",
+                    (CACHE_MAX_ENTRIES,)
+                )
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+# --- Adaptive bitrate ---
+# Stream profiles, best first, with their nominal bitrate in kbps.
+# 'raw' is the original file; CD-quality FLAC runs ~900-1400 kbps.
+ABR_LADDER = (('raw', 1411), ('mp3@320', 320), ('mp3@192', 192), ('mp3@128', 128), ('mp3@96', 96))
+ABR_START_LEVEL = 2 # Used until a transfer has been measured
+ABR_HEADROOM = 1.5 # Bandwidth a profile needs, relative to its bitrate
+ABR_UP_MARGIN = 1.3 # Extra headroom needed before stepping up
+ABR_UP_SAMPLES = 2 # Consecutive samples above that before stepping up
+ABR_SMOOTHING = 0.3 # Weight of a new sample in the moving average
+ABR_MIN_SAMPLE_BYTES = 256 * 1024 # Smaller transfers mostly measure latency
+
+def stream_profile_params(profile: str) -> dict:
+    """Subsonic stream parameters for a profile: 'raw', 'mp3' or 'mp3@<kbps>'."""
+    if profile == 'raw':
+        return {}
+    fmt, _, bitrate = profile.partition('@')
+    params = {'format': fmt, 'estimateContentLength': 'true'}
+    if bitrate:
+        params['maxBitRate'] = bitrate
+    return params
+
+class AdaptiveBitrate:
+    """
+    Picks a stream profile from ABR_LADDER based on measured download
+    throughput (moving average). Steps down as soon as the average can't
+    carry the current profile; steps up one level only after
+    ABR_UP_SAMPLES samples in a row clear the next profile by
+    ABR_UP_MARGIN, so a single fast transfer doesn't cause flapping.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.level = ABR_START_LEVEL
+        self.bandwidth_kbps = None # None until something was measured
+        self._above = 0
+
+    @property
+    def profile(self) -> str:
+        return ABR_LADDER[self.level][0]
+
+    def add_sample(self, nbytes: int, seconds: float, lower_bound: bool = False):
+        """
+        (THREAD) Records one finished transfer. lower_bound marks transfers
+        that may not have used the whole link (server-side transcoding,
+        parallel downloads): they can raise the estimate, never lower it.
+        """
+        if nbytes < ABR_MIN_SAMPLE_BYTES or seconds <= 0:
+            return
+        kbps = nbytes * 8 / 1000 / seconds
+        with self._lock:
+            if self.bandwidth_kbps is None:
+                self.bandwidth_kbps = kbps
+                # Nothing to be hysteretic about yet, take the best that fits
+                self.level = next((i for i, (_, rate) in enumerate(ABR_LADDER) if kbps >= rate * ABR_HEADROOM),
+                                  len(ABR_LADDER) - 1)
+                Logger.info(f"Subsonic: Measured {kbps:.0f} kbps, streaming as {self.profile}.")
+                return
+            if lower_bound and kbps < self.bandwidth_kbps:
+                return
+            self.bandwidth_kbps += ABR_SMOOTHING * (kbps - self.bandwidth_kbps)
+            bandwidth = self.bandwidth_kbps
+            old_level = self.level
+            while self.level < len(ABR_LADDER) - 1 and bandwidth < ABR_LADDER[self.level][1] * ABR_HEADROOM:
+                self.level += 1
+            if self.level != old_level:
+                self._above = 0
+            elif self.level > 0 and bandwidth >= ABR_LADDER[self.level - 1][1] * ABR_HEADROOM * ABR_UP_MARGIN:
+                self._above += 1
+                if self._above >= ABR_UP_SAMPLES:
+                    self.level -= 1
+                    self._above = 0
+            else:
+                self._above = 0
+            changed = self.level != old_level
+        if changed:
+            Logger.info(f"Subsonic: Bandwidth now ~{bandwidth:.0f} kbps, streaming as {self.profile}.")
+
+    def status_text(self) -> str:
+        if self.bandwidth_kbps is None:
+            return f"Auto: {self.profile}, not measured yet"
+        return f"Auto: {self.profile}, measured {self.bandwidth_kbps / 1000:.1f} Mbps"
+
+
+# --- Next-track prefetch ---
+PREFETCH_DELAY = 5.0 # Seconds to leave the current stream's start alone
+PREFETCH_MAX_BYTES = 512 * 1024 * 1024 # Whole prefetch folder
+PREFETCH_CHUNK = 256 * 1024
+
+class StreamPrefetcher:
+    """
+    Downloads the next queued track (raw or transcoded) to a local folder
+    while the current one plays. The transition then starts from disk
+    instead of paying connection setup and transcoder spin-up.
+    Downloads are written chunk by chunk to a .part file and renamed when
+    complete; only complete files are handed to the player. The folder is
+    kept under PREFETCH_MAX_BYTES, least recently played first.
+    """
+
+    def __init__(self, cache_dir: str, transport: SubsonicTransport, on_throughput=None):
+        self.cache_dir = cache_dir
+        self.transport = transport
+        self.on_throughput = on_throughput # (bytes, seconds, lower_bound), see AdaptiveBitrate
+        self._lock = threading.Lock() # Guards _cancel_event/_pending_key (UI and download threads)
+        self._cancel_event = None
+        self._pending_key = None
+        os.makedirs(cache_dir, exist_ok=True)
+
+    @staticmethod
+    def key(server_url: str, track_id: str, fmt: str) -> str:
+        return hashlib.sha1(f"{server_url}|{track_id}|{fmt}".encode('utf-8')).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.audio")
+
+    def ready_path(self, key: str):
+        """Returns the local file for key if it is fully downloaded, else None."""
+        path = self._path(key)
+        try:
+            os.utime(path) # Recently played files are evicted last
+        except OSError:
+            return None
+        return path
+
+    def start(self, key: str, server_url: str, params: dict):
+        """Replaces any running download with one for key."""
+        if self.ready_path(key):
+            return
+        with self._lock:
+            if key == self._pending_key:
+                return
+            self._cancel_locked()
+            cancel_event = threading.Event()
+            self._cancel_event = cancel_event
+            self._pending_key = key
+        threading.Thread(target=self._download, args=(key, server_url, params, cancel_event), daemon=True).start()
+
+    def cancel(self, key: str = None):
+        """Stops the running download (only if it is for key, when given)."""
+        with self._lock:
+            if key is not None and key != self._pending_key:
+                return
+            self._cancel_locked()
+
+    def _cancel_locked(self):
+        if self._cancel_event:
+            self._cancel_event.set()
+        self._cancel_event = None
+        self._pending_key = None
+
+    def _download(self, key, server_url, params, cancel_event):
+        """(THREAD) Runs _fetch(), then lets start() pick key up again."""
+        try:
+            self._fetch(key, server_url, params, cancel_event)
+        finally:
+            # However the download ended, a later start() for the same key
+            # (after a failure, or once the file was evicted) must not be
+            # taken for this one still running. A newer download owns the
+            # slot if start() replaced us in the meantime.
+            with self._lock:
+                if self._cancel_event is cancel_event:
+                    self._cancel_event = None
+                    self._pending_key = None
+
+    def _fetch(self, key, server_url, params, cancel_event):
+        """(THREAD)"""
+        if cancel_event.wait(PREFETCH_DELAY):
+            return
+        path = self._path(key)
+        part_path = f"{path}.part"
+        start = time.monotonic()
+        total = 0
+        try:
+            with self.transport.get(server_url, 'stream', params, stream=True) as response:
+                content_type = response.headers.get('Content-Type', '')
+                # API errors come back as 200 with a JSON/XML body
+                if response.status_code != 200 or content_type.startswith(('application/json', 'text/xml')):
+                    Logger.warning(f"Subsonic: Prefetch failed, HTTP {response.status_code} ({content_type})")
+                    return
+                if int(response.headers.get('Content-Length') or 0) > PREFETCH_MAX_BYTES:
+                    return
+                with open(part_path, 'wb') as f:
+                    for chunk in response.iter_content(PREFETCH_CHUNK):
+                        if cancel_event.is_set() or total > PREFETCH_MAX_BYTES:
+                            break
+                        f.write(chunk)
+                        total += len(chunk)
+            if cancel_event.is_set() or total > PREFETCH_MAX_BYTES:
+                os.remove(part_path)
+                return
+            os.replace(part_path, path)
+        except (requests.RequestException, OSError) as e:
+            Logger.warning(f"Subsonic: Prefetch failed: {e}")
+            try:
+                os.remove(part_path)
+            except OSError:
+                pass
+            return
+        elapsed = time.monotonic() - start
+        Logger.info(f"Subsonic: Prefetched next track, {total / 1048576:.1f} MB in {elapsed:.1f}s")
+        if self.on_throughput:
+            # A transcoding server may send slower than the link allows
+            self.on_throughput(total, elapsed, 'format' in params)
+        self._enforce_limit(keep=path)
+
+    def _enforce_limit(self, keep: str):
+        """(THREAD) Deletes the least recently played files past PREFETCH_MAX_BYTES."""
+        try:
+            entries = [e for e in os.scandir(self.cache_dir) if e.is_file() and e.name.endswith('.audio')]
+            entries = [(e.stat().st_mtime, e.stat().st_size, e.path) for e in entries]
+        except OSError:
+            return
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= PREFETCH_MAX_BYTES:
+                break
+            if path == keep:
+                continue
+            try:
+                os.remove(path) # Fails on Windows while the player has it open
+                total -= size
+            except OSError:
+                pass
+
+    def clear(self):
+        """(THREAD) Removes everything, including leftovers of earlier runs."""
+        try:
+            for entry in os.scandir(self.cache_dir):
+                if entry.is_file():
+                    try:
+                        os.remove(entry.path)
+                    except OSError:
+                        pass
+        except OSError:
+            pass
+
+# --- Offline audio cache ---
+OFFLINE_DEFAULT_MAX_MB = 4096
+OFFLINE_DEFAULT_WORKERS = 2
+OFFLINE_POLL_INTERVAL = 5.0 # Seconds between checks for newly owned albums
+# Settings choices: label -> size cap in MB (0 = off)
+OFFLINE_SIZE_CHOICES = {'Off': 0, '1 GB': 1024, '4 GB': 4096, '10 GB': 10240, '25 GB': 25600}
+
+class OfflineAudioCache:
+    """
+    Persistent, size-capped store of downloaded tracks, so owned albums
+    keep playing on slow or lost connections. Files are named by the same
+    key as StreamPrefetcher (server, track id, format) and least recently
+    played files are evicted past max_bytes. Files of tracks currently
+    wanted (owned albums) are never evicted to make room for each other;
+    once those fill the cap, downloading pauses.
+
+    want() queues downloads; a configurable number of worker threads
+    work through the queue, front first.
+    """
+
+    def __init__(self, cache_dir: str, transport: SubsonicTransport, max_bytes: int, workers: int,
+                 on_throughput=None):
+        self.cache_dir = cache_dir
+        self.transport = transport
+        self.on_throughput = on_throughput # (bytes, seconds, lower_bound), see AdaptiveBitrate
+        self.max_bytes = max_bytes
+        self.workers = 0
+        self._cond = threading.Condition()
+        self._files = {} # key -> [size, last played]
+        self._total_bytes = 0
+        self._queue = deque() # (key, server_url, params)
+        self._queued = set()
+        self._wanted = set()
+        self._full = False
+        self._stopped = False
+        os.makedirs(cache_dir, exist_ok=True)
+        self._load()
+        self.set_workers(workers)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.audio")
+
+    def _load(self):
+        """Indexes the files already on disk and drops unfinished downloads."""
+        for entry in os.scandir(self.cache_dir):
+            try:
+                if entry.name.endswith('.part'):
+                    os.remove(entry.path)
+                elif entry.name.endswith('.audio'):
+                    st = entry.stat()
+                    self._files[entry.name[:-len('.audio')]] = [st.st_size, st.st_mtime]
+                    self._total_bytes += st.st_size
+            except OSError:
+                continue
+        Logger.info(f"Subsonic: Offline cache holds {len(self._files)} tracks, "
+                    f"{self._total_bytes / 1048576:.0f} MB.")
+
+    # --- Lookups ---
+
+    def path(self, key: str):
+        """Returns the local file for key, or None if it isn't cached."""
+        with self._cond:
+            entry = self._files.get(key)
+            if entry is None:
+                return None
+            entry[1] = time.time()
+        path = self._path(key)
+        try:
+            os.utime(path) # Keeps the LRU order across runs
+        except OSError:
+            with self._cond:
+                self._forget_locked(key)
+            return None
+        return path
+
+    # --- Queue ---
+
+    def want(self, items: list, front: bool = True):
+        """
+        Queues (key, server_url, params) downloads that aren't cached yet,
+        ahead of everything already queued unless front is False.
+        """
+        with self._cond:
+            missing = []
+            for item in items:
+                self._wanted.add(item[0])
+                if item[0] not in self._files and item[0] not in self._queued:
+                    missing.append(item)
+                    self._queued.add(item[0])
+            if front:
+                self._queue.extendleft(reversed(missing))
+            else:
+                self._queue.extend(missing)
+            self._cond.notify_all()
+
+    def reset(self):
+        """Forgets what is wanted and queued (e.g. after a format change)."""
+        with self._cond:
+            self._queue.clear()
+            self._queued.clear()
+            self._wanted.clear()
+            self._full = False
+
+    def set_limits(self, max_bytes: int):
+        with self._cond:
+            self.max_bytes = max_bytes
+            self._full = False
+            self._make_room_locked(0)
+            self._cond.notify_all()
+
+    def set_workers(self, workers: int):
+        """Starts or retires workers; extra ones exit once idle."""
+        with self._cond:
+            for index in range(self.workers, workers):
+                threading.Thread(target=self._worker, args=(index,), daemon=True).start()
+            self.workers = workers
+            self._cond.notify_all()
+
+    def stop(self):
+        with self._cond:
+            self._stopped = True
+            self._queue.clear()
+            self._queued.clear()
+            self._cond.notify_all()
+
+    # --- Downloads ---
+
+    def _worker(self, index: int):
+        """(THREAD)"""
+        while True:
+            with self._cond:
+                while not self._stopped and index < self.workers and (self._full or not self._queue):
+                    self._cond.wait()
+                if self._stopped or index >= self.workers:
+                    return
+                item = self._queue.popleft()
+            requeued = False
+            try:
+                requeued = self._download(*item)
+            finally:
+                if not requeued:
+                    with self._cond:
+                        self._queued.discard(item[0])
+
+    def _download(self, key, server_url, params) -> bool:
+        """(THREAD) Returns True if the item went back on the queue."""
+        path = self._path(key)
+        part_path = f"{path}.{threading.get_ident()}.part"
+        start = time.monotonic()
+        total = 0
+        try:
+            with self.transport.get(server_url, 'stream', params, stream=True) as response:
+                content_type = response.headers.get('Content-Type', '')
+                # API errors come back as 200 with a JSON/XML body
+                if response.status_code != 200 or content_type.startswith(('application/json', 'text/xml')):
+                    Logger.warning(f"Subsonic: Offline download failed, HTTP {response.status_code} ({content_type})")
+                    return False
+                expected = int(response.headers.get('Content-Length') or 0)
+                with self._cond:
+                    if not self._make_room_locked(expected):
+                        # Back on the queue for when the cap is raised
+                        self._queue.appendleft((key, server_url, params))
+                        if not self._full:
+                            Logger.info("Subsonic: Offline cache is full of owned tracks, pausing downloads.")
+                        self._full = True
+                        return True
+                with open(part_path, 'wb') as f:
+                    for chunk in response.iter_content(PREFETCH_CHUNK):
+                        if self._stopped:
+                            break
+                        f.write(chunk)
+                        total += len(chunk)
+            if self._stopped:
+                os.remove(part_path)
+                return False
+            os.replace(part_path, path)
+        except (requests.RequestException, OSError) as e:
+            Logger.warning(f"Subsonic: Offline download failed: {e}")
+            try:
+                os.remove(part_path)
+            except OSError:
+                pass
+            return False
+        with self._cond:
+            self._forget_locked(key)
+            self._files[key] = [total, time.time()]
+            self._total_bytes += total
+            if not self._make_room_locked(0):
+                self._full = True
+        if self.on_throughput:
+            # Shares the link with the other workers and the player
+            self.on_throughput(total, time.monotonic() - start, True)
+        return False
+
+    def _forget_locked(self, key):
+        entry = self._files.pop(key, None)
+        if entry:
+            self._total_bytes -= entry[0]
+
+    def _make_room_locked(self, needed: int) -> bool:
+        """
+        Evicts least recently played, unwanted files until needed more
+        bytes fit under max_bytes. False if they can't be made to fit.
+        """
+        if self._total_bytes + needed <= self.max_bytes:
+            return True
+        for key, (size, _) in sorted(self._files.items(), key=lambda item: item[1][1]):
+            if key in self._wanted:
+                continue
+            try:
+                os.remove(self._path(key))
+            except FileNotFoundError:
+                pass
+            except OSError:
+                continue # In use by the player (Windows)
+            self._forget_locked(key)
+            if self._total_bytes + needed <= self.max_bytes:
+                return True
+        return False
+
+
+# -------------------------------------------------------------------
+# 4. DATA LOGIC CLASS (Shared)
+# -------------------------------------------------------------------
+# Recent playlist searches whose getPlaylists result is kept for paging
+PLAYLIST_SNAPSHOTS = 8
+
 class SubsonicBackendLogic(AbstractMusicBackend):
     def __init__(self, service_name_key, on_login_success, on_login_failure):
         super().__init__(service_name_key, on_login_success, on_login_failure)
@@ -93,6 +815,18 @@ class SubsonicBackendLogic(AbstractMusicBackend):
         self.password = None
         self.api_version = '1.16.1'
         self.client_name = 'Musipelago'
+        self.transport = SubsonicTransport()
+        self.metadata_cache = None # Opened on login
+        # getPlaylists snapshot per playlist search query (searches overlap
+        # while the user types), and the latest 'changed' stamp per playlist
+        self._playlist_snapshots = {}
+        self._playlist_stamps = {}
+        self._playlist_lock = threading.Lock()
+        self._library_lock = threading.Lock()
+        self._library_checked_at = 0.0
+        self._library_version = None
+        self._library_checking = False # A thread is asking the server right now
+        self._library_epoch = 0 # Bumped on login, older checks are discarded
         
     def get_login_ui(self) -> object:
         return SubsonicLoginUI()
@@ -129,22 +863,17 @@ class SubsonicBackendLogic(AbstractMusicBackend):
     def _auth_thread(self, server, user, pwd):
         try:
             # Ping to test creds
-            params = self._build_params(user, pwd)
-            url = f"{server}/rest/ping"
-            
-            response = requests.get(url, params=params, timeout=10)
-            
-            if response.status_code != 200:
-                raise Exception(f"HTTP Error {response.status_code}")
-                
-            data = response.json()
-            sub_resp = data.get('subsonic-response', {})
+            sub_resp = self._api('ping', server=server, user=user, pwd=pwd)
             
             if sub_resp.get('status') == 'ok':
                 self.server_url = server
                 self.username = user
                 self.password = pwd
                 self.is_authenticated = True
+                with self._playlist_lock: # Playlist IDs are per server
+                    self._playlist_snapshots.clear()
+                    self._playlist_stamps.clear()
+                self._open_metadata_cache()
                 
                 Clock.schedule_once(lambda dt: self.on_login_success({'display_name': user}))
             else:
@@ -155,6 +884,98 @@ class SubsonicBackendLogic(AbstractMusicBackend):
             Logger.error(f"Subsonic Login Error: {e}")
             Clock.schedule_once(lambda dt: self.on_login_failure(str(e)))
 
+    def _api(self, endpoint, params=None, server=None, user=None, pwd=None) -> dict:
+        """
+        (THREAD) Calls a Subsonic endpoint through the shared transport
+        and returns the 'subsonic-response' object.
+        Raises on HTTP errors; API errors are left to the caller.
+        """
+        query = self._build_params(user, pwd)
+        if params:
+            query.update(params)
+        response = self.transport.get(server or self.server_url, endpoint, query)
+        if response.status_code != 200:
+            raise Exception(f"HTTP Error {response.status_code}")
+        return response.json().get('subsonic-response', {})
+
+    # --- Metadata cache ---
+
+    def _open_metadata_cache(self):
+        with self._library_lock:
+            self._library_checked_at = 0.0 # Re-read change signals for this server
+            self._library_checking = False
+            self._library_epoch += 1
+            if self.metadata_cache is None:
+                try:
+                    self.metadata_cache = SubsonicMetadataCache.open_default()
+                except Exception as e:
+                    Logger.warning(f"Subsonic: Metadata cache unavailable, every call goes to the server: {e}")
+
+    def _cache_server_key(self) -> str:
+        # Per user, libraries can differ with folder permissions
+        return f"{self.username}@{self.server_url}"
+
+    def _current_library_version(self):
+        """
+        (THREAD) The server's library version token, or None while it is
+        scanning or doesn't report changes. Re-read from getScanStatus
+        and getIndexes at most every CHANGE_CHECK_INTERVAL seconds.
+        The server is asked without holding the lock; callers arriving
+        while one thread asks get the last known version meanwhile.
+        """
+        with self._library_lock:
+            now = time.monotonic()
+            if self._library_checking or (self._library_checked_at
+                                          and now - self._library_checked_at < CHANGE_CHECK_INTERVAL):
+                return self._library_version
+            self._library_checking = True
+            epoch = self._library_epoch
+
+        version = None
+        try:
+            scan = self._api('getScanStatus').get('scanStatus', {})
+            if not scan.get('scanning'):
+                # With ifModifiedSince in the future the server sends
+                # lastModified but skips the (large) artist index
+                future_ms = int((time.time() + 86400) * 1000)
+                indexes = self._api('getIndexes', {'ifModifiedSince': future_ms}).get('indexes', {})
+                if indexes.get('lastModified') is not None:
+                    version = f"{indexes['lastModified']}:{scan.get('count', '')}:{scan.get('lastScan', '')}"
+        except Exception as e:
+            Logger.warning(f"Subsonic: Could not read the library's change status: {e}")
+
+        with self._library_lock:
+            if epoch != self._library_epoch:
+                return None # Logged in again meanwhile, this answer is for the old server
+            self._library_checking = False
+            self._library_checked_at = now
+            self._library_version = version
+        if version:
+            self.metadata_cache.set_library_version(self._cache_server_key(), version)
+        return version
+
+    def _cached_api(self, endpoint, params=None, cache_tag=None) -> dict:
+        """
+        (THREAD) Like _api(), but answered from the metadata cache while
+        the server's library is unchanged. Bypassed during server scans.
+        cache_tag is added to the cache key only, for responses that can
+        change without the library changing (e.g. a playlist's 'changed').
+        """
+        params = params or {}
+        if self.metadata_cache is None or endpoint not in CACHED_ENDPOINTS:
+            return self._api(endpoint, params)
+        server = self._cache_server_key()
+        cache_params = dict(params, _tag=cache_tag) if cache_tag else params
+        version = self._current_library_version()
+        if version:
+            cached = self.metadata_cache.get(server, endpoint, cache_params)
+            if cached is not None:
+                return cached
+        response = self._api(endpoint, params)
+        if version and response.get('status') == 'ok':
+            self.metadata_cache.put(server, endpoint, cache_params, response)
+        return response
+
     def _build_params(self, user=None, pwd=None):
         """Generates the salt/token auth parameters."""
         u = user or self.username
@@ -202,8 +1023,10 @@ class SubsonicBackendLogic(AbstractMusicBackend):
     def search(self, query: str, search_type: str, limit: int = 20, offset: int = 0):
         if not self.is_authenticated: return []
         
-        params = self._build_params()
-        params['query'] = query
+        if search_type == 'playlist':
+            return self._search_playlists(query, limit, offset)
+        
+        params = {'query': query}
         
         # Map generic offset to Subsonic specific offsets
         if search_type == 'artist':
@@ -214,8 +1037,7 @@ class SubsonicBackendLogic(AbstractMusicBackend):
             params['albumOffset'] = offset
         
         try:
-            resp = requests.get(f"{self.server_url}/rest/search3", params=params).json()
-            results = resp.get('subsonic-response', {}).get('searchResult3', {})
+            results = self._cached_api('search3', params).get('searchResult3', {})
             
             generic_results = []
             
@@ -231,79 +1053,137 @@ class SubsonicBackendLogic(AbstractMusicBackend):
                     ))
             elif search_type == 'album':
                 for item in results.get('album', []):
-                    raw_art = self._get_cover_id_string(item.get('coverArt'))
-                    generic_results.append(GenericAlbum(
-                        uri=f"subsonic:album:{item['id']}",
-                        title=item['name'],
-                        artist=item.get('artist', 'Unknown'),
-                        image_url=raw_art,                   # STORE: coverArt:123
-                        display_image_url=self._sign_url(raw_art), # SHOW: http://...
-                        total_tracks=item.get('songCount', 0),
-                        album_type="Album",
-                        service='subsonic'
-                    ))
+                    generic_results.append(self._album_from_item(item))
             return generic_results
         except Exception as e:
             Logger.error(f"Subsonic Search Error: {e}")
             return []
 
+    def _album_from_item(self, item):
+        """GenericAlbum (without tracks) for an album object from search3/getAlbumList2."""
+        raw_art = self._get_cover_id_string(item.get('coverArt'))
+        return GenericAlbum(
+            uri=f"subsonic:album:{item['id']}",
+            title=item.get('name') or item.get('title', 'Unknown Album'),
+            artist=item.get('artist', 'Unknown'),
+            image_url=raw_art,                   # STORE: coverArt:123
+            display_image_url=self._sign_url(raw_art), # SHOW: http://...
+            total_tracks=item.get('songCount', 0),
+            album_type="Album",
+            service='subsonic'
+        )
+
+    # --- Browsing ---
+
+    def get_album_list(self, list_type, size, offset, **extra):
+        """
+        (THREAD) One page of getAlbumList2, without tracks. list_type is
+        e.g. 'newest', 'frequent', 'random', 'byYear' (fromYear/toYear in
+        extra) or 'byGenre' (genre in extra). Not cached: play counts and
+        random picks change without the library changing. Raises on failure.
+        """
+        params = {'type': list_type, 'size': size, 'offset': offset, **extra}
+        data = self._api('getAlbumList2', params).get('albumList2', {})
+        return [self._album_from_item(item) for item in data.get('album', [])]
+
+    def get_genres(self):
+        """(THREAD) [(genre, album count)], most albums first. Raises on failure."""
+        data = self._cached_api('getGenres').get('genres', {})
+        genres = [(g.get('value', ''), g.get('albumCount', 0)) for g in data.get('genre', [])]
+        return sorted((g for g in genres if g[0] and g[1]), key=lambda g: -g[1])
+
     def _get_cover_id_string(self, cover_id):
         if not cover_id: return ""
         return f"coverArt:{cover_id}"
     
-    def _sign_url(self, fragment):
+    def _sign_url(self, fragment, size_name='list'):
+        """
+        Signed getCoverArt URL for a 'coverArt:<id>' fragment. The server
+        scales the art to THUMBNAIL_SIZES[size_name], so list rows don't
+        download full-resolution originals. None asks for the original.
+        """
         if not fragment or not fragment.startswith("coverArt:"): return ""
         cid = fragment.split(":")[1]
         params = self._build_params()
         params['id'] = cid
+        if size_name:
+            params['size'] = THUMBNAIL_SIZES[size_name]
         query = urllib.parse.urlencode(params)
         return f"{self.server_url}/rest/getCoverArt?{query}"
 
     def get_album_with_tracks(self, album):
-        # Parse ID from "subsonic:album:123"
-        album_id = album.uri.split(':')[-1]
-        params = self._build_params()
-        params['id'] = album_id
-        
         try:
-            resp = requests.get(f"{self.server_url}/rest/getAlbum", params=params).json()
-            data = resp.get('subsonic-response', {}).get('album', {})
-            
-            tracks = []
-            for song in data.get('song', []):
-                tracks.append(GenericTrack(
-                    uri=f"subsonic:track:{song['id']}",
-                    title=song['title'],
-                    artist=song.get('artist', album.artist),
-                    album_title=album.title,
-                    duration_ms=song.get('duration', 0) * 1000,
-                    service='subsonic'
-                ))
-            
-            album.tracks = tracks
-            return album
+            return self._fetch_album_tracks(album)
         except Exception as e:
             Logger.error(f"Subsonic getAlbum Error: {e}")
             return album
 
+    def _fetch_album_tracks(self, album):
+        """(THREAD) Fills album.tracks from getAlbum. Raises on failure."""
+        # Parse ID from "subsonic:album:123"
+        album_id = album.uri.split(':')[-1]
+        data = self._cached_api('getAlbum', {'id': album_id}).get('album', {})
+        
+        tracks = []
+        for song in data.get('song', []):
+            tracks.append(GenericTrack(
+                uri=f"subsonic:track:{song['id']}",
+                title=song['title'],
+                artist=song.get('artist', album.artist),
+                album_title=album.title,
+                duration_ms=song.get('duration', 0) * 1000,
+                service='subsonic'
+            ))
+        
+        album.tracks = tracks
+        return album
+
     def get_all_artist_albums(self, artist):
+        """
+        (THREAD) Every album of the artist with its tracks, in the
+        server's release order. See hydrate_albums().
+        """
+        return self.hydrate_albums(self.get_artist_albums_for_display(artist))
+
+    def hydrate_albums(self, albums):
+        """
+        (THREAD) Fills in the tracks of every album, HYDRATE_WORKERS
+        getAlbum calls at a time over the shared session. Keeps the
+        given order; albums that fail are left out.
+        """
+        if not albums:
+            return []
+
+        def hydrate(album):
+            try:
+                return self._fetch_album_tracks(album)
+            except Exception as e:
+                Logger.error(f"Subsonic getAlbum Error for '{album.title}': {e}")
+                return None
+
+        with ThreadPoolExecutor(max_workers=min(HYDRATE_WORKERS, len(albums))) as pool:
+            # map() yields in submission order, whatever order they finish in
+            hydrated = [album for album in pool.map(hydrate, albums) if album is not None]
+        if len(hydrated) < len(albums):
+            Logger.warning(f"Subsonic: {len(albums) - len(hydrated)} of {len(albums)} albums could not be loaded.")
+        return hydrated
+
+    def get_artist_albums_for_display(self, artist):
+        """(THREAD) The artist's albums from getArtist, without tracks."""
         artist_id = artist.uri.split(':')[-1]
-        params = self._build_params()
-        params['id'] = artist_id
         
         try:
-            resp = requests.get(f"{self.server_url}/rest/getArtist", params=params).json()
-            data = resp.get('subsonic-response', {}).get('artist', {})
+            data = self._cached_api('getArtist', {'id': artist_id}).get('artist', {})
             
             albums = []
             for alb in data.get('album', []):
-                # Create GenericAlbum (we have to fetch tracks separately later if needed)
-                # For the "Add all" action, this list is iterated and get_album_with_tracks called
+                image_url = self._get_cover_url(alb.get('coverArt'))
                 albums.append(GenericAlbum(
                     uri=f"subsonic:album:{alb['id']}",
                     title=alb['name'],
                     artist=artist.name,
-                    image_url=self._get_cover_url(alb.get('coverArt')),
+                    image_url=image_url,
+                    display_image_url=self._sign_url(image_url),
                     total_tracks=alb.get('songCount', 0),
                     album_type="Album",
                     service='subsonic'
@@ -313,12 +1193,100 @@ class SubsonicBackendLogic(AbstractMusicBackend):
             Logger.error(f"Subsonic getArtist Error: {e}")
             return []
 
-    def get_artist_albums_for_display(self, artist):
-        # Same as above, but maybe lightweight
-        return self.get_all_artist_albums(artist)
+    # --- Playlists ---
+
+    def _search_playlists(self, query, limit, offset):
+        """
+        (THREAD) Playlists whose name contains every word of query, paged.
+        Subsonic has no playlist search, so getPlaylists is filtered here.
+        The list is fetched once per search (offset 0) and kept for that
+        query; its later pages reuse it, whatever other searches run meanwhile.
+        """
+        with self._playlist_lock:
+            playlists = None if offset == 0 else self._playlist_snapshots.get(query)
+        if playlists is None:
+            try:
+                data = self._api('getPlaylists').get('playlists', {})
+                playlists = data.get('playlist', [])
+            except Exception as e:
+                Logger.error(f"Subsonic getPlaylists Error: {e}")
+                return []
+            with self._playlist_lock:
+                self._playlist_snapshots.pop(query, None)
+                self._playlist_snapshots[query] = playlists
+                while len(self._playlist_snapshots) > PLAYLIST_SNAPSHOTS:
+                    del self._playlist_snapshots[next(iter(self._playlist_snapshots))]
+                self._playlist_stamps.update((item.get('id'), item.get('changed')) for item in playlists)
+        words = query.casefold().split()
+        matches = [item for item in playlists
+                   if all(word in item.get('name', '').casefold() for word in words)]
+        results = []
+        for item in matches[offset:offset + limit]:
+            raw_art = self._get_cover_id_string(item.get('coverArt'))
+            results.append(GenericPlaylist(
+                uri=f"subsonic:playlist:{item['id']}",
+                name=item.get('name', 'Unnamed Playlist'),
+                owner=item.get('owner', ''),
+                image_url=raw_art,
+                display_image_url=self._sign_url(raw_art),
+                total_tracks=item.get('songCount', 0),
+                service='subsonic'
+            ))
+        return results
+
+    def _playlist_changed(self, playlist_id):
+        """The 'changed' stamp of a playlist from the last getPlaylists, or None."""
+        with self._playlist_lock:
+            return self._playlist_stamps.get(playlist_id)
 
     def get_playlist_with_tracks(self, playlist):
-        return None # Not implemented yet
+        """
+        (THREAD) Reads a server playlist into an album-like container.
+        getPlaylist has no paging, but its entries carry full track
+        metadata, so one (gzipped) request covers thousands of tracks.
+        The response is cached per 'changed' stamp: re-adding an unedited
+        playlist costs no request, an edited one is fetched again.
+        Repeated songs are kept once, track URIs must be unique.
+        """
+        playlist_id = playlist.uri.split(':')[-1]
+        changed = self._playlist_changed(playlist_id)
+        # Without a stamp we can't tell if it was edited, so don't cache
+        if changed:
+            data = self._cached_api('getPlaylist', {'id': playlist_id}, cache_tag=changed)
+        else:
+            data = self._api('getPlaylist', {'id': playlist_id})
+        entries = data.get('playlist', {}).get('entry', [])
+
+        tracks = []
+        seen = set()
+        for song in entries:
+            uri = f"subsonic:track:{song['id']}"
+            if uri in seen:
+                continue
+            seen.add(uri)
+            tracks.append(GenericTrack(
+                uri=uri,
+                title=song.get('title', 'Unknown Track'),
+                artist=song.get('artist', 'Unknown Artist'),
+                album_title=song.get('album', playlist.name),
+                duration_ms=song.get('duration', 0) * 1000,
+                service='subsonic'
+            ))
+        if len(tracks) < len(entries):
+            Logger.info(f"Subsonic: Playlist '{playlist.name}' skipped {len(entries) - len(tracks)} repeated entries.")
+
+        artists = {t.artist for t in tracks}
+        return GenericAlbum(
+            uri=playlist.uri,
+            title=playlist.name,
+            artist=artists.pop() if len(artists) == 1 else "Various Artists",
+            image_url=playlist.image_url or KIVY_ICON,
+            display_image_url=playlist.display_image_url,
+            total_tracks=len(tracks),
+            album_type="Playlist",
+            service='subsonic',
+            tracks=tracks
+        )
 
     def _get_cover_url(self, cover_id):
         if not cover_id: return KIVY_ICON
@@ -328,14 +1296,81 @@ class SubsonicBackendLogic(AbstractMusicBackend):
 
 
 # -------------------------------------------------------------------
-# 3. GENERATOR UI HOST
+# 5. GENERATOR UI HOST
 # -------------------------------------------------------------------
+# --- Library browsing ---
+BROWSE_PAGE_SIZE = 50 # Albums per getAlbumList2 call
+BROWSE_LOAD_AHEAD = 2.0 # Viewports left below the scroll position before the next page is shown
+BROWSE_ROW_HEIGHT = 100 # dp, the generator's RecycleBoxLayout default_size
+
+# (getAlbumList2 type, row title, row subtitle)
+BROWSE_LISTS = (
+    ('newest', "Recently Added", "Newest albums in the library first"),
+    ('frequent', "Most Played", "Albums by play count"),
+    ('random', "Random Albums", "A shuffled walk through the whole library"),
+    ('byYear', "By Year", "Albums released in a range of years"),
+    ('byGenre', "By Genre", "Pick a genre, then browse its albums"),
+)
+
+class YearRangePopup(Popup):
+    """
+    Asks for the year range of the 'By Year' list.
+    on_submit(from_year, to_year) is called with two ints.
+    """
+    def __init__(self, on_submit, **kwargs):
+        super().__init__(**kwargs)
+        self.title = "Browse Albums by Year"
+        self.size_hint = (0.6, None)
+        self.height = dp(200)
+        self.on_submit = on_submit
+
+        layout = BoxLayout(orientation='vertical', spacing=dp(10), padding=dp(10))
+        form_grid = GridLayout(cols=2, spacing=dp(10), size_hint_y=None, height=dp(88))
+        form_grid.add_widget(Label(text="From:", size_hint_x=0.3))
+        self.from_input = TextInput(text="1970", multiline=False, write_tab=False, input_filter='int')
+        form_grid.add_widget(self.from_input)
+        form_grid.add_widget(Label(text="To:", size_hint_x=0.3))
+        self.to_input = TextInput(text=time.strftime("%Y"), multiline=False, write_tab=False, input_filter='int')
+        form_grid.add_widget(self.to_input)
+        layout.add_widget(form_grid)
+
+        button_layout = BoxLayout(size_hint_y=None, height=dp(44), spacing=dp(10))
+        button_layout.add_widget(Button(text="Cancel", on_release=self.dismiss))
+        button_layout.add_widget(Button(text="Browse", on_release=self.on_browse_press))
+        layout.add_widget(button_layout)
+        self.content = layout
+
+    def on_browse_press(self, *args):
+        try:
+            from_year, to_year = int(self.from_input.text), int(self.to_input.text)
+        except ValueError:
+            return
+        self.dismiss()
+        self.on_submit(from_year, to_year)
+
+
 class SubsonicHostUI(AbstractPluginHost):
+    def __init__(self):
+        super().__init__()
+        # Bumped whenever a browse list is opened or left, so pages
+        # still in flight for an older list are dropped on arrival.
+        self._browse_generation = 0
+        self._browse = None # State of the open browse list, see _start_browse()
+
     def setup_ui(self):
         Logger.info("SubsonicHostUI: Setting up default search UI.")
         self.root_layout.ids.search_container.disabled = False
         self.root_layout.ids.search_container.opacity = 1
-        self.root_layout.ids.list_container.list_one_data = []
+        self._stop_browse()
+        self.root_layout.ids.list_container.list_one_data = [{
+            'text_line_1': title,
+            'text_line_2': subtitle,
+            'text_line_3': "Browse the library",
+            'text_line_4': '',
+            'image_source': KIVY_ICON,
+            'list_id': 'subsonic_browse',
+            'generic_item': f"list:{list_type}"
+        } for list_type, title, subtitle in BROWSE_LISTS]
         
     def on_search_click(self, search_text, search_type):
         if not self.backend.is_authenticated:
@@ -356,7 +1391,7 @@ class SubsonicHostUI(AbstractPluginHost):
         for item in results:
             # Convert Generic objects to UI dicts
             # Using the backend to generate a signed image URL for display
-            img = self._sign_url(item.image_url)
+            img = self.backend._sign_url(item.image_url, 'list')
             
             data.append({
                 'text_line_1': item.title if hasattr(item, 'title') else item.name,
@@ -370,11 +1405,209 @@ class SubsonicHostUI(AbstractPluginHost):
         self.root_layout.ids.list_container.list_one_data = data
         self.root_layout.status_text = f"Found {len(data)} results."
         
-    def on_item_menu_click(self, list_id, item): return False
+    def on_item_menu_click(self, list_id, item) -> bool:
+        if list_id != 'subsonic_browse':
+            return False
+        action = str(item)
+        if action == 'list:byYear':
+            YearRangePopup(on_submit=lambda a, b: self._start_browse(
+                'byYear', f"Albums {a}-{b}", fromYear=a, toYear=b)).open()
+        elif action == 'list:byGenre':
+            self.root_layout.status_text = "Loading genres..."
+            threading.Thread(target=self._genres_thread, daemon=True).start()
+        elif action.startswith('list:'):
+            list_type = action[len('list:'):]
+            title = next(title for t, title, _ in BROWSE_LISTS if t == list_type)
+            self._start_browse(list_type, title)
+        elif action.startswith('genre:'):
+            genre = action[len('genre:'):]
+            self._start_browse('byGenre', f"Genre: {genre}", genre=genre)
+        elif action.startswith('add_loaded:'):
+            self._add_loaded_albums()
+        return True # Every browse row is ours, none of them has a menu
+
+    # --- Library browsing ---
+
+    def _genres_thread(self):
+        """(THREAD) Lists the server's genres as browse rows."""
+        try:
+            genres = self.backend.get_genres()
+        except Exception as e:
+            Logger.error(f"SubsonicHostUI: getGenres failed: {e}")
+            Clock.schedule_once(lambda dt: setattr(self.root_layout, 'status_text', "Could not load genres."))
+            return
+
+        def show(dt):
+            self._stop_browse()
+            self.root_layout.ids.list_container.list_one_data = [{
+                'text_line_1': genre,
+                'text_line_2': f"Albums: {count}",
+                'text_line_3': "Browse this genre",
+                'text_line_4': '',
+                'image_source': KIVY_ICON,
+                'list_id': 'subsonic_browse',
+                'generic_item': f"genre:{genre}"
+            } for genre, count in genres]
+            self.root_layout.status_text = f"Found {len(genres)} genres."
+        Clock.schedule_once(show)
+
+    def _start_browse(self, list_type, title, **extra):
+        """
+        (MAIN THREAD) Replaces the left list with a getAlbumList2 list.
+        Pages are fetched in the background one ahead of what is shown
+        and appended as the user scrolls towards the end.
+        """
+        self._stop_browse()
+        self._browse_generation += 1
+        header_id = f"add_loaded:{self._browse_generation}"
+        self._browse = {
+            'generation': self._browse_generation,
+            'list_type': list_type,
+            'title': title,
+            'extra': extra,
+            'header_id': header_id,
+            'offset': 0,         # Next offset to request
+            'pending': [],       # Fetched albums not shown yet
+            'seen': set(),       # URIs already listed, 'random' repeats albums
+            'loading': False,
+            'done': False,
+        }
+        self.root_layout.ids.list_container.list_one_data = [self._browse_header_row(0)]
+        self.root_layout.ids.list_container.ids.search_rv.bind(scroll_y=self._on_browse_scroll)
+        self.root_layout.status_text = f"Loading '{title}'..."
+        self._browse_fill()
+
+    def _stop_browse(self):
+        if self._browse is None:
+            return
+        self._browse = None
+        self._browse_generation += 1
+        self.root_layout.ids.list_container.ids.search_rv.unbind(scroll_y=self._on_browse_scroll)
+
+    def _browse_active(self) -> bool:
+        """False once the list was replaced (a search, another list), which also ends browsing."""
+        if self._browse is None:
+            return False
+        data = self.root_layout.ids.list_container.list_one_data
+        if data and data[0].get('generic_item') == self._browse['header_id']:
+            return True
+        self._stop_browse()
+        return False
+
+    def _browse_header_row(self, loaded: int) -> dict:
+        return {
+            'text_line_1': self._browse['title'],
+            'text_line_2': "Add all loaded albums to the APWorld",
+            'text_line_3': f"{loaded} albums loaded",
+            'text_line_4': "Clear the search to go back",
+            'image_source': KIVY_ICON,
+            'list_id': 'subsonic_browse',
+            # Action id 'add_loaded', made unique per list for _browse_active()
+            'generic_item': self._browse['header_id']
+        }
+
+    def _browse_near_end(self) -> bool:
+        rv = self.root_layout.ids.list_container.ids.search_rv
+        content_height = len(rv.data) * dp(BROWSE_ROW_HEIGHT)
+        below = rv.scroll_y * max(0, content_height - rv.height)
+        return below < rv.height * BROWSE_LOAD_AHEAD
+
+    def _on_browse_scroll(self, rv, scroll_y):
+        if self._browse_active():
+            self._browse_fill()
+
+    def _browse_fill(self):
+        """
+        (MAIN THREAD) Shows the prefetched page once the user nears the
+        end of the list, and keeps exactly one page fetched ahead.
+        """
+        state = self._browse
+        if state['pending'] and self._browse_near_end():
+            # Taken first: moving scroll_y below calls back in here
+            albums, state['pending'] = state['pending'], []
+            self._append_browse_rows(albums)
+        if not state['pending'] and not state['loading'] and not state['done']:
+            state['loading'] = True
+            threading.Thread(target=self._browse_page_thread,
+                             args=(state['generation'], state['list_type'], state['offset'], state['extra']),
+                             daemon=True).start()
+
+    def _browse_page_thread(self, generation, list_type, offset, extra):
+        try:
+            albums = self.backend.get_album_list(list_type, BROWSE_PAGE_SIZE, offset, **extra)
+        except Exception as e:
+            Logger.error(f"SubsonicHostUI: getAlbumList2 ({list_type}, offset {offset}) failed: {e}")
+            albums = None
+        Clock.schedule_once(lambda dt: self._on_browse_page(generation, albums))
+
+    def _on_browse_page(self, generation, albums):
+        if generation != self._browse_generation or not self._browse_active():
+            return
+        state = self._browse
+        state['loading'] = False
+        if albums is None:
+            state['done'] = True
+            self.root_layout.status_text = f"Could not load more of '{state['title']}'. See log."
+            return
+
+        state['offset'] += BROWSE_PAGE_SIZE
+        new_albums = [a for a in albums if a.uri not in state['seen']]
+        state['seen'].update(a.uri for a in new_albums)
+        state['pending'].extend(new_albums)
+        # A short page is the end; for 'random' so is a page of repeats
+        if len(albums) < BROWSE_PAGE_SIZE or not new_albums:
+            state['done'] = True
+        self._browse_fill()
+
+    def _append_browse_rows(self, albums):
+        """(MAIN THREAD) Appends album rows, keeping the view where the user left it."""
+        rv = self.root_layout.ids.list_container.ids.search_rv
+        row_height = dp(BROWSE_ROW_HEIGHT)
+        old_data = self.root_layout.ids.list_container.list_one_data
+        # scroll_y is a fraction of the scrollable height, which is about to grow
+        from_top = (1 - rv.scroll_y) * max(0, len(old_data) * row_height - rv.height)
+
+        rows = [{
+            'text_line_1': album.title,
+            'text_line_2': album.artist,
+            'text_line_3': f"{album.album_type} • Tracks: {album.total_tracks}",
+            'text_line_4': album.uri,
+            'image_source': album.display_image_url or album.image_url or KIVY_ICON,
+            'list_id': 'search',
+            'generic_item': album
+        } for album in albums]
+        loaded = len(old_data) - 1 + len(rows)
+        new_data = [self._browse_header_row(loaded)] + list(old_data[1:]) + rows
+        self.root_layout.ids.list_container.list_one_data = new_data
+
+        scrollable = max(1, len(new_data) * row_height - rv.height)
+        rv.scroll_y = max(0.0, min(1.0, 1 - from_top / scrollable))
+        self.root_layout.status_text = f"Showing {loaded} albums of '{self._browse['title']}'."
+
+    def _add_loaded_albums(self):
+        """(MAIN THREAD) Adds every album listed so far, fetching their tracks first."""
+        if not self._browse_active():
+            return
+        albums = [row['generic_item'] for row in self.root_layout.ids.list_container.list_one_data
+                  if row['list_id'] == 'search']
+        if not albums:
+            self.root_layout.status_text = "No albums loaded yet."
+            return
+        self.root_layout.status_text = f"Fetching tracks for {len(albums)} albums..."
+        threading.Thread(target=self._add_loaded_thread, args=(albums,), daemon=True).start()
+
+    def _add_loaded_thread(self, albums):
+        hydrated = self.backend.hydrate_albums(albums)
+
+        def add_all(dt):
+            added = self.root_layout.ids.list_container.add_apworld_items(hydrated)
+            self.root_layout.status_text = f"Added {added} of {len(albums)} albums."
+        # One batched update, the APWorld list is rebuilt once
+        Clock.schedule_once(add_all)
 
 
 # -------------------------------------------------------------------
-# 4. CLIENT UI HOST
+# 6. CLIENT UI HOST
 # -------------------------------------------------------------------
 class SubsonicSettingsWidget(BoxLayout):
     def __init__(self, host_instance, **kwargs):
@@ -391,7 +1624,7 @@ class SubsonicSettingsWidget(BoxLayout):
         # Options: 'raw' (Original) or 'mp3' (Transcode)
         self.format_spinner = Spinner(
             text=self.host.transcode_format,
-            values=('mp3', 'raw'),
+            values=('auto', 'mp3', 'raw'),
             size_hint_x=0.6
         )
         self.format_spinner.bind(text=self._on_format_change)
@@ -401,7 +1634,32 @@ class SubsonicSettingsWidget(BoxLayout):
         
         # Info Label
         self.add_widget(Label(
-            text="Select 'mp3' if playback fails or skips.",
+            text="Select 'mp3' if playback fails or skips, 'auto' to follow the connection.",
+            font_size='11sp',
+            color=(0.7, 0.7, 0.7, 1)
+        ))
+        self.abr_label = Label(text=self.host.abr.status_text(), font_size='11sp', color=(0.7, 0.7, 0.7, 1))
+        self.add_widget(self.abr_label)
+        self._abr_event = Clock.schedule_interval(self._refresh_abr, 1.0)
+
+        # Offline cache: size cap (or off) and parallel downloads
+        size_label = next((label for label, mb in OFFLINE_SIZE_CHOICES.items() if mb == self.host.offline_max_mb), 'Off')
+        box = BoxLayout(size_hint_y=None, height=dp(30), spacing=dp(5))
+        box.add_widget(Label(text="Offline Cache:", size_hint_x=0.4))
+        self.offline_spinner = Spinner(text=size_label, values=tuple(OFFLINE_SIZE_CHOICES), size_hint_x=0.6)
+        self.offline_spinner.bind(text=self._on_offline_change)
+        box.add_widget(self.offline_spinner)
+        self.add_widget(box)
+
+        box = BoxLayout(size_hint_y=None, height=dp(30), spacing=dp(5))
+        box.add_widget(Label(text="Downloads:", size_hint_x=0.4))
+        self.workers_spinner = Spinner(text=str(self.host.offline_workers), values=('1', '2', '3', '4'), size_hint_x=0.6)
+        self.workers_spinner.bind(text=self._on_offline_change)
+        box.add_widget(self.workers_spinner)
+        self.add_widget(box)
+
+        self.add_widget(Label(
+            text="Downloads owned albums, newest unlocks first.",
             font_size='11sp',
             color=(0.7, 0.7, 0.7, 1)
         ))
@@ -410,6 +1668,16 @@ class SubsonicSettingsWidget(BoxLayout):
     def _on_format_change(self, instance, value):
         self.host.set_transcode_format(value)
 
+    def _refresh_abr(self, dt):
+        if self.get_root_window() is None:
+            # Settings were closed
+            self._abr_event.cancel()
+            return
+        self.abr_label.text = self.host.abr.status_text()
+
+    def _on_offline_change(self, instance, value):
+        self.host.set_offline_cache(OFFLINE_SIZE_CHOICES[self.offline_spinner.text], int(self.workers_spinner.text))
+
 
 class SubsonicClientHost(AbstractClientHost):
     
@@ -422,6 +1690,13 @@ class SubsonicClientHost(AbstractClientHost):
         self.current_playing_track_uri = None
         self.current_playing_track_title = None
         self.transcode_format = 'raw'
+        self.prefetcher = None # Created in setup_ui()
+        self.abr = AdaptiveBitrate()
+        self.offline_cache = None # Only while enabled in settings
+        self.offline_max_mb = 0
+        self.offline_workers = OFFLINE_DEFAULT_WORKERS
+        self._offline_seen = set() # Owned albums already queued
+        self._offline_event = None
         self._load_settings()
 
     def setup_ui(self):
@@ -434,6 +1709,13 @@ class SubsonicClientHost(AbstractClientHost):
         
         self.root_layout.set_status("Connected to Subsonic.")
 
+        self.prefetcher = StreamPrefetcher(os.path.join(shared_data_dir(), 'subsonic_prefetch'), self.backend.transport,
+                                           on_throughput=self.abr.add_sample)
+        threading.Thread(target=self.prefetcher.clear, daemon=True).start()
+        self._apply_offline_settings()
+        if not self._offline_event:
+            self._offline_event = Clock.schedule_interval(self._sync_offline_albums, OFFLINE_POLL_INTERVAL)
+
     def get_settings_ui(self):
         return None
 
@@ -469,11 +1751,14 @@ class SubsonicClientHost(AbstractClientHost):
         except Exception as e:
             Logger.error(f"Subsonic Parse Error: {e}")
 
-    def _get_signed_url(self, fragment, endpoint="getCoverArt"):
+    def _get_signed_url(self, fragment, endpoint="getCoverArt", size_name='list'):
         if not fragment or not fragment.startswith("coverArt:"): return KIVY_ICON
         cid = fragment.split(":")[1]
         params = self.backend._build_params()
         params['id'] = cid
+        if endpoint == "getCoverArt" and size_name:
+            # Scaled server-side, see THUMBNAIL_SIZES
+            params['size'] = THUMBNAIL_SIZES[size_name]
         q = urllib.parse.urlencode(params)
         return f"{self.backend.server_url}/rest/{endpoint}?{q}"
 
@@ -531,16 +1816,20 @@ class SubsonicClientHost(AbstractClientHost):
             self.app.show_toast("Invalid Track ID")
             return
         
-        params = self.backend._build_params()
-        params['id'] = tid
-        
-        if self.transcode_format != 'raw':
-            params['format'] = self.transcode_format
-            params['estimateContentLength'] = 'true'
+        profile = self._stream_profile()
+        local_path = self._local_source(tid)
+        if self.prefetcher:
+            # A half-finished prefetch would compete with the stream
+            self.prefetcher.cancel(self._prefetch_key(tid, profile))
         
-        q = urllib.parse.urlencode(params)
-        stream_url = f"{self.backend.server_url}/rest/stream?{q}"
-        stream_url += "&.mp3" # .mp3 suffix fix for Kivy url parser
+        if local_path:
+            source = local_path
+        else:
+            params = self.backend._build_params()
+            params.update(self._stream_params(tid, profile))
+            q = urllib.parse.urlencode(params)
+            source = f"{self.backend.server_url}/rest/stream?{q}"
+            source += "&.mp3" # .mp3 suffix fix for Kivy url parser
                 
         # Update UI
         if self.playback_info_widget:
@@ -554,31 +1843,142 @@ class SubsonicClientHost(AbstractClientHost):
             prog = self.app.track_progress.get(uri)
             if prog and (parent := prog.get('parent_uri')):
                 if album := self.app.album_data_cache.get(parent):
-                    self.playback_info_widget.art_source = self._get_signed_url(album.image_url)
+                    self.playback_info_widget.art_source = self._get_signed_url(album.image_url, size_name='player')
 
-        Logger.info(f"Subsonic: Streaming ({self.transcode_format}): {stream_url}")
-        self.app.audio_player.play(stream_url)
+        if local_path:
+            Logger.info(f"Subsonic: Playing local copy: {title}")
+        else:
+            Logger.info(f"Subsonic: Streaming ({profile}): {title}")
+        self.app.audio_player.play(source)
         
         self.current_playing_track_uri = uri
         self.current_playing_track_title = title
         self.is_playing = True
         
         Clock.schedule_once(lambda dt: self.start_polling(), 0.5)
+        self._start_prefetch()
+
+    # --- Next-track prefetch ---
+
+    def _stream_profile(self) -> str:
+        """The profile to fetch a track in now: the chosen format, or the adaptive pick."""
+        return self.abr.profile if self.transcode_format == 'auto' else self.transcode_format
+
+    def _stream_params(self, tid, profile) -> dict:
+        return {'id': tid, **stream_profile_params(profile)}
+
+    def _prefetch_key(self, tid, profile) -> str:
+        return StreamPrefetcher.key(self.backend.server_url, tid, profile)
+
+    def _local_source(self, tid):
+        """Path of a downloaded copy of the track (offline cache or prefetch), else None."""
+        # In auto mode any quality already on disk beats streaming again
+        profiles = [p for p, _ in ABR_LADDER] if self.transcode_format == 'auto' else [self.transcode_format]
+        for profile in profiles:
+            key = self._prefetch_key(tid, profile)
+            if self.offline_cache and (path := self.offline_cache.path(key)):
+                return path
+            if self.prefetcher and (path := self.prefetcher.ready_path(key)):
+                return path
+        return None
+
+    def _start_prefetch(self):
+        """Downloads the track on_playback_finished() will play next."""
+        if not self.prefetcher:
+            return
+        idx = self.queue_index + 1
+        if not 0 <= idx < len(self.playback_queue):
+            self.prefetcher.cancel()
+            return
+        tid = self.playback_queue[idx].uri.split(":")[-1]
+        if self._local_source(tid):
+            self.prefetcher.cancel()
+            return
+        profile = self._stream_profile()
+        params = self.backend._build_params()
+        params.update(self._stream_params(tid, profile))
+        self.prefetcher.start(self._prefetch_key(tid, profile), self.backend.server_url, params)
     
     def _load_settings(self):
         app = App.get_running_app()
         if hasattr(app, 'store') and app.store.exists('subsonic_settings'):
             data = app.store.get('subsonic_settings')
             self.transcode_format = data.get('format', 'raw')
+            self.offline_max_mb = data.get('offline_max_mb', 0)
+            self.offline_workers = data.get('offline_workers', OFFLINE_DEFAULT_WORKERS)
+
+    def _save_settings(self):
+        app = App.get_running_app()
+        if hasattr(app, 'store'):
+            app.store.put('subsonic_settings', format=self.transcode_format,
+                          offline_max_mb=self.offline_max_mb, offline_workers=self.offline_workers)
 
     def set_transcode_format(self, fmt):
         """Called by Settings Widget."""
         self.transcode_format = fmt
         Logger.info(f"Subsonic: Transcode format set to {fmt}")
-        # Save to store
-        app = App.get_running_app()
-        if hasattr(app, 'store'):
-            app.store.put('subsonic_settings', format=fmt)
+        self._save_settings()
+        if self.offline_cache:
+            # Cached files are per format, queue the owned albums again
+            self.offline_cache.reset()
+            self._offline_seen.clear()
+
+    def set_offline_cache(self, max_mb, workers):
+        """Called by Settings Widget. max_mb 0 turns the offline cache off."""
+        self.offline_max_mb = max_mb
+        self.offline_workers = workers
+        Logger.info(f"Subsonic: Offline cache set to {max_mb} MB, {workers} downloads")
+        self._save_settings()
+        self._apply_offline_settings()
+
+    # --- Offline cache ---
+
+    def _apply_offline_settings(self):
+        if not self.offline_max_mb:
+            if self.offline_cache:
+                # Downloaded files stay on disk for when it is turned back on
+                self.offline_cache.stop()
+                self.offline_cache = None
+            return
+        max_bytes = self.offline_max_mb * 1024 * 1024
+        if self.offline_cache:
+            self.offline_cache.set_limits(max_bytes)
+            self.offline_cache.set_workers(self.offline_workers)
+            return
+        try:
+            self.offline_cache = OfflineAudioCache(os.path.join(shared_data_dir(), 'subsonic_offline'),
+                                                   self.backend.transport, max_bytes, self.offline_workers,
+                                                   on_throughput=self.abr.add_sample)
+        except OSError as e:
+            Logger.error(f"Subsonic: Offline cache unavailable: {e}")
+            return
+        self._offline_seen.clear()
+
+    def _sync_offline_albums(self, dt):
+        """(MAIN THREAD) Queues the tracks of newly owned albums, ahead of older ones."""
+        if not self.offline_cache or not self.backend.server_url:
+            return
+        owned = self.app.owned_albums
+        if not self._offline_seen <= owned:
+            # A different game was loaded, its albums replace the wanted set
+            self.offline_cache.reset()
+            self._offline_seen.clear()
+        new_albums = [uri for uri in owned if uri not in self._offline_seen]
+        items = []
+        profile = self._stream_profile()
+        for album_uri in new_albums:
+            album = self.app.album_data_cache.get(album_uri)
+            if not album:
+                continue
+            self._offline_seen.add(album_uri)
+            for track in album.tracks:
+                tid = track.uri.split(":")[-1]
+                params = self.backend._build_params()
+                params.update(self._stream_params(tid, profile))
+                items.append((self._prefetch_key(tid, profile), self.backend.server_url, params))
+        if items:
+            Logger.info(f"Subsonic: Queued {len(items)} tracks of {len(new_albums)} owned albums for offline play.")
+            self.offline_cache.want(items, front=True)
 
     def get_settings_ui(self):
         return SubsonicSettingsWidget(host_instance=self)
@@ -621,7 +2021,10 @@ class SubsonicClientHost(AbstractClientHost):
         idx = self.queue_index + 1
         if 0 <= idx < len(self.playback_queue):
             self.queue_index = idx
-            Clock.schedule_once(lambda dt: self._play_track_internal(self.playback_queue[idx]), 0.2)
+            next_tid = self.playback_queue[idx].uri.split(":")[-1]
+            # A local file needs no grace period for the connection
+            is_local = self._local_source(next_tid) is not None
+            Clock.schedule_once(lambda dt: self._play_track_internal(self.playback_queue[idx]), 0 if is_local else 0.2)
         else:
             self.is_playing = False
             self.playback_info_widget.track_title = "Finished"
@@ -634,6 +2037,7 @@ class SubsonicClientHost(AbstractClientHost):
             self.app.audio_player.resume(); self.is_playing = True
     def on_stop_click(self):
         self.stop_polling(); self.app.audio_player.stop(); self.is_playing = False
+        if self.prefetcher: self.prefetcher.cancel()
     def on_volume_change(self, val):
         self.app.audio_player.set_volume(val / 100.0)
     def on_mute_toggle(self, is_muted): pass
@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+# Tag extraction for local library scans.
+# read_tags_batch() is the entry point for process-pool scans: it runs in
+# a worker process, reads a whole chunk of files and sends back one list
+# of plain tuples, so pickling cost is paid per chunk rather than per file.
+# NOTE: Must not import Kivy. Worker processes run this module as their
+# __main__ (see worker_main()), so importing it must stay cheap and headless.
+import sys, threading
+from contextlib import contextmanager
+
+try:
+    from mutagen import File as MutagenFile
+    from mutagen.id3 import ID3
+    from mutagen.mp4 import MP4
+except ImportError:
+    # The plugin warns about this; the fast header reader still works.
+    MutagenFile = None
+
+from musipelago.tag_reader import read_header_tags
+
+# Tuple returned for files that could not be read at all
+EMPTY_TAGS = (None, None, None, None, 0, False)
+
+# Native tag keys for (title, artist, album, albumartist), per tag format
+_ID3_KEYS = ('TIT2', 'TPE1', 'TALB', 'TPE2')
+_MP4_KEYS = ('\xa9nam', '\xa9ART', '\xa9alb', 'aART')
+_ASF_KEYS = ('Title', 'Author', 'WM/AlbumTitle', 'WM/AlbumArtist')
+_VORBIS_KEYS = ('title', 'artist', 'album', 'albumartist')
+
+def _first_tag(tags, key):
+    values = tags.get(key) if tags else None
+    if values is None:
+        return None
+    if hasattr(values, 'text'): # ID3 text frame
+        values = values.text
+    if not isinstance(values, list):
+        values = [values]
+    return str(values[0]) if values else None
+
+def read_track_tags(filepath: str) -> tuple:
+    """
+    Reads the tags we care about from a single audio file.
+    Returns (title, artist, album, albumartist, duration_ms, has_art);
+    missing tags are None. Raises on files mutagen cannot parse.
+    """
+    # Fast path: parse only the tag header with bounded reads
+    header_tags = read_header_tags(filepath)
+    if header_tags is not None:
+        return header_tags
+    if MutagenFile is None:
+        return EMPTY_TAGS
+
+    # Slow path for ambiguous headers (and WMA).
+    # mutagen.File detects format from header/extension.
+    # We read the native tags (not easy=True) so we can also see embedded art.
+    audio = MutagenFile(filepath)
+    if not audio:
+        return EMPTY_TAGS
+
+    tags = audio.tags
+    if isinstance(tags, ID3):
+        keys = _ID3_KEYS
+        has_art = bool(tags.getall('APIC'))
+    elif isinstance(audio, MP4):
+        keys = _MP4_KEYS
+        has_art = bool(tags and 'covr' in tags)
+    elif type(audio).__name__ == 'ASF':
+        keys = _ASF_KEYS
+        has_art = bool(tags and 'WM/Picture' in tags)
+    else:
+        # Vorbis comments (FLAC, OGG) are case-insensitive
+        keys = _VORBIS_KEYS
+        has_art = bool(getattr(audio, 'pictures', None)
+                       or (tags and 'metadata_block_picture' in tags))
+    title, artist, album, albumartist = (_first_tag(tags, k) for k in keys)
+
+    # audio.info.length is standard across all mutagen types (in seconds)
+    duration_ms = 0
+    if audio.info and audio.info.length:
+        duration_ms = int(audio.info.length * 1000)
+    return (title, artist, album, albumartist, duration_ms, has_art)
+
+def read_tags_batch(filepaths: list) -> tuple:
+    """
+    (WORKER PROCESS) Reads a chunk of files.
+    Returns (rows, errors): rows[i] is the read_track_tags() tuple for
+    filepaths[i] (EMPTY_TAGS if it failed), errors is a list of
+    (filepath, message) for the caller to log.
+    """
+    rows = []
+    errors = []
+    for filepath in filepaths:
+        try:
+            rows.append(read_track_tags(filepath))
+        except Exception as e:
+            rows.append(EMPTY_TAGS)
+            errors.append((filepath, str(e)))
+    return rows, errors
+
+# --- Worker bootstrap ---
+
+_main_swap_lock = threading.Lock()
+
+@contextmanager
+def worker_main():
+    """
+    Spawned processes import the parent's __main__ before their first task.
+    Both apps' main modules import Kivy, which opens a window, so while
+    workers are being started this module stands in for __main__ and the
+    children import it instead.
+    Wrap every call that can start a worker in it; ProcessPoolExecutor
+    starts its processes from submit().
+    """
+    with _main_swap_lock:
+        real_main = sys.modules['__main__']
+        sys.modules['__main__'] = sys.modules[__name__]
+        try:
+            yield
+        finally:
+            sys.modules['__main__'] = real_main
@@ -0,0 +1,523 @@
+# -*- coding: utf-8 -*-
+# Header-only tag reader for local library scans.
+# Reads just the ID3v2 frames, FLAC STREAMINFO/VORBIS_COMMENT blocks,
+# MP4 moov/udta atoms or Ogg header packets with bounded reads, and seeks
+# over anything large (cover art, audio data). read_header_tags() returns
+# None when the header is ambiguous so callers can fall back to mutagen.
+# NOTE: Must not import Kivy, it is also used by the benchmark script.
+import os, re, struct
+
+# Hard cap on the bytes we are willing to read for one file.
+MAX_HEADER_BYTES = 256 * 1024
+# Windows tried (smallest first) when looking for the first MPEG frame.
+MPEG_PROBE_SIZES = (2 * 1024, 16 * 1024)
+# The last Ogg page is searched backwards in chunks; a page is never
+# larger than ~64 KB, so that bounds the search.
+OGG_TAIL_CHUNK = 4 * 1024
+OGG_MAX_PAGE_BYTES = 66 * 1024
+
+_ID3_FRAME_ID = re.compile(rb'^[A-Z0-9]{3,4}$')
+
+# ID3 frame ids for (title, artist, album, albumartist), v2.3/2.4 and v2.2
+_ID3_TEXT_FRAMES = {
+    b'TIT2': 0, b'TPE1': 1, b'TALB': 2, b'TPE2': 3,
+    b'TT2': 0, b'TP1': 1, b'TAL': 2, b'TP2': 3,
+}
+_ID3_ART_FRAMES = (b'APIC', b'PIC')
+
+_MP4_TEXT_ATOMS = {b'\xa9nam': 0, b'\xa9ART': 1, b'\xa9alb': 2, b'aART': 3}
+_VORBIS_TEXT_KEYS = {'title': 0, 'artist': 1, 'album': 2, 'albumartist': 3}
+
+
+class _Ambiguous(Exception):
+    """Raised internally when the fast path can't give a trustworthy answer."""
+
+
+class _BoundedReader:
+    """Wraps a binary file object and enforces MAX_HEADER_BYTES."""
+
+    def __init__(self, fileobj, budget=MAX_HEADER_BYTES):
+        self.f = fileobj
+        self.budget = budget
+        self.f.seek(0, os.SEEK_END)
+        self.size = self.f.tell()
+        self.f.seek(0)
+
+    def read_at(self, offset, length):
+        if length < 0 or offset < 0 or offset + length > self.size:
+            raise _Ambiguous("read past end of file")
+        if length > self.budget:
+            raise _Ambiguous("header larger than read budget")
+        self.budget -= length
+        self.f.seek(offset)
+        data = self.f.read(length)
+        if len(data) != length:
+            raise _Ambiguous("short read")
+        return data
+
+    def read_upto(self, offset, length):
+        """Like read_at, but clamps at end of file."""
+        return self.read_at(offset, max(0, min(length, self.size - offset)))
+
+
+class _Tags:
+    __slots__ = ('values', 'duration_ms', 'has_art')
+
+    def __init__(self):
+        self.values = [None, None, None, None]
+        self.duration_ms = 0
+        self.has_art = False
+
+    def set(self, slot, value):
+        if value and self.values[slot] is None:
+            self.values[slot] = value
+
+    def as_tuple(self):
+        return (*self.values, self.duration_ms, self.has_art)
+
+
+def read_header_tags(filepath: str):
+    """
+    Reads (title, artist, album, albumartist, duration_ms, has_art)
+    from the file header. Returns None if the caller should use mutagen.
+    """
+    try:
+        with open(filepath, 'rb') as f:
+            return read_header_tags_fileobj(f)
+    except OSError:
+        return None
+
+
+def read_header_tags_fileobj(fileobj):
+    """Same as read_header_tags(), for an already opened binary file."""
+    try:
+        reader = _BoundedReader(fileobj)
+        head = reader.read_upto(0, 12)
+        if head.startswith(b'ID3'):
+            tags = _Tags()
+            audio_start = _parse_id3v2(reader, tags)
+            if reader.read_upto(audio_start, 4) == b'fLaC':
+                _parse_flac(reader, audio_start, tags)
+            else:
+                _parse_mpeg_duration(reader, audio_start, tags)
+            return tags.as_tuple()
+        if head.startswith(b'fLaC'):
+            tags = _Tags()
+            _parse_flac(reader, 0, tags)
+            return tags.as_tuple()
+        if head[4:8] == b'ftyp':
+            tags = _Tags()
+            _parse_mp4(reader, tags)
+            return tags.as_tuple()
+        if head.startswith(b'OggS'):
+            tags = _Tags()
+            _parse_ogg(reader, tags)
+            return tags.as_tuple()
+    except (_Ambiguous, struct.error, UnicodeDecodeError, IndexError, ValueError):
+        pass
+    # Bare MPEG streams (tags may live in an ID3v1/APE footer), ASF/WMA,
+    # and anything we could not parse confidently.
+    return None
+
+
+# --- ID3v2 / MPEG ---
+
+def _syncsafe(data):
+    value = 0
+    for b in data:
+        if b & 0x80:
+            raise _Ambiguous("invalid syncsafe integer")
+        value = (value << 7) | b
+    return value
+
+
+def _decode_id3_text(data):
+    if not data:
+        return None
+    encoding, body = data[0], data[1:]
+    if encoding == 0:
+        text = body.decode('latin-1')
+    elif encoding == 1:
+        text = body.decode('utf-16')
+    elif encoding == 2:
+        text = body.decode('utf-16-be')
+    elif encoding == 3:
+        text = body.decode('utf-8')
+    else:
+        raise _Ambiguous("unknown ID3 text encoding")
+    # Multiple values are NUL separated; we only want the first one
+    for value in text.split('\x00'):
+        value = value.strip('\ufeff')
+        if value:
+            return value
+    return None
+
+
+def _parse_id3v2(reader, tags):
+    """Reads the ID3v2 text frames. Returns the offset where audio starts."""
+    header = reader.read_at(0, 10)
+    major, flags = header[3], header[5]
+    if major not in (2, 3, 4):
+        raise _Ambiguous("unsupported ID3 version")
+    if flags & 0x80 and major < 4:
+        # Tag-wide unsynchronisation: let mutagen deal with it
+        raise _Ambiguous("unsynchronised ID3 tag")
+    tag_size = _syncsafe(header[6:10])
+    tag_end = 10 + tag_size
+    audio_start = tag_end + (10 if flags & 0x10 else 0)
+
+    pos = 10
+    if flags & 0x40 and major >= 3:
+        ext = reader.read_at(pos, 4)
+        pos += _syncsafe(ext) if major == 4 else 4 + struct.unpack('>I', ext)[0]
+
+    id_len, header_len = (3, 6) if major == 2 else (4, 10)
+    while pos + header_len <= tag_end:
+        frame_header = reader.read_at(pos, header_len)
+        frame_id = frame_header[:id_len]
+        if frame_id[0] == 0:
+            break # Padding
+        if not _ID3_FRAME_ID.match(frame_id):
+            raise _Ambiguous("corrupt ID3 frame header")
+
+        if major == 2:
+            frame_size = int.from_bytes(frame_header[3:6], 'big')
+            frame_flags = 0
+        elif major == 3:
+            frame_size = struct.unpack('>I', frame_header[4:8])[0]
+            frame_flags = struct.unpack('>H', frame_header[8:10])[0]
+        else:
+            frame_size = _syncsafe(frame_header[4:8])
+            frame_flags = struct.unpack('>H', frame_header[8:10])[0]
+
+        data_start = pos + header_len
+        pos = data_start + frame_size
+        if pos > tag_end:
+            raise _Ambiguous("ID3 frame overruns tag")
+
+        if frame_id in _ID3_ART_FRAMES:
+            tags.has_art = True # Seek over the image, never read it
+            continue
+        slot = _ID3_TEXT_FRAMES.get(frame_id)
+        if slot is None:
+            continue
+
+        data = reader.read_at(data_start, frame_size)
+        if major == 3:
+            if frame_flags & 0x00C0: # Compressed / encrypted
+                raise _Ambiguous("compressed ID3 frame")
+            if frame_flags & 0x0020: # Grouping identity byte
+                data = data[1:]
+        elif major == 4:
+            if frame_flags & 0x000C:
+                raise _Ambiguous("compressed ID3 frame")
+            if frame_flags & 0x0040:
+                data = data[1:]
+            if frame_flags & 0x0001: # Data length indicator
+                data = data[4:]
+            if frame_flags & 0x0002:
+                data = data.replace(b'\xff\x00', b'\xff')
+        tags.set(slot, _decode_id3_text(data))
+
+    return audio_start
+
+
+# MPEG audio tables, indexed by [version][layer]
+_MPEG_BITRATES = {
+    (1, 1): (0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448),
+    (1, 2): (0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384),
+    (1, 3): (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320),
+    (2, 1): (0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256),
+    (2, 2): (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+}
+_MPEG_BITRATES[(2, 3)] = _MPEG_BITRATES[(2, 2)]
+_MPEG_SAMPLE_RATES = {1: (44100, 48000, 32000), 2: (22050, 24000, 16000), 2.5: (11025, 12000, 8000)}
+
+
+def _mpeg_frame(header):
+    """Decodes a 4 byte MPEG frame header, or returns None."""
+    if len(header) < 4 or header[0] != 0xFF or (header[1] & 0xE0) != 0xE0:
+        return None
+    version_bits = (header[1] >> 3) & 0x3
+    layer_bits = (header[1] >> 1) & 0x3
+    bitrate_index = header[2] >> 4
+    rate_index = (header[2] >> 2) & 0x3
+    if version_bits == 1 or layer_bits == 0 or bitrate_index in (0, 15) or rate_index == 3:
+        return None
+    version = {0: 2.5, 2: 2, 3: 1}[version_bits]
+    layer = 4 - layer_bits
+    padding = (header[2] >> 1) & 0x1
+    mono = (header[3] >> 6) == 3
+
+    bitrate = _MPEG_BITRATES[(1 if version == 1 else 2, layer)][bitrate_index] * 1000
+    sample_rate = _MPEG_SAMPLE_RATES[version][rate_index]
+    if layer == 1:
+        samples = 384
+        frame_len = (12 * bitrate // sample_rate + padding) * 4
+    else:
+        samples = 1152 if (layer == 2 or version == 1) else 576
+        frame_len = (samples // 8) * bitrate // sample_rate + padding
+    return frame_len, samples, sample_rate, bitrate, version, layer, mono
+
+
+def _find_first_mpeg_frame(window):
+    """Returns (offset, frame) of the first frame confirmed by the next header."""
+    # Skip padding between the tag and the first frame
+    for offset in range(len(window) - 4):
+        frame = _mpeg_frame(window[offset:offset + 4])
+        if not frame:
+            continue
+        next_header = window[offset + frame[0]:offset + frame[0] + 4]
+        if len(next_header) < 4:
+            return None # Need a bigger window to confirm
+        if _mpeg_frame(next_header):
+            return offset, frame
+    return None
+
+
+def _parse_mpeg_duration(reader, audio_start, tags):
+    for probe_size in MPEG_PROBE_SIZES:
+        window = reader.read_upto(audio_start, probe_size)
+        found = _find_first_mpeg_frame(window)
+        if found:
+            break
+    else:
+        raise _Ambiguous("no MPEG frame sync")
+
+    offset, frame = found
+    frame_len, samples, sample_rate, bitrate, version, layer, mono = frame
+    first = window[offset:offset + frame_len]
+
+    # Xing/Info header (LAME VBR and CBR) lives after the side info
+    if layer == 3:
+        side_info = (17 if mono else 32) if version == 1 else (9 if mono else 17)
+        xing = first[4 + side_info:4 + side_info + 12]
+        if xing[:4] in (b'Xing', b'Info'):
+            flags = struct.unpack('>I', xing[4:8])[0]
+            if flags & 0x1:
+                frames = struct.unpack('>I', xing[8:12])[0]
+                tags.duration_ms = int(frames * samples * 1000 / sample_rate)
+                return
+
+    # Fraunhofer VBRI header is always 32 bytes after the frame header
+    vbri = first[36:54]
+    if vbri[:4] == b'VBRI':
+        frames = struct.unpack('>I', vbri[14:18])[0]
+        tags.duration_ms = int(frames * samples * 1000 / sample_rate)
+        return
+
+    # No VBR header: assume CBR, like mutagen does
+    audio_bytes = reader.size - (audio_start + offset)
+    if reader.size >= 128 and reader.read_at(reader.size - 128, 3) == b'TAG':
+        audio_bytes -= 128
+    tags.duration_ms = int(audio_bytes * 8 * 1000 / bitrate)
+
+
+# --- FLAC ---
+
+def _parse_vorbis_comments(data, tags):
+    vendor_len = struct.unpack('<I', data[:4])[0]
+    pos = 4 + vendor_len
+    count = struct.unpack('<I', data[pos:pos + 4])[0]
+    pos += 4
+    for _ in range(count):
+        length = struct.unpack('<I', data[pos:pos + 4])[0]
+        pos += 4
+        comment = data[pos:pos + length]
+        pos += length
+        if len(comment) != length:
+            raise _Ambiguous("truncated vorbis comment")
+        key, sep, value = comment.partition(b'=')
+        if not sep:
+            continue
+        key = key.decode('ascii', 'replace').lower()
+        if key == 'metadata_block_picture':
+            tags.has_art = True
+            continue
+        slot = _VORBIS_TEXT_KEYS.get(key)
+        if slot is not None:
+            tags.set(slot, value.decode('utf-8'))
+
+
+def _parse_flac(reader, start, tags):
+    pos = start + 4
+    got_streaminfo = False
+    while True:
+        block_header = reader.read_at(pos, 4)
+        is_last = block_header[0] & 0x80
+        block_type = block_header[0] & 0x7F
+        length = int.from_bytes(block_header[1:4], 'big')
+        pos += 4
+        if block_type == 0: # STREAMINFO
+            info = reader.read_at(pos, 18)
+            sample_rate = int.from_bytes(info[10:13], 'big') >> 4
+            total_samples = int.from_bytes(info[13:18], 'big') & 0xFFFFFFFFF
+            if sample_rate:
+                tags.duration_ms = int(total_samples * 1000 / sample_rate)
+            got_streaminfo = True
+        elif block_type == 4: # VORBIS_COMMENT
+            _parse_vorbis_comments(reader.read_at(pos, length), tags)
+        elif block_type == 6: # PICTURE (seek over it)
+            tags.has_art = True
+        elif block_type == 127:
+            raise _Ambiguous("invalid FLAC metadata block")
+        pos += length
+        if is_last:
+            break
+    if not got_streaminfo:
+        raise _Ambiguous("FLAC without STREAMINFO")
+
+
+# --- MP4 ---
+
+def _iter_atoms(reader, start, end):
+    """Yields (type, data_start, data_end) for the atoms in [start, end)."""
+    pos = start
+    while pos + 8 <= end:
+        size, atom_type = struct.unpack('>I4s', reader.read_at(pos, 8))
+        header_len = 8
+        if size == 1:
+            size = struct.unpack('>Q', reader.read_at(pos + 8, 8))[0]
+            header_len = 16
+        elif size == 0:
+            size = end - pos
+        if size < header_len or pos + size > end:
+            raise _Ambiguous("corrupt MP4 atom")
+        yield atom_type, pos + header_len, pos + size
+        pos += size
+
+
+def _parse_mp4(reader, tags):
+    moov = None
+    for atom_type, data_start, data_end in _iter_atoms(reader, 0, reader.size):
+        if atom_type == b'moov':
+            moov = (data_start, data_end)
+            break
+    if moov is None:
+        raise _Ambiguous("MP4 without moov atom")
+
+    got_duration = False
+    for atom_type, data_start, data_end in _iter_atoms(reader, *moov):
+        if atom_type == b'mvhd':
+            mvhd = reader.read_at(data_start, min(32, data_end - data_start))
+            if mvhd[0] == 1:
+                timescale, duration = struct.unpack('>IQ', mvhd[20:32])
+            else:
+                timescale, duration = struct.unpack('>II', mvhd[12:20])
+            if timescale:
+                tags.duration_ms = int(duration * 1000 / timescale)
+                got_duration = True
+        elif atom_type == b'udta':
+            _parse_mp4_udta(reader, data_start, data_end, tags)
+    if not got_duration:
+        raise _Ambiguous("MP4 without mvhd")
+
+
+def _parse_mp4_udta(reader, start, end, tags):
+    for atom_type, data_start, data_end in _iter_atoms(reader, start, end):
+        if atom_type != b'meta':
+            continue
+        # ISO 'meta' is a full box (4 bytes version/flags), QuickTime's is not
+        peek = reader.read_upto(data_start, 8)
+        if peek[4:8] not in (b'hdlr', b'ilst', b'keys', b'free'):
+            data_start += 4
+        for child_type, child_start, child_end in _iter_atoms(reader, data_start, data_end):
+            if child_type == b'ilst':
+                _parse_mp4_ilst(reader, child_start, child_end, tags)
+
+
+def _parse_mp4_ilst(reader, start, end, tags):
+    for item_type, item_start, item_end in _iter_atoms(reader, start, end):
+        if item_type == b'covr':
+            tags.has_art = True # Seek over the image, never read it
+            continue
+        slot = _MP4_TEXT_ATOMS.get(item_type)
+        if slot is None:
+            continue
+        for data_type, data_start, data_end in _iter_atoms(reader, item_start, item_end):
+            if data_type != b'data':
+                continue
+            payload = reader.read_at(data_start, data_end - data_start)
+            if payload[1:4] == b'\x00\x00\x01': # UTF-8
+                tags.set(slot, payload[8:].decode('utf-8'))
+            break
+
+
+# --- Ogg (Vorbis / Opus) ---
+
+def _ogg_page(reader, pos):
+    """Returns (granule, serial, segment lengths, body offset) for the page at pos."""
+    header = reader.read_at(pos, 27)
+    if header[:4] != b'OggS' or header[4] != 0:
+        raise _Ambiguous("lost Ogg page sync")
+    granule, serial = struct.unpack('<qI', header[6:18])
+    segments = reader.read_at(pos + 27, header[26])
+    return granule, serial, segments, pos + 27 + header[26]
+
+
+def _ogg_header_packets(reader, count):
+    """Reassembles the first `count` packets of the first logical stream."""
+    packets = []
+    current = []
+    pos = 0
+    serial = None
+    while len(packets) < count:
+        _, page_serial, segments, body_start = _ogg_page(reader, pos)
+        body_len = sum(segments)
+        pos = body_start + body_len
+        if serial is None:
+            serial = page_serial
+        if page_serial != serial:
+            continue
+        body = reader.read_at(body_start, body_len)
+        offset = 0
+        for seg_len in segments:
+            current.append(body[offset:offset + seg_len])
+            offset += seg_len
+            if seg_len < 255:
+                packets.append(b''.join(current))
+                current = []
+                if len(packets) == count:
+                    break
+    return packets, serial
+
+
+def _ogg_last_granule(reader, serial):
+    """Walks backwards from the end of the file in small chunks to find the last page."""
+    end = reader.size
+    data = b''
+    while end > 0 and len(data) < OGG_MAX_PAGE_BYTES:
+        start = max(0, end - OGG_TAIL_CHUNK)
+        # Keep a page header's worth of overlap so a split header is still found
+        data = reader.read_at(start, end - start) + data[:27]
+        idx = data.rfind(b'OggS')
+        while idx != -1:
+            if len(data) - idx >= 27 and data[idx + 4] == 0:
+                granule, page_serial = struct.unpack('<qI', data[idx + 6:idx + 18])
+                if page_serial == serial and granule >= 0:
+                    return granule
+            idx = data.rfind(b'OggS', 0, idx)
+        end = start
+    raise _Ambiguous("no final Ogg page")
+
+
+def _parse_ogg(reader, tags):
+    (ident, comments), serial = _ogg_header_packets(reader, 2)
+    if ident.startswith(b'\x01vorbis'):
+        sample_rate = struct.unpack('<I', ident[12:16])[0]
+        pre_skip = 0
+        if not comments.startswith(b'\x03vorbis'):
+            raise _Ambiguous("missing vorbis comment header")
+        _parse_vorbis_comments(comments[7:], tags)
+    elif ident.startswith(b'OpusHead'):
+        sample_rate = 48000 # Opus granule positions are always 48 kHz
+        pre_skip = struct.unpack('<H', ident[10:12])[0]
+        if not comments.startswith(b'OpusTags'):
+            raise _Ambiguous("missing OpusTags header")
+        _parse_vorbis_comments(comments[8:], tags)
+    else:
+        raise _Ambiguous("unsupported Ogg codec")
+
+    granule = _ogg_last_granule(reader, serial)
+    if sample_rate:
+        tags.duration_ms = max(0, int((granule - pre_skip) * 1000 / sample_rate))
@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+import io, hashlib
+
+from kivy.logger import Logger
+
+from musipelago.image_cache import ImageCache
+
+# --- Pillow import for downscaling ---
+try:
+    from PIL import Image as PILImage
+except ImportError:
+    Logger.warning("Thumbnails: 'Pillow' not installed, cover art will be shown full size.")
+    PILImage = None
+
+# Longest edge in pixels. List rows draw art at 48dp and the player at
+# about 200dp; both leave headroom for high-DPI screens.
+THUMBNAIL_SIZES = {'list': 128, 'player': 512}
+THUMBNAIL_QUALITY = 85
+
+def content_hash(image_data: bytes) -> str:
+    return hashlib.sha1(image_data).hexdigest()
+
+def _thumbnail_key(image_hash: str, size_name: str) -> str:
+    return f"thumb:{image_hash}:{size_name}"
+
+def cached_thumbnails(image_hash: str) -> dict | None:
+    """
+    Returns {size_name: path} if every thumbnail for the source image
+    with this content hash is in the image cache, else None.
+    """
+    cache = ImageCache.shared()
+    paths = {}
+    for name in THUMBNAIL_SIZES:
+        path = cache.lookup(_thumbnail_key(image_hash, name))
+        if not path:
+            return None
+        paths[name] = path
+    return paths
+
+def make_thumbnails(image_data: bytes, image_hash: str = None) -> dict:
+    """
+    (THREAD) Downscales image_data to every THUMBNAIL_SIZES entry and
+    stores the results in the image cache, keyed by the source's hash.
+    Returns {size_name: path}, or {} if the image is unusable.
+    Without Pillow the original is cached once and used for every size.
+    """
+    image_hash = image_hash or content_hash(image_data)
+    existing = cached_thumbnails(image_hash)
+    if existing:
+        return existing
+
+    cache = ImageCache.shared()
+    if PILImage is None:
+        path = cache.put(image_data, keys=[_thumbnail_key(image_hash, name) for name in THUMBNAIL_SIZES])
+        return {name: path for name in THUMBNAIL_SIZES}
+
+    try:
+        img = PILImage.open(io.BytesIO(image_data))
+        largest = max(THUMBNAIL_SIZES.values())
+        # JPEG can decode straight at 1/2, 1/4 or 1/8 scale, far cheaper
+        # than decoding a 3000px cover in full and shrinking it.
+        img.draft('RGB', (largest, largest))
+        img = img.convert('RGB')
+
+        paths = {}
+        # Largest first, each smaller size is scaled from the previous one
+        for name, size in sorted(THUMBNAIL_SIZES.items(), key=lambda item: -item[1]):
+            img.thumbnail((size, size), PILImage.LANCZOS)
+            buffer = io.BytesIO()
+            img.save(buffer, 'JPEG', quality=THUMBNAIL_QUALITY, optimize=True)
+            paths[name] = cache.put(buffer.getvalue(), keys=[_thumbnail_key(image_hash, name)], ext="jpg")
+        return paths
+    except Exception as e:
+        Logger.warning(f"Thumbnails: Could not downscale image {image_hash}: {e}")
+        return {}
+
+def thumbnails_for_file(image_path: str, image_hash: str = None) -> dict:
+    """
+    (THREAD) Like make_thumbnails() for an image on disk. Pass the hash
+    when it is already known so a cache hit doesn't read the file.
+    """
+    if image_hash:
+        existing = cached_thumbnails(image_hash)
+        if existing:
+            return existing
+    try:
+        with open(image_path, 'rb') as f:
+            image_data = f.read()
+    except OSError as e:
+        Logger.warning(f"Thumbnails: Could not read {image_path}: {e}")
+        return {}
+    return make_thumbnails(image_data, image_hash)